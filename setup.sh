@@ -22,10 +22,8 @@ echo "Installing Flask dependencies..."
 pip install -r src/requirements.txt
 
 # Set up database
-echo "Initializing and migrating database..."
+echo "Creating and migrating database..."
 cd src/server
-flask db init
-flask db migrate -m "Initial migration"
 flask db upgrade
 
 # Prepopulate database 
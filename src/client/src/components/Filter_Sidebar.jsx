@@ -1,17 +1,11 @@
-import React, { useState, useEffect } from "react";
-import { useCSRF } from "../App";
+import React, { useState } from "react";
 import { ChevronDown, ChevronUp } from "lucide-react";
-import config from "../../config";
-//only price filtering implemented here
-//Need to add bid_status, sorting filters,  verified/non verified, antique? etc
-const Filter_component = ({ update_listings, listings }) => {
-    // const [selectedPriceRange, setSelectedPriceRange] = useState("");
-    const { csrfToken } = useCSRF();
-    const { api_base_url } = config;
 
+// Reports the selected price range to the page, which fetches the matching
+// listings from /api/get_filtered_listings along with its other filters
+const Filter_component = ({ update_filters }) => {
     const [minPrice, setMinPrice] = useState("");
     const [maxPrice, setMaxPrice] = useState("");
-    const [filter_applied, set_filter_applied] = useState(true);
     const [isDropdownOpen, setIsDropdownOpen] = useState(false);
 
     const handleMinPriceChange = (event) => {
@@ -33,63 +27,25 @@ const Filter_component = ({ update_listings, listings }) => {
         }
     };
 
-    const listingIds = listings.map((listing) => listing.Item_id);
-
     const handleApplyFilter = () => {
-        set_filter_applied(!filter_applied);
-    };
-    useEffect(() => {
-        const fetch_filteredlistings = async () => {
-            // prints for testing :P
-            // console.log("Filter selected: ", selectedPriceRange);
-            // console.log("Filtered_listings reached in filter :", listings);
-
-            const min = parseFloat(minPrice) || 0; // Default to 0 if empty or invalid
-            const max = parseFloat(maxPrice) || 99999999;
-            console.log("min : ", min, "max : ", max);
-            if (min > max) {
-                alert("Max price must be greater than Min price.");
-                return;
-            }
-            if (max > 99999999) {
-                alert("Max price cannot be over 99999999");
-                return;
-            }
-            const response = await fetch(`${api_base_url}/api/get_filtered_listings`, {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRF-TOKEN": csrfToken,
-                },
-
-                body: JSON.stringify({
-                    min_price: min,
-                    max_price: max,
-                    listing_Ids: listingIds,
-                }),
-                credentials: "include",
-            });
-            if (!response.ok) {
-                console.log("Response was not OK. Status:", response.status);
-                const errorText = await response.text();
-                console.log("Error Response:", errorText);
-            }
-
-            const filtered_Ids = await response.json();
-
-            //get listings for all returned ID's
-            const filteredListings = listings.filter((listing) =>
-                filtered_Ids.includes(listing.Item_id)
-            );
+        // No filter if both prices are empty
+        if (!minPrice && !maxPrice) {
+            update_filters({});
+            return;
+        }
 
-            update_listings(filteredListings);
-        };
-        if (minPrice || maxPrice) {
-            fetch_filteredlistings();
-        } else {
-            update_listings(listings); // If no filter, show all listings
+        const min = parseFloat(minPrice) || 0; // Default to 0 if empty or invalid
+        const max = parseFloat(maxPrice) || 99999999;
+        if (min > max) {
+            alert("Max price must be greater than Min price.");
+            return;
         }
-    }, [filter_applied]);
+        if (max > 99999999) {
+            alert("Max price cannot be over 99999999");
+            return;
+        }
+        update_filters({ min_price: min, max_price: max });
+    };
 
     return (
         <div className="p-4 m-2 bg-white shadow-lg rounded-lg">
@@ -1,11 +1,14 @@
 import React, { useState, useEffect } from "react";
 import { useCSRF } from "../App"; // Calls the user
 import config from "../../config";
+import { get_next_cursor } from "../hooks/pagination";
 
 const Search_component = ({ user, item, update_search }) => {
     //Filtering is done in all available users or items hence only set_filtered IDs is needed
     // set_filtered_Ids updates the filtered_Ids in navbar, for it to get corresponding filtered items OR users and set those to update in original pages
     const [searchQuery, setSearchQuery] = useState(""); // Tracks user search input
+    const [results, set_results] = useState([]); // Pages of results fetched so far
+    const [next_cursor, set_next_cursor] = useState(null); // Cursor of the next page of results
     const { api_base_url } = config;
     const { csrfToken } = useCSRF();
 
@@ -15,35 +18,45 @@ const Search_component = ({ user, item, update_search }) => {
         }
     };
 
-    useEffect(() => {
-        const fetchListings = async () => {
-            try {
-                const search_filter_response = await fetch(
-                    `${api_base_url}/api/get_search_filter`,
-                    {
-                        method: "POST",
-                        headers: {
-                            "Content-Type": "application/json",
-                            "X-CSRF-TOKEN": csrfToken,
-                        },
-                        body: JSON.stringify({ item: item, user: user, searchQuery: searchQuery }),
-                        credentials: "include",
-                    }
-                );
+    // Fetches a page of results, appending it to the pages already fetched
+    const fetchListings = async (cursor = null) => {
+        try {
+            const search_filter_response = await fetch(
+                `${api_base_url}/api/get_search_filter`,
+                {
+                    method: "POST",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "X-CSRF-TOKEN": csrfToken,
+                    },
+                    body: JSON.stringify({
+                        item: item,
+                        user: user,
+                        searchQuery: searchQuery,
+                        cursor: cursor,
+                    }),
+                    credentials: "include",
+                }
+            );
 
-                const filtered_data = await search_filter_response.json();
+            const filtered_data = await search_filter_response.json();
 
-                if (search_filter_response.ok) {
-                    update_search(filtered_data);
-                    console.log(filtered_data);
-                    // console.log("Fetched Listings: ", filteredListings);
-                } else {
-                    console.error("Failed to fetch listings");
-                }
-            } catch (error) {
-                console.error("Network error: ", error);
+            if (search_filter_response.ok) {
+                const all_results = cursor ? [...results, ...filtered_data] : filtered_data;
+                set_results(all_results);
+                set_next_cursor(get_next_cursor(search_filter_response));
+                update_search(all_results);
+                console.log(filtered_data);
+                // console.log("Fetched Listings: ", filteredListings);
+            } else {
+                console.error("Failed to fetch listings");
             }
-        };
+        } catch (error) {
+            console.error("Network error: ", error);
+        }
+    };
+
+    useEffect(() => {
         fetchListings();
     }, [searchQuery]);
 
@@ -57,6 +70,15 @@ const Search_component = ({ user, item, update_search }) => {
                 className="p-2 rounded-md border border-gray-300 w-1/3"
                 aria-label="Search input"
             />
+            {next_cursor && (
+                <button
+                    onClick={() => fetchListings(next_cursor)}
+                    className="ml-2 px-3 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
+                    aria-label="Load more search results"
+                >
+                    Load more
+                </button>
+            )}
         </div>
     );
 };
@@ -2,12 +2,16 @@ import React, { useState, useEffect } from "react";
 import { ChevronDown, ChevronUp } from "lucide-react";
 import { useCSRF } from "../App";
 import config from "../../config";
+import { get_next_cursor } from "../hooks/pagination";
 
 const CategoryFilter = ({ update_listings }) => {
     const [selectedCategories, setSelectedCategories] = useState([]);
     const [isDropdownOpen, setIsDropdownOpen] = useState(false);
     const { csrfToken } = useCSRF();
     const [filter_applied, set_filter_applied] = useState(false);
+    const [match_all, set_match_all] = useState(false); // Items must be in every selected category
+    const [filtered, set_filtered] = useState([]); // Pages of filtered listings fetched so far
+    const [next_cursor, set_next_cursor] = useState(null); // Cursor of the next page
     const { api_base_url } = config;
 
     const categories = [
@@ -32,48 +36,55 @@ const CategoryFilter = ({ update_listings }) => {
         set_filter_applied(!filter_applied);
     };
 
+    // Fetches a page of filtered listings, appending it to the pages already fetched
+    const fetch_filteredlistings = async (cursor = null) => {
+        const selectedString = selectedCategories.join(",");
+        // const listingIds = listings?.map((listing) => listing.Item_id) || [];
+
+        // if (!listingIds.length) {
+        //   console.log("No listings to filter");
+        //   return;
+        // }
+
+        try {
+            console.log(
+                JSON.stringify({
+                    categories: selectedString,
+                    //   listing_Ids: listingIds,
+                })
+            );
+            const response = await fetch(`${api_base_url}/api/get_category_filters`, {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json",
+                    "X-CSRF-TOKEN": csrfToken,
+                },
+                body: JSON.stringify({
+                    categories: selectedString,
+                    category_match: match_all ? "all" : "any",
+                    cursor: cursor,
+                    //   listing_Ids: listingIds,
+                }),
+                credentials: "include",
+            });
+
+            if (!response.ok) throw new Error(`Error: ${response.status}`);
+
+            const filtered_listings = await response.json();
+            //   const filteredListings = listings.filter((listing) =>
+            //     filteredIds.includes(listing.Item_id)
+            //   );
+            //   console.log(filtered_listings)
+            const all_listings = cursor ? [...filtered, ...filtered_listings] : filtered_listings;
+            set_filtered(all_listings);
+            set_next_cursor(get_next_cursor(response));
+            update_listings(all_listings);
+        } catch (error) {
+            console.error("Filtering failed", error);
+        }
+    };
+
     useEffect(() => {
-        const fetch_filteredlistings = async () => {
-            const selectedString = selectedCategories.join(",");
-            // const listingIds = listings?.map((listing) => listing.Item_id) || [];
-
-            // if (!listingIds.length) {
-            //   console.log("No listings to filter");
-            //   return;
-            // }
-
-            try {
-                console.log(
-                    JSON.stringify({
-                        categories: selectedString,
-                        //   listing_Ids: listingIds,
-                    })
-                );
-                const response = await fetch(`${api_base_url}/api/get_category_filters`, {
-                    method: "POST",
-                    headers: {
-                        "Content-Type": "application/json",
-                        "X-CSRF-TOKEN": csrfToken,
-                    },
-                    body: JSON.stringify({
-                        categories: selectedString,
-                        //   listing_Ids: listingIds,
-                    }),
-                    credentials: "include",
-                });
-
-                if (!response.ok) throw new Error(`Error: ${response.status}`);
-
-                const filtered_listings = await response.json();
-                //   const filteredListings = listings.filter((listing) =>
-                //     filteredIds.includes(listing.Item_id)
-                //   );
-                //   console.log(filtered_listings)
-                update_listings(filtered_listings);
-            } catch (error) {
-                console.error("Filtering failed", error);
-            }
-        };
         fetch_filteredlistings();
     }, [filter_applied]);
 
@@ -137,6 +148,18 @@ const CategoryFilter = ({ update_listings }) => {
                         ))}
                     </div>
 
+                    <label className="flex items-center space-x-2 cursor-pointer">
+                        <input
+                            type="checkbox"
+                            checked={match_all}
+                            onChange={() => set_match_all(!match_all)}
+                            aria-label="Only show items in every selected category"
+                        />
+                        <span className="text-gray-700 font-medium">
+                            Match all selected categories
+                        </span>
+                    </label>
+
                     <button
                         onClick={handleApplyFilter}
                         className="bg-blue-600 text-white p-2 rounded-lg hover:bg-blue-700 transition w-full"
@@ -146,6 +169,16 @@ const CategoryFilter = ({ update_listings }) => {
                     </button>
                 </div>
             )}
+
+            {next_cursor && (
+                <button
+                    onClick={() => fetch_filteredlistings(next_cursor)}
+                    className="mt-3 bg-blue-600 text-white p-2 rounded-lg hover:bg-blue-700 transition w-full"
+                    aria-label="Load more listings"
+                >
+                    Load more listings
+                </button>
+            )}
         </div>
     );
 };
@@ -328,7 +328,7 @@ const EnlargedAuthRequest = () => {
                         {item.Images && image_count > 0 ? (
                             <>
                                 <LazyLoadImage
-                                    src={`data:image/jpeg;base64,${item.Images[current_image_index]}`}
+                                    src={`${api_base_url}${item.Images[current_image_index]}`}
                                     alt={`${item.Listing_name} - Image ${current_image_index + 1}`}
                                     effect="blur"
                                     className="object-contain w-full max-h-[30rem]"
@@ -137,24 +137,26 @@ const EnlargedListingPage = () => {
         notificationSocketRef.current = get_notification_socket();
         const socket = notificationSocketRef.current;
 
-        // On successful connect, joins the bids room
+        // On successful connect, joins the item's room
         socket.on("connect", () => {
-            console.log("joined bids socket");
-            socket.emit("join_get_bids");
+            console.log("joined item socket");
+            socket.emit("join_item", { item_id: Number(item_id) });
         });
 
-        // Refreshes the listing information a bid update is received
-        socket.on("bid_update", () => {
-            fetchListingInformation();
-            setBidAmount(item.Current_bid);
+        // Updates the current bid when a bid update is received for this item
+        socket.on("bid_update", (data) => {
+            if (String(data.item_id) !== String(item_id)) return;
+            setItem((prev) => (prev ? { ...prev, Current_bid: data.current_bid } : prev));
+            setBidAmount(data.current_bid);
         });
 
-        socket.emit("join_get_bids");
+        socket.emit("join_item", { item_id: Number(item_id) });
 
         return () => {
             // Clean up the socket event listeners and release the
             // socket connection when the component unmounts
             console.log("closed connection");
+            socket.emit("leave_item", { item_id: Number(item_id) });
             socket.off("connect");
             socket.off("bid_update");
             release_notification_socket();
@@ -325,7 +327,7 @@ const EnlargedListingPage = () => {
                             {item.Images && imageCount > 0 ? (
                                 <>
                                     <LazyLoadImage
-                                        src={`data:image/jpeg;base64,${item.Images[currentImageIndex]}`}
+                                        src={`${api_base_url}${item.Images[currentImageIndex]}`}
                                         alt={`${item.Listing_name} - Image ${
                                             currentImageIndex + 1
                                         } of ${imageCount}`}
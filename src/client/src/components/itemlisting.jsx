@@ -21,6 +21,7 @@ const ItemListing = ({
     const [timeRemaining, setTimeRemaining] = useState("");
     const navigate = useNavigate();
     const { user } = useUser();
+    const { api_base_url } = config;
 
     // Function to calculate time remaining
     const calculateTimeRemaining = (availableUntil) => {
@@ -84,7 +85,7 @@ const ItemListing = ({
                         </button> */}
 
                         <LazyLoadImage
-                            src={`data:image/jpeg;base64,${images[currentImageIndex].Image}`}
+                            src={`${api_base_url}${images[currentImageIndex].Image}`}
                             alt="Item image"
                             effect="blur"
                             className="h-full object-contain"
@@ -117,7 +118,7 @@ const ItemListing = ({
                     </>
                 ) : (
                     <LazyLoadImage
-                        src={`data:image/jpeg;base64,${images[0].Image}`}
+                        src={`${api_base_url}${images[0].Image}`}
                         alt="Item image"
                         effect="blur"
                         className="w-full h-full object-cover"
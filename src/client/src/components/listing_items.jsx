@@ -140,7 +140,7 @@ const Listing_item = (props) => {
                         </span>
                     )}
                     <LazyLoadImage
-                        src={`data:image/${item.Image};base64,${item.Image}`}
+                        src={`${api_base_url}${item.Image}`}
                         alt={item.Listing_name}
                         effect="blur"
                         className="object-cover w-full h-48"
@@ -0,0 +1,27 @@
+// Listing endpoints return one page of results at a time. The cursor of the next
+// page is in the X-Next-Cursor header, which is missing on the last page.
+
+export const get_next_cursor = (response) => response.headers.get("X-Next-Cursor");
+
+// Adds the cursor of the page to fetch to a GET endpoint's URL
+export const page_url = (url, cursor) =>
+    cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url;
+
+// Fetches every page of a GET endpoint, for views that need all the results
+// (e.g. totals). get_results picks the results out of each page's JSON.
+export const fetch_all_pages = async (url, options, get_results) => {
+    let results = [];
+    let cursor = null;
+
+    do {
+        const response = await fetch(page_url(url, cursor), options);
+        if (!response.ok) {
+            throw new Error(`Error: ${response.status}`);
+        }
+
+        results = results.concat(get_results(await response.json()));
+        cursor = get_next_cursor(response);
+    } while (cursor);
+
+    return results;
+};
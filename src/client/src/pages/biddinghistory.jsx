@@ -4,6 +4,7 @@ import ItemListing from "../components/itemlisting";
 import { useNavigate } from "react-router-dom";
 import Bid_Status_component from "../components/bid_status_filter";
 import config from "../../config";
+import { get_next_cursor, page_url } from "../hooks/pagination";
 
 const BiddingHistory = () => {
     /*  
@@ -22,10 +23,11 @@ const BiddingHistory = () => {
 
     const { csrfToken } = useCSRF();
     const [filtered_listings, setfiltered_listings] = useState([]); // Stores bid-status-filtered data
-    // Function to fetch bidding history from the server
-    const getHistory = async () => {
+    const [next_cursor, set_next_cursor] = useState(null); // Cursor of the next page of history
+    // Function to fetch a page of bidding history from the server, appending it to the pages already shown
+    const getHistory = async (cursor = null) => {
         try {
-            const response = await fetch(`${api_base_url}/api/get-history`, {
+            const response = await fetch(page_url(`${api_base_url}/api/get-history`, cursor), {
                 method: "GET",
                 headers: {
                     "Content-Type": "application/json",
@@ -39,8 +41,10 @@ const BiddingHistory = () => {
 
             if (response.ok) {
                 if (Array.isArray(data.history)) {
-                    setHistory(data.history);
-                    setfiltered_listings(data.history);
+                    const all_history = cursor ? [...history, ...data.history] : data.history;
+                    setHistory(all_history);
+                    setfiltered_listings(all_history);
+                    set_next_cursor(get_next_cursor(response));
                 } else {
                     console.log("No items in history");
                 }
@@ -152,6 +156,17 @@ const BiddingHistory = () => {
                                     }
                                 />
                             ))}
+                            {next_cursor && (
+                                <div className="text-center">
+                                    <button
+                                        onClick={() => getHistory(next_cursor)}
+                                        className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
+                                        aria-label="Load more of your bidding history"
+                                    >
+                                        Load more
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )
                 ) : (
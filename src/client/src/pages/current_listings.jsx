@@ -9,61 +9,63 @@ import Listing_item from "../components/listing_items";
 import "../App.css";
 import Filter_component from "../components/Filter_Sidebar";
 import config from "../../config";
+import { get_next_cursor } from "../hooks/pagination";
 
 export default function CurrentListings({ }) {
     const [listings, set_listings] = useState([]);
-    const [price_filtered_listings, setprice_filtered_listings] = useState([]); // Stores price-filtered data
+    const [filters, set_filters] = useState({}); // Price range selected in the filter sidebar
     const { csrfToken } = useCSRF();
     const { api_base_url } = config;
     const [loading, setLoading] = useState(true);
+    const [next_cursor, set_next_cursor] = useState(null); // Cursor of the next page of listings
 
     const location = useLocation();
     const searchQuery = location.state?.searchQuery || "";
 
-    useEffect(() => {
-        const fetchListings = async () => {
-            // console.log("SEARCH IN CURRENT LISTING :", searchQuery);
-            try {
-                const search_filter_response = await fetch(
-                    `${api_base_url}/api/get_search_filter`,
-                    {
-                        method: "POST",
-                        headers: {
-                            "Content-Type": "application/json",
-                            "X-CSRF-TOKEN": csrfToken,
-                        },
-                        body: JSON.stringify({
-                            item: true,
-                            user: false,
-                            searchQuery: searchQuery,
-                        }),
-                        credentials: "include",
-                    }
-                );
+    // Fetches a page of listings matching the search and filters, appending it to
+    // the pages already shown
+    const fetchListings = async (cursor = null) => {
+        // console.log("SEARCH IN CURRENT LISTING :", searchQuery);
+        try {
+            const search_filter_response = await fetch(
+                `${api_base_url}/api/get_filtered_listings`,
+                {
+                    method: "POST",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "X-CSRF-TOKEN": csrfToken,
+                    },
+                    body: JSON.stringify({
+                        ...filters,
+                        searchQuery: searchQuery,
+                        cursor: cursor,
+                    }),
+                    credentials: "include",
+                }
+            );
 
-                const filtered_items = await search_filter_response.json();
-                // console.log("Filtered items", filtered_items);
+            const filtered_items = await search_filter_response.json();
+            // console.log("Filtered items", filtered_items);
 
-                if (search_filter_response.ok) {
-                    set_listings(filtered_items);
-                    setprice_filtered_listings(filtered_items);
-                    // console.log("Fetched Listings: ", listings);
-                } else {
-                    console.error("Failed to fetch listings");
-                }
-            } catch (error) {
-                console.error("Network error: ", error);
-            } finally {
-                setLoading(false);
+            if (search_filter_response.ok) {
+                const all_items = cursor ? [...listings, ...filtered_items] : filtered_items;
+                set_listings(all_items);
+                set_next_cursor(get_next_cursor(search_filter_response));
+                // console.log("Fetched Listings: ", listings);
+            } else {
+                console.error("Failed to fetch listings");
             }
-        };
-        fetchListings();
-    }, [searchQuery]);
-
-    const handle_filtered_listings = (filtered_listings) => {
-        setprice_filtered_listings(filtered_listings);
+        } catch (error) {
+            console.error("Network error: ", error);
+        } finally {
+            setLoading(false);
+        }
     };
 
+    useEffect(() => {
+        fetchListings();
+    }, [searchQuery, filters]);
+
     return (
         <main role="main" className="min-h-screen bg-gray-100 px-4 sm:px-6 lg:px-16 py-8">
             <header className="text-center mb-10">
@@ -77,8 +79,7 @@ export default function CurrentListings({ }) {
 
             <section className="mb-10">
                 <Filter_component
-                    update_listings={handle_filtered_listings}
-                    listings={listings}
+                    update_filters={set_filters}
                     aria-label="Filter listings"
                 />
             </section>
@@ -90,7 +91,7 @@ export default function CurrentListings({ }) {
                     <p>Loading listings...</p>
                 </div>
             ) : (
-                price_filtered_listings.length === 0 ? (
+                listings.length === 0 ? (
                     <p className="text-center text-gray-600 text-base sm:text-lg mt-20" aria-live="polite">
                         No current listings available.
                     </p>
@@ -100,7 +101,7 @@ export default function CurrentListings({ }) {
                         role="list"
                         aria-label="List of current listings"
                     >
-                        {price_filtered_listings.map((item) => (
+                        {listings.map((item) => (
                             <div
                                 key={item.id}
                                 role="listitem"
@@ -113,6 +114,17 @@ export default function CurrentListings({ }) {
                     </section>
                 )
             )}
+            {!loading && next_cursor && (
+                <div className="mt-10 text-center">
+                    <button
+                        onClick={() => fetchListings(next_cursor)}
+                        className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
+                        aria-label="Load more listings"
+                    >
+                        Load more
+                    </button>
+                </div>
+            )}
         </main>
     );
 }
@@ -72,9 +72,21 @@ const CurrentBids = () => {
                 socket.emit("join_get_bids");
             });
 
-            // When a bid is updated, update the bids
-            socket.on("bid_update", () => {
-                getBids();
+            // When a bid is updated, update the bids. A new bid by this user
+            // is not in the list yet, so the bids are fetched again
+            socket.on("bid_update", (data) => {
+                if (data.bidder_id === user.user_id) {
+                    getBids();
+                    return;
+                }
+
+                setBids((prev) =>
+                    prev.map((bid) =>
+                        bid.Item_id === data.item_id
+                            ? { ...bid, Current_bid: data.current_bid, Successful_bid: false }
+                            : bid
+                    )
+                );
             });
 
             socket.emit("join_get_bids");
@@ -4,6 +4,7 @@ import { useUser, useCSRF } from "../../App";
 import Chart from "../../components/chart";
 import Table from "../../components/table";
 import config from "../../../config";
+import { fetch_all_pages } from "../../hooks/pagination";
 
 export default function Dashboard() {
     const { user } = useUser();
@@ -96,24 +97,25 @@ export default function Dashboard() {
 
     const getSold = async () => {
         try {
-            const response = await fetch(`${api_base_url}/api/get-sold`, {
-                method: "GET",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRF-TOKEN": csrfToken,
+            // The profits are totalled over every page of sold items
+            const sold_items = await fetch_all_pages(
+                `${api_base_url}/api/get-sold`,
+                {
+                    method: "GET",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "X-CSRF-TOKEN": csrfToken,
+                    },
+                    credentials: "include",
                 },
-                credentials: "include",
-            });
+                (data) => data.sold_items
+            );
 
-            const data = await response.json();
-            if (response.ok) {
-                const profitData = calculateProfit(data.sold_items);
-                setWeeklyProfits(profitData);
-            } else {
-                alert(data.error || "Failed to fetch sold items.");
-            }
+            const profitData = calculateProfit(sold_items);
+            setWeeklyProfits(profitData);
         } catch (error) {
             console.error("Error fetching sold items:", error);
+            alert("Failed to fetch sold items.");
         }
     };
 
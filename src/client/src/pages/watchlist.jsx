@@ -3,6 +3,7 @@ import ItemListing from "../components/itemlisting";
 import { useNavigate } from "react-router-dom";
 import { useUser, useCSRF } from "../App"; // Calls the user
 import config from "../../config";
+import { get_next_cursor, page_url } from "../hooks/pagination";
 
 const Watchlist = () => {
     const { user } = useUser();
@@ -11,12 +12,13 @@ const Watchlist = () => {
     const { csrfToken } = useCSRF(); // Get the CSRF token
     const { api_base_url } = config;
     const [loading, setLoading] = useState(true);
+    const [next_cursor, set_next_cursor] = useState(null);
 
 
-    // Fetch watchlist data
-    const get_watchlist = async () => {
+    // Fetch a page of watchlist data, appending it to the pages already shown
+    const get_watchlist = async (cursor = null) => {
         try {
-            const response = await fetch(`${api_base_url}/api/get-watchlist`, {
+            const response = await fetch(page_url(`${api_base_url}/api/get-watchlist`, cursor), {
                 method: "GET",
                 headers: {
                     "Content-Type": "application/json",
@@ -29,11 +31,11 @@ const Watchlist = () => {
 
             if (response.ok) {
                 if (Array.isArray(data.watchlist)) {
-                    setWatchlist(
-                        data.watchlist.map((item) => ({
-                            ...item,
-                        }))
-                    );
+                    const page = data.watchlist.map((item) => ({
+                        ...item,
+                    }));
+                    setWatchlist((prev) => (cursor ? [...prev, ...page] : page));
+                    set_next_cursor(get_next_cursor(response));
                 } else {
                     console.log("No items in watchlist");
                 }
@@ -127,6 +129,17 @@ const Watchlist = () => {
                                     ]}
                                 />
                             ))}
+                            {next_cursor && (
+                                <div className="text-center">
+                                    <button
+                                        onClick={() => get_watchlist(next_cursor)}
+                                        className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
+                                        aria-label="Load more watchlist items"
+                                    >
+                                        Load more
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )
                 ) : (
@@ -11,6 +11,7 @@ from flask_socketio import SocketIO
 import stripe
 from flask_compress import Compress
 from apscheduler.schedulers.background import BackgroundScheduler
+from werkzeug.utils import import_string
 
 stripe.api_key = "sk_test_51QvN8MIrwvA3VrIBU92sndiPG7ZWIgYImzVxVP2ofd1xEDLpwPgF4fgWNsWpVm46klGLfcfbjTvbec7Vfi11p9vk00ODQbcday"
 
@@ -28,6 +29,9 @@ app.config["SESSION_COOKIE_SECURE"] = True
 app.config["REMEMBER_COOKIE_HTTPONLY"] = True
 app.config["REMEMBER_COOKIE_SECURE"] = True
 
+# Serializes jsonify() responses, see JSON_PROVIDER
+app.json = import_string(app.config["JSON_PROVIDER"])(app)
+
 # Configure CORS
 CORS(
     app,
@@ -36,7 +40,7 @@ CORS(
             "origins": ["http://localhost:5173", "http://localhost:4173"],
             "supports_credentials": True,
             "allow_headers": ["Content-Type", "X-CSRF-TOKEN"],
-            "expose_headers": ["Content-Type"],
+            "expose_headers": ["Content-Type", "X-Next-Cursor"],
         }
     },
 )
@@ -46,9 +50,18 @@ csrf = CSRFProtect(app)
 babel = Babel(app, locale_selector=get_locale)
 admin = Admin(app, template_mode="bootstrap4")
 
-# Initialize database
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The full-text search tables are created by app/search.py, not the models,
+    # so they are left out of autogenerated migrations
+    return not (type_ == "table" and compare_to is None and "_fts" in name)
+
+
+from .database import RoutingSession
+
+# Initialize database, reads of read only views are routed to the replica
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+migrate = Migrate(app, db, include_object=include_object)
 
 # Login manager setup
 login_manager = LoginManager()
@@ -62,6 +75,7 @@ socketio.init_app(
     app,
     cors_allowed_origins=["http://localhost:5173", "http://localhost:4173"],
     max_http_buffer_size=50 * 1024 * 1024,
+    json=app.json,
 )
 
 # Initialize scheduler
@@ -69,12 +83,15 @@ scheduler = BackgroundScheduler()
 app.scheduler = scheduler
 
 with app.app_context():
+    from . import database
+
+    database.init_engine(db)
+
     from . import models, views, taskqueue
     from .notifications import *
     from .messaging import *
 
-    # Create database tables
-    db.create_all()
+    # The tables are created and upgraded by `flask db upgrade`, see migrations/
 
     # Initialize task queue
     taskqueue.init_scheduler()
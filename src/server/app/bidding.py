@@ -0,0 +1,79 @@
+from app import db
+from app.cache import bump_version, invalidate
+import datetime
+
+# Models
+from .models import Items, Bidding_history
+
+
+def record_bid(item_id, bidder_id, bid_amount):
+    """
+    Places a bid on an item in a single transaction.
+
+    The item's current bid is only raised if the new bid is still higher when the
+    update runs (a compare-and-swap), so two concurrent bidders can never both
+    win with bids checked against the same current bid. The previous successful
+    bid is demoted and the new bid recorded in the same transaction.
+
+    The update locks the item's row (the whole database on SQLite), so a
+    concurrent bid on the same item waits for this one to commit and is then
+    checked against the new current bid.
+
+    Args:
+    - item_id (int): The ID of the item being bid on.
+    - bidder_id (int): The ID of the user placing the bid.
+    - bid_amount (float): The amount bid.
+
+    Returns:
+    - bool: True if the bid was placed, False if it is no longer higher than the
+      current bid (or below the minimum price).
+    """
+    bid_amount = float(bid_amount)
+
+    try:
+        # Raises the current bid only if this bid is still the highest
+        result = db.session.execute(
+            db.update(Items)
+            .where(
+                Items.Item_id == item_id,
+                Items.Current_bid < bid_amount,
+                Items.Min_price <= bid_amount,
+            )
+            .values(Current_bid=bid_amount, Version=Items.Version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return False
+
+        # The item row is now locked by this transaction, so the previous
+        # successful bid cannot change until it commits
+        db.session.execute(
+            db.update(Bidding_history)
+            .where(
+                Bidding_history.Item_id == item_id,
+                Bidding_history.Successful_bid.is_(True),
+            )
+            .values(Successful_bid=False)
+            .execution_options(synchronize_session=False)
+        )
+
+        db.session.add(
+            Bidding_history(
+                Item_id=item_id,
+                Bidder_id=bidder_id,
+                Successful_bid=True,
+                Bid_datetime=datetime.datetime.now(datetime.timezone.utc),
+                Winning_bid=False,
+                Bid_price=bid_amount,
+            )
+        )
+        invalidate(f"item:{item_id}")
+        # The item's own version was incremented with its current bid
+        bump_version()
+        db.session.commit()
+        return True
+
+    except Exception:
+        db.session.rollback()
+        raise
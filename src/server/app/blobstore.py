@@ -0,0 +1,271 @@
+from app import app, db
+from werkzeug.utils import import_string
+from itertools import islice
+import hashlib
+import os
+import tempfile
+import time
+
+# Models
+from .models import Images, Image_variants, ChatMessages
+
+
+class LocalBlobStore:
+    """
+    Stores binary blobs (images) in a local directory, keyed by the SHA-256 of
+    their content. Identical uploads are only stored once.
+
+    Blobs are sharded into two levels of sub directories, e.g. the blob with key
+    "ab12..." is stored at <root>/ab/12/ab12..., so no directory grows too large.
+
+    A blob's modification time is when it was last stored, which sweep_blobs
+    uses to keep blobs that an upload still in progress may be about to reference.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def key_for(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, key):
+        """
+        Gets the path of the file a blob is stored in.
+        """
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, data):
+        """
+        Stores a blob, unless a blob with the same content already exists.
+
+        Args:
+        - data (bytes): The blob's content.
+
+        Returns:
+        - str: The key the blob is stored under.
+        """
+        key = self.key_for(data)
+        path = self.path(key)
+
+        try:
+            # Marks the existing blob as just stored, so a sweep leaves it alone
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Writes to a temporary file first so readers never see a partial blob
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    temp_file.write(data)
+                os.replace(temp_path, path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+
+        return key
+
+    def get(self, key):
+        """
+        Reads a blob's content.
+        """
+        with open(self.path(key), "rb") as blob:
+            return blob.read()
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def stored_before(self, cutoff):
+        """
+        Lists the keys of blobs that have not been stored since a time.
+
+        Args:
+        - cutoff (float): The time, in seconds since the epoch.
+
+        Returns:
+        - generator: The keys.
+        """
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                # Skips temporary files and blobs being deleted
+                if len(name) != 64:
+                    continue
+                try:
+                    stored = os.path.getmtime(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                if stored < cutoff:
+                    yield name
+
+    def delete_if_stored_before(self, key, cutoff):
+        """
+        Deletes a blob, unless it has been stored again since a time.
+
+        The blob is moved aside before its modification time is checked, so a
+        put() either refreshes it before the move (and it is restored) or finds
+        it gone and writes it again.
+
+        Returns:
+        - bool: Whether the blob was deleted.
+        """
+        path = self.path(key)
+        removed_path = f"{path}.removed"
+        try:
+            os.replace(path, removed_path)
+        except FileNotFoundError:
+            return False
+
+        if os.path.getmtime(removed_path) >= cutoff:
+            os.replace(removed_path, path)
+            return False
+
+        os.remove(removed_path)
+        return True
+
+
+# Blob stores by (class, root), created from the app config on first use
+blob_stores = {}
+
+
+def get_blob_store():
+    """
+    Gets the blob store configured by BLOB_STORE (the import path of the store class)
+    and BLOB_STORE_PATH (its root).
+    """
+    store_class = app.config.get("BLOB_STORE", "app.blobstore.LocalBlobStore")
+    root = app.config["BLOB_STORE_PATH"]
+
+    if (store_class, root) not in blob_stores:
+        blob_stores[(store_class, root)] = import_string(store_class)(root)
+
+    return blob_stores[(store_class, root)]
+
+
+def read_image(image):
+    """
+    Reads the bytes of an Images, Image_variants or ChatMessages row, whether
+    they are in the blob store or (for rows not yet migrated) in the database.
+    """
+    store = get_blob_store()
+
+    if image.Image_hash and store.exists(image.Image_hash):
+        return store.get(image.Image_hash)
+
+    return image.Image
+
+
+def sweep_blobs(grace_period=None, batch_size=500):
+    """
+    Deletes blobs that are no longer referenced by any image or chat message.
+
+    Blobs are never deleted as the rows referencing them are, since an upload of
+    the same content may have just stored it and be about to insert its row.
+    Instead this runs nightly and only deletes blobs that have not been stored
+    for BLOB_SWEEP_GRACE_PERIOD seconds.
+
+    Args:
+    - grace_period (int): Seconds since a blob was last stored before it can be
+      deleted, BLOB_SWEEP_GRACE_PERIOD if not given.
+    - batch_size (int): The number of keys looked up per query.
+
+    Returns:
+    - int: The number of blobs deleted.
+    """
+    if grace_period is None:
+        grace_period = app.config["BLOB_SWEEP_GRACE_PERIOD"]
+
+    store = get_blob_store()
+    cutoff = time.time() - grace_period
+    keys = store.stored_before(cutoff)
+    deleted = 0
+
+    with app.app_context():
+        while batch := list(islice(keys, batch_size)):
+            referenced = set()
+            for table in (Images, Image_variants, ChatMessages):
+                referenced.update(
+                    key
+                    for key, in db.session.query(table.Image_hash).filter(
+                        table.Image_hash.in_(batch), table.Image.is_(None)
+                    )
+                )
+            db.session.rollback()
+
+            for key in batch:
+                if key not in referenced and store.delete_if_stored_before(
+                    key, cutoff
+                ):
+                    deleted += 1
+
+    return deleted
+
+
+def migrate_table(table, key_column, batch_size):
+    """
+    Moves the Image blobs of a table into the blob store.
+
+    Returns:
+    - int: The number of rows migrated.
+    """
+    store = get_blob_store()
+    migrated = 0
+
+    while True:
+        # Rows are cleared as they are migrated, so each batch starts from the top
+        rows = (
+            db.session.query(key_column, table.Image)
+            .filter(table.Image.is_not(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return migrated
+
+        for row_id, data in rows:
+            db.session.query(table).filter(key_column == row_id).update(
+                {"Image_hash": store.put(data), "Image": None},
+                synchronize_session=False,
+            )
+
+        db.session.commit()
+        migrated += len(rows)
+
+
+@app.cli.command("migrate-blobs")
+def migrate_blobs_command():
+    """
+    CLI command to move image blobs out of the database into the blob store.
+    """
+    with app.app_context():
+        batch_size = 100
+
+        images = migrate_table(Images, Images.Image_id, batch_size)
+        variants = migrate_table(Image_variants, Image_variants.Variant_id, batch_size)
+        messages = migrate_table(ChatMessages, ChatMessages.Message_id, batch_size)
+
+        # Returns the space freed by the blobs to the file system
+        if db.engine.dialect.name == "sqlite":
+            with db.engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as connection:
+                connection.exec_driver_sql("VACUUM")
+
+        print(
+            f"Moved {images} images, {variants} thumbnails and "
+            f"{messages} chat images to the blob store."
+        )
+
+
+@app.cli.command("sweep-blobs")
+def sweep_blobs_command():
+    """
+    CLI command to delete blobs no longer referenced by any image.
+    """
+    print(f"Deleted {sweep_blobs()} unused blobs.")
@@ -0,0 +1,243 @@
+from app import app, db
+from flask import request
+from flask_caching import Cache
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+import functools
+import hashlib
+import uuid
+
+# Models
+from .models import Types, Items, Bidding_history, Catalogue_version
+from .filters import available_listings
+
+# Shared by every worker, the backend is configured by the CACHE_* settings
+cache = Cache(app)
+
+
+def tag_versions(tags):
+    """
+    Gets the current version of each tag. A tag with no version yet (or whose
+    version was evicted) is given a new one.
+
+    Args:
+    - tags (list): The tags, e.g. "item:1".
+
+    Returns:
+    - list: The tags' versions, in the same order.
+    """
+    keys = [f"tag:{tag}" for tag in tags]
+    versions = cache.get_many(*keys) if keys else []
+
+    for i, version in enumerate(versions):
+        if version is None:
+            versions[i] = uuid.uuid4().hex
+            cache.set(keys[i], versions[i], timeout=0)
+
+    return versions
+
+
+def invalidate(*tags):
+    """
+    Expires every cached response tagged with any of the tags, by giving the tags
+    new versions. Called once the change to the data they cover is committed, or
+    while it is being made - the tags are then invalidated when it is committed.
+
+    Args:
+    - tags (str): The tags to invalidate, e.g. "item:1".
+    """
+    if db.session().in_transaction():
+        db.session.info.setdefault("invalidate", set()).update(tags)
+        return
+
+    cache.set_many({f"tag:{tag}": uuid.uuid4().hex for tag in tags}, timeout=0)
+
+
+def invalidate_item(item_id):
+    """
+    Invalidates the cached responses showing an item: its listing, and the
+    bidding history of everyone who bid on it.
+
+    Args:
+    - item_id (int): The ID of the item.
+    """
+    bidders = db.session.query(Bidding_history.Bidder_id).filter_by(Item_id=item_id)
+    invalidate(
+        f"item:{item_id}",
+        *(f"history:{bidder_id}" for bidder_id, in bidders.distinct()),
+    )
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidate_committed(db_session):
+    tags = db_session.info.pop("invalidate", None)
+    if tags:
+        cache.set_many({f"tag:{tag}": uuid.uuid4().hex for tag in tags}, timeout=0)
+
+
+@event.listens_for(db.session, "after_rollback")
+def forget_rolled_back(db_session):
+    db_session.info.pop("invalidate", None)
+
+
+def cached_view(timeout=None, tags=None, per_user=False):
+    """
+    Decorator for views whose successful responses are cached, keyed by the
+    request's path, query string and body. Goes below the @app.route decorator.
+
+    Args:
+    - timeout (int): Seconds a response is cached for, CACHE_DEFAULT_TIMEOUT if None.
+    - tags (function): Returns the tags of the request's response, which
+      invalidate() expires it by.
+    - per_user (bool): Whether each user is given their own response.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request_tags = sorted(tags()) if tags else []
+            user = current_user.get_id() if per_user else None
+            digest = hashlib.sha256(
+                "\n".join(
+                    [
+                        request.full_path,
+                        str(user),
+                        *request_tags,
+                        *tag_versions(request_tags),
+                    ]
+                ).encode()
+                + request.get_data()
+            ).hexdigest()
+            key = f"view:{view.__name__}:{digest}"
+
+            cached = cache.get(key)
+            if cached is not None:
+                body, status, headers = cached
+                return app.response_class(body, status=status, headers=headers)
+
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [
+                    (name, value)
+                    for name, value in response.headers
+                    if name not in ("Set-Cookie", "Content-Length")
+                ]
+                cache.set(key, (response.get_data(), 200, headers), timeout=timeout)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def bump_version(*item_ids):
+    """
+    Increments the catalogue's version, and the versions of the given items, in
+    the current transaction. Called whenever a listing (or what its card shows)
+    changes, so the ETags of the listing endpoints change with it.
+
+    Args:
+    - item_ids (int): The IDs of the changed items.
+    """
+    db.session.execute(
+        db.update(Catalogue_version)
+        .where(Catalogue_version.Id == 1)
+        .values(Version=Catalogue_version.Version + 1)
+    )
+    if item_ids:
+        db.session.execute(
+            db.update(Items)
+            .where(Items.Item_id.in_(item_ids))
+            .values(Version=Items.Version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def catalogue_version():
+    """
+    Gets the catalogue's version, which is incremented by every change to a
+    listing, and when the next available listing ends. Listings stop being
+    available once they end, whether or not their auction has been settled yet,
+    so the version changes then too.
+    """
+    next_ending = (
+        available_listings()
+        .with_entities(db.func.min(Items.Available_until))
+        .scalar_subquery()
+    )
+    version = (
+        db.session.query(Catalogue_version.Version, next_ending)
+        .filter_by(Id=1)
+        .first()
+    )
+    return None if version is None else "{}:{}".format(*version)
+
+
+def item_version(item_id):
+    """
+    Gets an item's version, or None if there is no such item.
+    """
+    return db.session.query(Items.Version).filter_by(Item_id=item_id).scalar()
+
+
+def conditional_view(version):
+    """
+    Decorator for views whose responses only change when a version does. Their
+    successful responses are given a strong ETag, derived from the version and
+    the request, and a request whose If-None-Match has it is answered with a 304
+    without running the view. Goes below the @app.route decorator.
+
+    Args:
+    - version (function): Returns the version of the data the request's response
+      is built from, or None to respond without an ETag (as it is when the
+      version cannot be read).
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                current = version()
+            except SQLAlchemyError:
+                # The view reports the database being unavailable
+                current = None
+            if current is None:
+                return view(*args, **kwargs)
+
+            etag = hashlib.sha256(
+                "\n".join(
+                    [str(current), request.full_path, str(current_user.get_id())]
+                ).encode()
+                + request.get_data()
+            ).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # Clients may keep the response, but must revalidate it before use
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def clear_cache(*args, **kwargs):
+    """
+    Forgets every cached response, e.g. when the database is recreated.
+    """
+    cache.clear()
+
+
+# Tags changed by any process are seen straight away
+for change in ("after_insert", "after_update", "after_delete"):
+    event.listen(Types, change, lambda *args: invalidate("tags"))
+event.listen(db.metadata, "after_create", clear_cache)
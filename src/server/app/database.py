@@ -0,0 +1,169 @@
+from app import app
+from flask import has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+import datetime
+import time
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Applies SQLITE_PRAGMAS to each new SQLite connection.
+    Registered as a connect event listener on the app's engines.
+
+    Args:
+    - dbapi_connection (sqlite3.Connection): The new connection.
+    - connection_record (_ConnectionRecord): The pool's record of the connection.
+    """
+    apply_pragmas(dbapi_connection, app.config["SQLITE_PRAGMAS"])
+
+
+def set_sqlite_write_pragmas(dbapi_connection, connection_record):
+    """
+    Applies SQLITE_WRITE_PRAGMAS to each new connection to the primary.
+    Registered as a connect event listener on the primary's engine only, the
+    replica's connections are read-only.
+
+    Args:
+    - dbapi_connection (sqlite3.Connection): The new connection.
+    - connection_record (_ConnectionRecord): The pool's record of the connection.
+    """
+    apply_pragmas(dbapi_connection, app.config["SQLITE_WRITE_PRAGMAS"])
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """
+    Sets the given pragmas on a SQLite connection.
+
+    Args:
+    - dbapi_connection (sqlite3.Connection): The connection.
+    - pragmas (dict): The pragmas' values, by name.
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def set_postgresql_timezone(dbapi_connection, connection_record):
+    """
+    Sets each new PostgreSQL connection's time zone to UTC, so timestamps are
+    returned in UTC like the ones the app stores.
+    Registered as a connect event listener on the app's engine.
+
+    Args:
+    - dbapi_connection (psycopg2.extensions.connection): The new connection.
+    - connection_record (_ConnectionRecord): The pool's record of the connection.
+    """
+    # Outside of a transaction, so the setting is not undone when the pool
+    # rolls the connection back
+    autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET TIME ZONE 'UTC'")
+    cursor.close()
+    dbapi_connection.autocommit = autocommit
+
+
+def init_engine(db):
+    """
+    Tunes the app's engines (the primary and the replica) for their databases,
+    before any connections are made.
+
+    Args:
+    - db (SQLAlchemy): The app's database.
+    """
+    for bind_key, engine in db.engines.items():
+        if engine.dialect.name == "sqlite":
+            if bind_key is None:
+                event.listen(engine, "connect", set_sqlite_write_pragmas)
+            event.listen(engine, "connect", set_sqlite_pragmas)
+        elif engine.dialect.name == "postgresql":
+            event.listen(engine, "connect", set_postgresql_timezone)
+
+
+def read_only(view):
+    """
+    Decorator for views that only read from the database, whose queries are
+    sent to the replica. Goes below the @app.route decorator.
+    """
+    view.read_only = True
+    return view
+
+
+def reads_from_replica():
+    """
+    Whether the current request's queries are sent to the replica. Requests to
+    read only views are, unless the user wrote to the database in the last
+    READ_YOUR_WRITES_WINDOW seconds - the replica may not have their changes yet.
+
+    Returns:
+    - bool: True to read from the replica.
+    """
+    if not has_request_context():
+        return False
+
+    view = app.view_functions.get(request.endpoint)
+    if not getattr(view, "read_only", False):
+        return False
+
+    last_write = session.get("last_write")
+    return (
+        last_write is None
+        or time.time() - last_write > app.config["READ_YOUR_WRITES_WINDOW"]
+    )
+
+
+class RoutingSession(Session):
+    """
+    Sends the reads of read only views to the replica bind, everything else
+    (including anything they write) to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+            and reads_from_replica()
+        ):
+            return self._db.engines["replica"]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def record_flush(db_session, flush_context):
+    db_session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def record_statement(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def record_write(db_session):
+    """
+    Remembers when the user last changed something, so their reads go to the
+    primary until the replica has caught up.
+    """
+    if db_session.info.pop("wrote", False) and has_request_context():
+        session["last_write"] = time.time()
+
+
+def as_utc(moment):
+    """
+    Returns a datetime read from the database in UTC. SQLite returns naive
+    datetimes, which are stored in UTC.
+
+    Args:
+    - moment (datetime): The datetime read from the database.
+
+    Returns:
+    - datetime: The same moment, in UTC.
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.astimezone(datetime.timezone.utc)
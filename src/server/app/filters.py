@@ -0,0 +1,270 @@
+from app import app, db
+from sqlalchemy import event
+import datetime
+import time
+
+# Models
+from .models import Items, Middle_type, Types, Bidding_history
+
+
+def available_listings():
+    """
+    Builds the query of the items open for bidding: live (see Items.Is_live) and
+    not yet ended. Served by the ix_items_live partial index.
+
+    Returns:
+    - Query: The available items.
+    """
+    return Items.query.filter(
+        Items.Is_live == True,
+        Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+def price_filter(min_price=None, max_price=None):
+    """
+    Builds the condition on an item's price, the higher of its current bid and
+    minimum price. Uses the indexed Effective_price column.
+
+    Args:
+    - min_price (float): The lowest price, or None for no lower bound.
+    - max_price (float): The highest price, or None for no upper bound.
+
+    Returns:
+    - ColumnElement: The SQL condition.
+    """
+    conditions = []
+    if min_price is not None:
+        conditions.append(Items.Effective_price >= min_price)
+    if max_price is not None:
+        conditions.append(Items.Effective_price <= max_price)
+
+    return db.and_(db.true(), *conditions)
+
+
+# Tag names and how many items have each tag, loaded on first use and shared by
+# all requests
+_tag_cache = {"tags": None, "loaded_at": 0}
+
+
+def tag_stats():
+    """
+    Retrieves every tag's name and item count, from memory unless the cache is
+    older than TAG_CACHE_TIMEOUT. There are few tags and they rarely change.
+
+    Returns:
+    - dict: "names" maps each Type_id to its lower case Type_name, "counts" maps
+      each Type_id to its number of items and "items" is the number of items.
+    """
+    if (
+        _tag_cache["tags"] is None
+        or time.monotonic() - _tag_cache["loaded_at"] > app.config["TAG_CACHE_TIMEOUT"]
+    ):
+        _tag_cache["tags"] = {
+            "names": {
+                type_id: name.lower()
+                for type_id, name in db.session.query(Types.Type_id, Types.Type_name)
+            },
+            "counts": dict(
+                db.session.query(Middle_type.Type_id, db.func.count()).group_by(
+                    Middle_type.Type_id
+                )
+            ),
+            "items": db.session.query(db.func.count(Items.Item_id)).scalar(),
+        }
+        _tag_cache["loaded_at"] = time.monotonic()
+
+    return _tag_cache["tags"]
+
+
+def clear_tag_cache(*args, **kwargs):
+    """
+    Forgets the cached tags, so they are reloaded on next use.
+    """
+    _tag_cache["tags"] = None
+
+
+# Tags changed by this process are seen straight away
+for change in ("after_insert", "after_update", "after_delete"):
+    event.listen(Types, change, clear_tag_cache)
+event.listen(db.metadata, "after_create", clear_tag_cache)
+
+
+def parse_categories(categories_str):
+    """
+    Splits a comma separated list of categories, ignoring blank ones.
+
+    Args:
+    - categories_str (str): The categories sent by the client, may be None.
+
+    Returns:
+    - list: The category names.
+    """
+    return [
+        category.strip()
+        for category in (categories_str or "").split(",")
+        if category.strip()
+    ]
+
+
+def resolve_categories(categories):
+    """
+    Resolves category names to the IDs of the tags containing them, e.g.
+    "shoes" to the IDs of "Running Shoes" and "Shoes".
+
+    Args:
+    - categories (list): The category names.
+
+    Returns:
+    - list: A set of Type_ids for each category, in the same order.
+    """
+    names = tag_stats()["names"]
+    return [
+        {type_id for type_id, name in names.items() if category in name}
+        for category in (category.strip().lower() for category in categories)
+    ]
+
+
+def category_filter(categories, match_all=False):
+    """
+    Builds the condition matching items tagged with any (or all) of the given
+    categories. The categories are resolved to tag IDs in memory, so the query
+    only looks up Middle_type by Type_id.
+
+    Args:
+    - categories (list): The category names.
+    - match_all (bool): Whether items must have a tag in every category, rather
+      than in any of them.
+
+    Returns:
+    - ColumnElement: The SQL condition.
+    """
+    type_ids = resolve_categories(categories)
+    if match_all:
+        if not all(type_ids):
+            return db.false()
+    else:
+        type_ids = [set().union(*type_ids)]
+        if not type_ids[0]:
+            return db.false()
+
+    def tagged_with(ids):
+        return (
+            db.exists()
+            .where(Middle_type.Item_id == Items.Item_id, Middle_type.Type_id.in_(ids))
+            .correlate(Items)
+        )
+
+    # Number of items with a tag in each group, and the share of items expected to
+    # match them all (treating categories as independent)
+    stats = tag_stats()
+    tagged = [
+        sum(stats["counts"].get(type_id, 0) for type_id in ids) for ids in type_ids
+    ]
+    share = 1.0
+    for count in tagged:
+        share *= min(1.0, count / max(stats["items"], 1))
+
+    # Listings are walked in order of when they end, checking each one's tags,
+    # when a page is expected sooner than the rarest category's items are read
+    if share * min(tagged) > app.config["PAGE_SIZE"]:
+        return db.and_(*(tagged_with(ids) for ids in type_ids))
+
+    # Otherwise the rarest category's items are looked up by tag ID first, through
+    # ix_middle_type_type_item, and checked for the other categories
+    rarest = min(range(len(type_ids)), key=tagged.__getitem__)
+    return db.and_(
+        Items.Item_id.in_(
+            db.select(Middle_type.Item_id).where(
+                Middle_type.Type_id.in_(type_ids[rarest])
+            )
+        ),
+        *(tagged_with(ids) for i, ids in enumerate(type_ids) if i != rarest),
+    )
+
+
+# Bid statuses a user's bids can be filtered by
+BID_STATUSES = ("won", "payment_failed", "expired", "out_bid")
+
+
+def bid_status_conditions(bid_status):
+    """
+    Builds the conditions on a user's bid (joined to its item) for the bid to
+    have the given status:
+    - won: the auction ended and the bid won it.
+    - payment_failed: the auction ended on the bid, but it was not paid.
+    - expired: the auction ended.
+    - out_bid: another user bid higher, whether or not the auction ended.
+
+    Args:
+    - bid_status (str): One of BID_STATUSES.
+
+    Returns:
+    - list: The SQL conditions.
+    """
+    ended = Items.Available_until < datetime.datetime.now(datetime.timezone.utc)
+
+    if bid_status == "won":
+        return [
+            ended,
+            Bidding_history.Successful_bid == True,
+            Bidding_history.Winning_bid == True,
+        ]
+    elif bid_status == "payment_failed":
+        return [
+            ended,
+            Bidding_history.Successful_bid == True,
+            Bidding_history.Winning_bid.isnot(True),
+        ]
+    elif bid_status == "expired":
+        return [ended]
+    elif bid_status == "out_bid":
+        return [Bidding_history.Successful_bid == False]
+
+    raise ValueError(f"Unknown bid status: {bid_status}")
+
+
+def bid_status_filter(user_id, bid_status):
+    """
+    Builds the condition matching the items a user bid on with the given status.
+
+    Args:
+    - user_id (int): The bidder's user ID.
+    - bid_status (str): One of BID_STATUSES.
+
+    Returns:
+    - ColumnElement: The SQL condition.
+    """
+    return (
+        db.exists()
+        .where(
+            Bidding_history.Item_id == Items.Item_id,
+            Bidding_history.Bidder_id == user_id,
+            *bid_status_conditions(bid_status),
+        )
+        .correlate(Items)
+    )
+
+
+def items_with_bid_status(user_id, bid_status):
+    """
+    Finds every item a user bid on with the given status, in a single query over
+    the user's bids (indexed by bidder).
+
+    Args:
+    - user_id (int): The bidder's user ID.
+    - bid_status (str): One of BID_STATUSES.
+
+    Returns:
+    - set: The item IDs.
+    """
+    item_ids = (
+        db.session.query(Bidding_history.Item_id)
+        .join(Items, Items.Item_id == Bidding_history.Item_id)
+        .filter(
+            Bidding_history.Bidder_id == user_id,
+            *bid_status_conditions(bid_status),
+        )
+        .group_by(Bidding_history.Item_id)
+    )
+    return {item_id for (item_id,) in item_ids}
@@ -0,0 +1,160 @@
+from app import app, db
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+import io
+
+# Models
+from .models import Images, Image_variants
+from .blobstore import get_blob_store, read_image
+
+# Bounding boxes of the thumbnails generated for each uploaded image
+THUMBNAIL_SIZES = {
+    "grid": (320, 320),
+    "chat": (480, 480),
+    "detail": (1200, 1200),
+}
+
+# Thumbnails are generated in the background so uploads are not blocked
+thumbnail_executor = ThreadPoolExecutor(
+    max_workers=app.config.get("THUMBNAIL_WORKERS", 2),
+    thread_name_prefix="thumbnails",
+)
+
+# Leading bytes of the image formats that can be uploaded
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+
+def image_url(image_id, variant=None):
+    """
+    Gets the URL an image is served from, for use in listing JSON.
+
+    Args:
+    - image_id (int): The ID of the image, or None if the item has no image.
+    - variant (str): The thumbnail size to serve (see THUMBNAIL_SIZES), or None for the original.
+
+    Returns:
+    - str: The relative URL of the image, or None.
+    """
+    if image_id is None:
+        return None
+
+    if variant:
+        return f"/api/images/{image_id}?variant={variant}"
+
+    return f"/api/images/{image_id}"
+
+
+def guess_mimetype(data):
+    """
+    Determines the mimetype of an image from its leading bytes.
+
+    Args:
+    - data (bytes): The raw image.
+
+    Returns:
+    - str: The image's mimetype, defaults to image/jpeg.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+
+    for signature, mimetype in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+
+    return "image/jpeg"
+
+
+def make_thumbnail(data, size):
+    """
+    Scales an image down to fit inside a bounding box.
+
+    Args:
+    - data (bytes): The original image.
+    - size (tuple): The (width, height) bounding box.
+
+    Returns:
+    - bytes: The encoded thumbnail, or None if the original already fits.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= size[0] and image.height <= size[1]:
+            return None
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.LANCZOS)
+
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            # Keeps transparency
+            image.save(output, format="PNG", optimize=True)
+        else:
+            image.convert("RGB").save(output, format="JPEG", quality=80, optimize=True)
+
+        return output.getvalue()
+
+
+def generate_thumbnails(image_id):
+    """
+    Creates the thumbnail variants of an uploaded image.
+
+    Args:
+    - image_id (int): The ID of the original image.
+    """
+    with app.app_context():
+        try:
+            original = Images.query.filter_by(Image_id=image_id).first()
+            if original is None:
+                return
+
+            original = read_image(original)
+            store = get_blob_store()
+
+            # Makes and stores the thumbnails before writing anything, so the
+            # database is not kept locked while images are resized. Variants the
+            # original already fits point at the original's blob, so they are
+            # cached like any other thumbnail.
+            db.session.rollback()
+            thumbnails = {}
+            for variant, size in THUMBNAIL_SIZES.items():
+                thumbnail = make_thumbnail(original, size)
+                thumbnails[variant] = store.put(
+                    original if thumbnail is None else thumbnail
+                )
+
+            # Removes variants from any earlier run so they are not duplicated,
+            # their blobs are deleted by sweep_blobs if no longer used
+            Image_variants.query.filter_by(Image_id=image_id).delete()
+
+            db.session.add_all(
+                Image_variants(Image_id=image_id, Variant=variant, Image_hash=key)
+                for variant, key in thumbnails.items()
+            )
+
+            db.session.commit()
+
+        # Thumbnails are best-effort, and an error raised here would only be kept
+        # in the future, e.g. Pillow's ValueError or SyntaxError on corrupt files
+        except Exception:
+            db.session.rollback()
+            app.logger.exception(f"Error generating thumbnails for image {image_id}")
+
+
+def queue_thumbnails(image_ids):
+    """
+    Queues thumbnail generation for newly uploaded images on the worker pool.
+
+    Args:
+    - image_ids (list): The IDs of the uploaded images.
+
+    Returns:
+    - list: A future per image, resolved once its thumbnails are stored.
+    """
+    return [
+        thumbnail_executor.submit(generate_thumbnails, image_id)
+        for image_id in image_ids
+    ]
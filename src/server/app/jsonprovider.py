@@ -0,0 +1,110 @@
+from flask.json.provider import DefaultJSONProvider
+import datetime
+import orjson
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = (
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+
+
+def http_date(moment):
+    """
+    Formats a date in HTTP date format, e.g. "Sat, 01 Mar 2025 12:00:00 GMT", the
+    same as werkzeug's http_date but without going through email.utils, which
+    took most of the time spent serializing listings.
+
+    Args:
+    - moment (date): The date or datetime, naive datetimes are taken to be UTC.
+
+    Returns:
+    - str: The formatted date.
+    """
+    if not isinstance(moment, datetime.datetime):
+        moment = datetime.datetime.combine(moment, datetime.time())
+    elif moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc)
+
+    return (
+        f"{DAYS[moment.weekday()]}, {moment.day:02d} {MONTHS[moment.month - 1]} "
+        f"{moment.year:04d} {moment.hour:02d}:{moment.minute:02d}:"
+        f"{moment.second:02d} GMT"
+    )
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Serializes JSON with orjson, which is several times faster than the standard
+    library on large lists of dicts. Selected by setting JSON_PROVIDER to
+    "app.jsonprovider.OrjsonProvider", and also used for Socket.IO packets.
+
+    Gives the same JSON as Flask's provider: keys are sorted, dates (such as
+    Available_until) are sent in HTTP date format, and Decimals and UUIDs as
+    strings. Output is always compact (or indented by 2 spaces), and non-ASCII
+    characters are sent as UTF-8 rather than escaped.
+    """
+
+    # Dates are passed to default() to be formatted the way Flask's provider does
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime.date):
+            return http_date(o)
+
+        return DefaultJSONProvider.default(o)
+
+    def _dumps(self, obj, sort_keys=None, indent=None, default=None):
+        option = self.options
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, default=default or self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serializes data as JSON. Falls back to Flask's provider for options
+        orjson does not have, e.g. cls or an indent other than 2. Separators are
+        ignored, the output is always compact.
+        """
+        kwargs.pop("separators", None)
+        if set(kwargs) - {"sort_keys", "indent", "default"} or kwargs.get(
+            "indent"
+        ) not in (None, 2):
+            return super().dumps(obj, **kwargs)
+
+        return self._dumps(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserializes data as JSON, with Flask's provider if given any options.
+        """
+        if kwargs:
+            return super().loads(s, **kwargs)
+
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """
+        Serializes the arguments as JSON into a response, the same as Flask's
+        provider but without decoding and re-encoding the JSON.
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+
+        return self._app.response_class(
+            self._dumps(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
@@ -0,0 +1,234 @@
+from app import app, db
+from app.cache import tag_versions
+from app.images import image_url
+from sqlalchemy import event
+import collections
+import threading
+
+# Models
+from .models import User, Images, Middle_type, Types
+
+
+def get_first_images(item_ids):
+    """
+    Retrieves the first image of every given item in a single query.
+    Only the image IDs are read, the image bytes are served by /api/images/<id>.
+
+    Args:
+    - item_ids (list): The IDs of the items to fetch images for.
+
+    Returns:
+    - dict: Maps each item ID to its first image's ID.
+    """
+    if not item_ids:
+        return {}
+
+    # The lowest Image_id per item is the image that was uploaded first
+    images = (
+        db.session.query(Images.Item_id, db.func.min(Images.Image_id))
+        .filter(Images.Item_id.in_(item_ids))
+        .group_by(Images.Item_id)
+        .all()
+    )
+
+    return {item_id: image_id for item_id, image_id in images}
+
+
+def get_item_images(item_ids):
+    """
+    Retrieves the URLs and descriptions of all images of the given items in a single query.
+
+    Args:
+    - item_ids (list): The IDs of the items to fetch images for.
+
+    Returns:
+    - dict: Maps each item ID to a list of {"Image", "Image_description"} dictionaries.
+    """
+    if not item_ids:
+        return {}
+
+    images = (
+        db.session.query(Images.Item_id, Images.Image_id, Images.Image_description)
+        .filter(Images.Item_id.in_(item_ids))
+        .order_by(Images.Image_id)
+        .all()
+    )
+
+    images_by_item = {}
+    for item_id, image_id, description in images:
+        images_by_item.setdefault(item_id, []).append(
+            {
+                "Image": image_url(image_id, variant="grid"),
+                "Image_description": description or "No description available",
+            }
+        )
+
+    return images_by_item
+
+
+def get_tags(item_ids):
+    """
+    Retrieves the tag names of every given item in a single query.
+
+    Args:
+    - item_ids (list): The IDs of the items to fetch tags for.
+
+    Returns:
+    - dict: Maps each item ID to a list of its tag names.
+    """
+    if not item_ids:
+        return {}
+
+    tags = (
+        db.session.query(Middle_type.Item_id, Types.Type_name)
+        .join(Types, Types.Type_id == Middle_type.Type_id)
+        .filter(Middle_type.Item_id.in_(item_ids))
+        .order_by(Middle_type.Middle_type_id)
+        .all()
+    )
+
+    tags_by_item = {}
+    for item_id, type_name in tags:
+        tags_by_item.setdefault(item_id, []).append(type_name)
+
+    return tags_by_item
+
+
+def get_sellers(seller_ids):
+    """
+    Retrieves the username and first name of every given seller in a single query.
+
+    Args:
+    - seller_ids (list): The user IDs of the sellers.
+
+    Returns:
+    - dict: Maps each seller ID to a (Username, First_name) tuple.
+    """
+    if not seller_ids:
+        return {}
+
+    sellers = (
+        db.session.query(User.User_id, User.Username, User.First_name)
+        .filter(User.User_id.in_(seller_ids))
+        .all()
+    )
+
+    return {
+        user_id: (username, first_name) for user_id, username, first_name in sellers
+    }
+
+
+def build_listing_cards(items, extra_fields=()):
+    """
+    Builds the listing card dictionaries shown in listing grids.
+
+    The first image, tags and seller of every item are fetched with one
+    query each, so the number of queries does not grow with the number of items.
+
+    Args:
+    - items (list): Items objects to build cards for.
+    - extra_fields (tuple): Names of additional Items columns to include in each card.
+
+    Returns:
+    - list: A card dictionary per item, in the same order as items.
+    """
+    item_ids = [item.Item_id for item in items]
+
+    images = get_first_images(item_ids)
+    tags = get_tags(item_ids)
+    sellers = get_sellers(list({item.Seller_id for item in items}))
+
+    cards = []
+    for item in items:
+        username, first_name = sellers.get(item.Seller_id, (None, None))
+
+        card = {
+            "Item_id": item.Item_id,
+            "Listing_name": item.Listing_name,
+            "Seller_id": item.Seller_id,
+            "Seller_username": username,
+            "Seller_name": first_name,
+            "Available_until": item.Available_until,
+            "Verified": item.Verified,
+            "Min_price": item.Min_price,
+            "Current_bid": item.Current_bid,
+            "Image": image_url(images.get(item.Item_id), variant="grid"),
+            "Tags": tags.get(item.Item_id, []),
+        }
+
+        for field in extra_fields:
+            card[field] = getattr(item, field)
+
+        cards.append(card)
+
+    return cards
+
+
+
+# Listing cards serialized to JSON, keyed by the items' versions and shared by all
+# requests, the least recently used are evicted past CARD_CACHE_SIZE cards
+_card_cache = collections.OrderedDict()
+_card_cache_lock = threading.Lock()
+
+
+def get_card_fragments(items):
+    """
+    Gets the listing card of every item as pre-serialized JSON. A card is built
+    once per version of its item (and of the tag names), so only the cards of
+    items that changed since they were last shown are built again, in one batch.
+
+    Args:
+    - items (list): Items objects to get cards for.
+
+    Returns:
+    - list: The JSON bytes of each item's card, in the same order as items.
+    """
+    (tags_version,) = tag_versions(["tags"]) if items else [None]
+    keys = [(tags_version, item.Item_id, item.Version) for item in items]
+
+    with _card_cache_lock:
+        fragments = [_card_cache.get(key) for key in keys]
+        for key, fragment in zip(keys, fragments):
+            if fragment is not None:
+                _card_cache.move_to_end(key)
+
+    missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+    if missing:
+        cards = build_listing_cards([items[i] for i in missing])
+        for i, card in zip(missing, cards):
+            fragments[i] = app.json.dumps(card, separators=(",", ":")).encode()
+
+        with _card_cache_lock:
+            for i in missing:
+                _card_cache[keys[i]] = fragments[i]
+            while len(_card_cache) > app.config["CARD_CACHE_SIZE"]:
+                _card_cache.popitem(last=False)
+
+    return fragments
+
+
+def clear_card_cache(*args, **kwargs):
+    """
+    Forgets the cached cards, e.g. when the database is recreated and the items'
+    versions start again.
+    """
+    with _card_cache_lock:
+        _card_cache.clear()
+
+
+event.listen(db.metadata, "after_create", clear_card_cache)
+
+
+def listing_cards_response(items):
+    """
+    Builds the JSON response of a listing grid, the same as jsonify() of the
+    items' cards, by joining their pre-serialized JSON.
+
+    Args:
+    - items (list): Items objects to show.
+
+    Returns:
+    - Response: The JSON array of the items' cards.
+    """
+    body = b"[" + b",".join(get_card_fragments(items)) + b"]\n"
+    return app.response_class(body, mimetype=app.json.mimetype)
@@ -0,0 +1,22 @@
+from flask_caching.backends.rediscache import RedisCache
+import fakeredis
+
+
+class LocalRedisCache(RedisCache):
+    """
+    Offline stand-in for a Redis server, so the response cache can be run and
+    tested with Redis as its backend without one. Selected by setting CACHE_TYPE
+    to "app.localredis.LocalRedisCache".
+
+    The data is kept in memory by fakeredis, in a server shared by every
+    LocalRedisCache in the process, as a Redis server is shared by every worker
+    and server using it.
+    """
+
+    server = fakeredis.FakeServer()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs["host"] = fakeredis.FakeStrictRedis(server=cls.server)
+        kwargs["key_prefix"] = config.get("CACHE_KEY_PREFIX")
+        return cls(*args, **kwargs)
@@ -3,6 +3,7 @@ from flask import request, current_app
 from flask_login import current_user
 from app import db, socketio
 from app.models import Chat, ChatMessages
+from app.blobstore import get_blob_store, read_image
 import datetime
 import base64
 import json
@@ -61,7 +62,7 @@ def handle_message(data):
         Chat_id=chat_id,
         Sender_id=current_user.User_id,
         Content=content,
-        Image=image,
+        Image_hash=get_blob_store().put(image) if image else None,
         Timestamp=datetime.datetime.now(datetime.timezone.utc),
         Read=False,
     )
@@ -135,9 +136,10 @@ def handle_get_messages(data):
     message_list = []
     for msg in messages:
         image_data = None
-        if msg.Image:
+        if msg.Image_hash:
+            image = read_image(msg)
             image_data = (
-                f"data:image/jpeg;base64,{base64.b64encode(msg.Image).decode('utf-8')}"
+                f"data:image/jpeg;base64,{base64.b64encode(image).decode('utf-8')}"
             )
 
         message_list.append(
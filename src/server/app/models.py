@@ -1,6 +1,8 @@
 from app import db
 from flask_login import UserMixin
+from sqlalchemy import event
 import datetime
+import hashlib
 
 
 # UserMixin passed to User table for login/authentication functionality
@@ -38,6 +40,12 @@ class User(UserMixin, db.Model):
     Watchlist = db.relationship("Watchlist", backref="user", lazy=True)
     Bidding_history = db.relationship("Bidding_history", backref="user", lazy=True)
 
+    # Users log in and sign up by email or username, which must be unique
+    __table_args__ = (
+        db.Index("ix_user_email", "Email", unique=True),
+        db.Index("ix_user_username", "Username", unique=True),
+    )
+
     # UserMixin get_id functin expects primary key to be named "id".
     # For compatibility with the primary key being name "User_id", this function is required
     def get_id(self):
@@ -56,6 +64,8 @@ class Address(db.Model):
     Postcode = db.Column(db.String(50), nullable=False)
     Is_billing = db.Column(db.Boolean, nullable=False)
 
+    __table_args__ = (db.Index("ix_address_user", "User_id"),)
+
 
 class Payment(db.Model):
     # Columns
@@ -77,11 +87,23 @@ class Items(db.Model):
     Available_until = db.Column(db.DateTime(timezone=True), nullable=False)
     Min_price = db.Column(db.Float, nullable=False)
     Current_bid = db.Column(db.Float, nullable=False)
+    # The listing's price, the current bid or the minimum price if there are no
+    # bids above it yet. Stored and indexed so listings can be filtered by price.
+    Effective_price = db.Column(
+        db.Float,
+        db.Computed(
+            'CASE WHEN "Current_bid" < "Min_price" THEN "Min_price" '
+            'ELSE "Current_bid" END',
+            persisted=True,
+        ),
+    )
     Description = db.Column(db.String(500), nullable=False)
     Structure_id = db.Column(db.Integer, db.ForeignKey("profit_structure.Structure_id"))
     Sold = db.Column(
         db.Boolean, default=False
     )  # this will be used to determine if the item has been sold/charged
+    # Incremented whenever the listing changes, see app/cache.py
+    Version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Item Authentication Fields
     Expert_id = db.Column(db.Integer, db.ForeignKey("user.User_id"), nullable=True)
@@ -89,6 +111,19 @@ class Items(db.Model):
     Authentication_request = db.Column(db.Boolean, nullable=False)
     Authentication_request_approved = db.Column(db.Boolean, nullable=True)
     Second_opinion = db.Column(db.Boolean, nullable=True)
+    # Whether the listing can be shown to buyers, i.e. it is not waiting on an
+    # expert and was either approved or listed without asking for authentication.
+    # Kept up to date by the database whenever the fields above change.
+    Is_live = db.Column(
+        db.Boolean,
+        db.Computed(
+            'CASE WHEN NOT "Authentication_request" AND ('
+            '("Verified" AND "Authentication_request_approved") OR '
+            '(NOT "Verified" AND "Authentication_request_approved" IS NULL)'
+            ") THEN TRUE ELSE FALSE END",
+            persisted=True,
+        ),
+    )
 
     # Relationships
     Images = db.relationship("Images", backref="item", lazy=True)
@@ -96,21 +131,84 @@ class Items(db.Model):
     Watchlist = db.relationship("Watchlist", backref="item", lazy=True)
     Bidding_history = db.relationship("Bidding_history", backref="item", lazy=True)
 
+    # Listings are paged through in order of when they end, and filtered by price.
+    # Live listings have their own partial index, so browsing them does not slow
+    # down as ended and rejected listings build up. Sellers and experts list the
+    # items they are selling or reviewing.
+    __table_args__ = (
+        db.Index("ix_items_available_until", "Available_until", "Item_id"),
+        db.Index("ix_items_effective_price", "Effective_price"),
+        db.Index("ix_items_seller", "Seller_id", "Available_until"),
+        db.Index("ix_items_expert", "Expert_id"),
+        db.Index(
+            "ix_items_live",
+            "Available_until",
+            "Item_id",
+            sqlite_where=db.text('"Is_live" = 1'),
+            postgresql_where=db.text('"Is_live"'),
+        ),
+    )
+
+
+def hash_image(context):
+    """
+    Column default for Image_hash - the SHA-256 of the image bytes.
+    Used as the image's strong ETag when it is served by /api/images/<id>.
+
+    Images kept in the blob store have no Image bytes, their Image_hash is
+    the blob store key and is always set explicitly.
+    """
+    image = context.get_current_parameters().get("Image")
+    if image is None:
+        return None
+
+    return hashlib.sha256(image).hexdigest()
+
 
 class Images(db.Model):
     # Columns
     Image_id = db.Column(db.Integer, primary_key=True)
     Item_id = db.Column(db.Integer, db.ForeignKey("items.Item_id"), nullable=False)
-    Image = db.Column(db.LargeBinary, nullable=False)
+    # Image bytes live in the blob store under Image_hash, Image is only set on
+    # rows created before the move to the blob store
+    Image = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    Image_hash = db.Column(db.String(64), nullable=True, default=hash_image)
     Image_description = db.Column(db.String(100), nullable=False)
 
+    # Indexes for listing an item's images in upload order and for checking
+    # whether a blob is still referenced
+    __table_args__ = (
+        db.Index("ix_images_item", "Item_id", "Image_id"),
+        db.Index("ix_images_hash", "Image_hash"),
+    )
+
+
+class Image_variants(db.Model):
+    # Columns
+    Variant_id = db.Column(db.Integer, primary_key=True)
+    Image_id = db.Column(db.Integer, db.ForeignKey("images.Image_id"), nullable=False)
+    Variant = db.Column(db.String(20), nullable=False)  # grid, detail or chat
+    Image = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    Image_hash = db.Column(db.String(64), nullable=True, default=hash_image)
+
+    # An image has at most one thumbnail of each variant
+    __table_args__ = (
+        db.Index("ix_image_variants_image", "Image_id", "Variant", unique=True),
+        db.Index("ix_image_variants_hash", "Image_hash"),
+    )
+
 
 class Middle_type(db.Model):
     # Columns
     Middle_type_id = db.Column(db.Integer, primary_key=True)
-    Item_id = db.Column(db.Integer, db.ForeignKey("items.Item_id"), nullable=False)
+    Item_id = db.Column(
+        db.Integer, db.ForeignKey("items.Item_id"), nullable=False, index=True
+    )
     Type_id = db.Column(db.Integer, db.ForeignKey("types.Type_id"), nullable=False)
 
+    # Items are filtered by category through their tags' IDs
+    __table_args__ = (db.Index("ix_middle_type_type_item", "Type_id", "Item_id"),)
+
 
 class Types(db.Model):
     # Columns
@@ -124,6 +222,8 @@ class Watchlist(db.Model):
     User_id = db.Column(db.Integer, db.ForeignKey("user.User_id"), nullable=False)
     Item_id = db.Column(db.Integer, db.ForeignKey("items.Item_id"), nullable=False)
 
+    __table_args__ = (db.Index("ix_watchlist_user_item", "User_id", "Item_id"),)
+
 
 class Bidding_history(db.Model):
     # Columns
@@ -141,6 +241,12 @@ class Bidding_history(db.Model):
         db.Boolean, default=False
     )  # true if this bid won the autction for the item
 
+    # Indexes for looking up an item's highest bids and a user's bids on an item
+    __table_args__ = (
+        db.Index("ix_bidding_history_item_price", "Item_id", "Bid_price"),
+        db.Index("ix_bidding_history_bidder_item", "Bidder_id", "Item_id"),
+    )
+
 
 # This is for ID24, enforcing different profit structures for the website
 class Profit_structure(db.Model):
@@ -161,6 +267,10 @@ class Availabilities(db.Model):
     End_time = db.Column(db.Time, nullable=False)
     Week_start_date = db.Column(db.Date, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_availabilities_expert_week", "Expert_id", "Week_start_date"),
+    )
+
 
 class Chat(db.Model):
     Chat_id = db.Column(db.Integer, primary_key=True)
@@ -177,13 +287,19 @@ class Chat(db.Model):
     Item = db.relationship("Items", foreign_keys=[Item_id], backref="sent_chats")
     Messages = db.relationship("ChatMessages", backref="chat", lazy=True)
 
+    # Index for finding the open chat between two users about an item
+    __table_args__ = (
+        db.Index("ix_chat_participants", "Sender_id", "Recipient_id", "Item_id"),
+    )
+
 
 class ChatMessages(db.Model):
     Message_id = db.Column(db.Integer, primary_key=True)
     Chat_id = db.Column(db.Integer, db.ForeignKey("chat.Chat_id"), nullable=False)
     Sender_id = db.Column(db.Integer, db.ForeignKey("user.User_id"), nullable=False)
     Content = db.Column(db.Text, nullable=True)
-    Image = db.Column(db.LargeBinary, nullable=True)
+    Image = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    Image_hash = db.Column(db.String(64), nullable=True, default=hash_image)
     Timestamp = db.Column(
         db.DateTime(timezone=True), default=datetime.datetime.now(datetime.timezone.utc)
     )
@@ -193,6 +309,14 @@ class ChatMessages(db.Model):
     # Relationships
     Sender = db.relationship("User", foreign_keys=[Sender_id], backref="sent_messages")
 
+    # Indexes for loading a chat's messages in order and a sender's unread
+    # messages in a chat
+    __table_args__ = (
+        db.Index("ix_chat_messages_chat", "Chat_id", "Timestamp"),
+        db.Index("ix_chat_messages_unread", "Chat_id", "Sender_id", "Read"),
+        db.Index("ix_chat_messages_hash", "Image_hash"),
+    )
+
 
 class Middle_expertise(db.Model):
     # Columns
@@ -200,10 +324,57 @@ class Middle_expertise(db.Model):
     Expert_id = db.Column(db.Integer, db.ForeignKey("user.User_id"), nullable=False)
     Type_id = db.Column(db.Integer, db.ForeignKey("types.Type_id"), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_middle_expertise_expert_type", "Expert_id", "Type_id"),
+    )
+
 
 class ScheduledTask(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_name = db.Column(db.String(50), nullable=False)
     task_args = db.Column(db.JSON)  # Store arguments as JSON
+    item_id = db.Column(
+        db.Integer, nullable=True, index=True
+    )  # the item the task is for, so each item has at most one pending task
     execute_at = db.Column(db.DateTime(timezone=True), nullable=False)
     completed = db.Column(db.Boolean, default=False)
+    status = db.Column(
+        db.String(20), nullable=False, default="pending"
+    )  # pending, or dead once every retry has failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Index for loading the pending tasks in order on startup
+    __table_args__ = (db.Index("ix_scheduled_task_pending", "status", "execute_at"),)
+
+
+class Catalogue_version(db.Model):
+    # A single row, incremented whenever any listing changes, see app/cache.py
+    Id = db.Column(db.Integer, primary_key=True)
+    Version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# The row is added with the table
+event.listen(
+    Catalogue_version.__table__,
+    "after_create",
+    db.DDL('INSERT INTO catalogue_version ("Id", "Version") VALUES (1, 0)'),
+)
+
+
+class Email_outbox(db.Model):
+    # Columns
+    Email_id = db.Column(db.Integer, primary_key=True)
+    Recipient = db.Column(db.String(50), nullable=False)
+    Subject = db.Column(db.String(200), nullable=False)
+    Body = db.Column(db.Text, nullable=False)
+    Status = db.Column(
+        db.String(20), nullable=False, default="pending"
+    )  # pending, sent, or dead once every retry has failed
+    Attempts = db.Column(db.Integer, nullable=False, default=0)
+    Last_error = db.Column(db.Text, nullable=True)
+    Send_after = db.Column(db.DateTime(timezone=True), nullable=False)
+    Sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    # Index for finding the emails that are due to be sent
+    __table_args__ = (db.Index("ix_email_outbox_pending", "Status", "Send_after"),)
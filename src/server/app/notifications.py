@@ -2,7 +2,7 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
 from flask_login import current_user
 from app import db, socketio
-from app.models import Bidding_history, Items, User
+from app.models import Bidding_history, Items, User, Watchlist
 import datetime
 
 
@@ -18,10 +18,69 @@ def handle_join_notifications():
         join_room(f"user_{current_user.User_id}")
 
 
+def item_room(item_id):
+    """
+    Gets the Socket.IO room of an item. Everyone viewing, bidding on or watching
+    the item is in its room and receives its bid updates.
+    """
+    return f"item_{item_id}"
+
+
 @socketio.on("join_get_bids")
 def handle_join_get_bids():
-    if current_user.is_authenticated:
-        join_room(f"bid_updates_{current_user.User_id}")
+    """
+    Joins the rooms of every item the user has bid on or is watching.
+    """
+    if not current_user.is_authenticated:
+        return
+
+    item_ids = (
+        db.session.query(Bidding_history.Item_id)
+        .filter(Bidding_history.Bidder_id == current_user.User_id)
+        .union(
+            db.session.query(Watchlist.Item_id).filter(
+                Watchlist.User_id == current_user.User_id
+            )
+        )
+        .all()
+    )
+    for (item_id,) in item_ids:
+        join_room(item_room(item_id))
+
+
+def requested_item_id(data):
+    """
+    Gets the item ID sent with a join_item or leave_item event.
+
+    Returns:
+    - int: The item ID, or None if the payload has no valid one.
+    """
+    item_id = data.get("item_id") if isinstance(data, dict) else None
+    if type(item_id) is not int:
+        return None
+
+    return item_id
+
+
+@socketio.on("join_item")
+def handle_join_item(data):
+    """
+    Joins the room of an item while its listing is being viewed.
+    """
+    item_id = requested_item_id(data)
+    if item_id is None:
+        return
+
+    join_room(item_room(item_id))
+
+
+@socketio.on("leave_item")
+def handle_leave_item(data):
+    item_id = requested_item_id(data)
+    if item_id is None:
+        return
+
+    leave_room(item_room(item_id))
 
 
 @socketio.on("place_bid")
@@ -69,16 +128,22 @@ def handle_place_bid(data):
             room=f"user_{previous_bid.Bidder_id}",
         )
 
-    # Notify all users about the update
+    # The bidder now follows the item, so they hear when they are outbid
+    join_room(item_room(item_id))
+
+    # Sends the new price to everyone viewing, bidding on or watching the item.
     # The bid_update event is used in enlargedlisting.jsx to update the current bid
     # displayed to the user and is also used in the currentbids.jsx file to show
     # whether the user is the current highest bidder
-    for user in User.query.all():
-        bidder_id = user.User_id
-        emit(
-            "bid_update",
-            room=f"bid_updates_{bidder_id}",
-        )
+    emit(
+        "bid_update",
+        {
+            "item_id": item.Item_id,
+            "current_bid": item.Current_bid,
+            "bidder_id": current_highest_bid.Bidder_id,
+        },
+        room=item_room(item_id),
+    )
 
 
 @socketio.on("auction_ended")
@@ -0,0 +1,239 @@
+from app import app, db
+from flask import abort, jsonify, make_response, stream_with_context
+import base64
+import datetime
+import itertools
+import json
+
+
+def get_page_size(params):
+    """
+    Reads the requested page size, capped at MAX_PAGE_SIZE.
+
+    Args:
+    - params (dict): The request's query string or JSON body.
+
+    Returns:
+    - int: The number of results to return.
+    """
+    try:
+        limit = int(params.get("limit") or app.config["PAGE_SIZE"])
+    except (TypeError, ValueError):
+        invalid_request("Invalid page size")
+
+    return min(max(limit, 1), app.config["MAX_PAGE_SIZE"])
+
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of the last result of a page as an opaque cursor.
+
+    Args:
+    - values (list): The sort key, datetimes are stored in ISO format.
+
+    Returns:
+    - str: The URL safe cursor.
+    """
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def invalid_request(message):
+    """
+    Stops the request with a 400 response.
+    """
+    abort(make_response(jsonify({"message": message}), 400))
+
+
+def decode_cursor(cursor, length):
+    """
+    Decodes a cursor made by encode_cursor.
+
+    Args:
+    - cursor (str): The cursor sent by the client.
+    - length (int): The number of values the cursor must hold.
+
+    Returns:
+    - list: The sort key of the last result of the previous page, datetimes
+      are still in ISO format.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, AttributeError):
+        invalid_request("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != length:
+        invalid_request("Invalid cursor")
+
+    return values
+
+
+def after_cursor(columns, cursor, descending=False):
+    """
+    Builds the filter that continues a keyset paginated query from a cursor.
+
+    Args:
+    - columns (list): The sort key the cursor was made from.
+    - cursor (str): The cursor sent by the client.
+    - descending (bool): Whether the results are sorted in descending order.
+
+    Returns:
+    - ColumnElement: The filter selecting the rows after the cursor.
+    """
+    values = decode_cursor(cursor, len(columns))
+    try:
+        values = [
+            (
+                datetime.datetime.fromisoformat(value)
+                if column.type.python_type is datetime.datetime
+                else value
+            )
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        invalid_request("Invalid cursor")
+
+    key, values = db.tuple_(*columns), db.tuple_(*values)
+    after = key < values if descending else key > values
+
+    # SQLite seeks the index using the first bound it finds on the column, e.g.
+    # "Available_until > now", hints that the cursor is the tighter bound
+    if db.engine.dialect.name == "sqlite":
+        after = db.func.unlikely(after)
+
+    return after
+
+
+def paginate(query, columns, params, descending=False):
+    """
+    Fetches one page of a query, ordered by a unique sort key. Each page continues
+    from the key of the previous page's last result (keyset pagination), so every
+    page costs the same to fetch, however deep into the results it is.
+
+    Args:
+    - query (Query): The query to page through, its rows must have attributes
+      named after the columns.
+    - columns (list): The sort key, e.g. [Items.Available_until, Items.Item_id],
+      ending with a unique column.
+    - params (dict): The request's query string or JSON body, with the optional
+      "cursor" of the page and "limit" on its size.
+    - descending (bool): Whether to sort the results in descending order.
+
+    Returns:
+    - tuple: The page's rows, and the cursor of the next page (None if this is
+      the last page).
+    """
+    limit = get_page_size(params)
+
+    cursor = params.get("cursor")
+    if cursor:
+        query = query.filter(after_cursor(columns, cursor, descending))
+
+    query = query.order_by(
+        *(column.desc() if descending else column for column in columns)
+    )
+
+    # Fetches one more row than the page size to know if there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def paginate_ranked(query, columns, params):
+    """
+    Fetches one page of results ordered by relevance, best first. Like paginate,
+    each page continues from the sort key of the previous page's last result, but
+    the key (e.g. a search rank) is computed by the query rather than an attribute
+    of its rows, so it is fetched alongside them.
+
+    Args:
+    - query (Query): The query to page through, returning a single entity.
+    - columns (list): The sort key, lowest first, e.g. [rank, Item_id], ending
+      with a unique column.
+    - params (dict): The request's query string or JSON body, with the optional
+      "cursor" of the page and "limit" on its size.
+
+    Returns:
+    - tuple: The page's rows, and the cursor of the next page (None if this is
+      the last page).
+    """
+    limit = get_page_size(params)
+
+    cursor = params.get("cursor")
+    if cursor:
+        query = query.filter(after_cursor(columns, cursor))
+
+    # Fetches one more row than the page size to know if there is a next page
+    rows = query.add_columns(*columns).order_by(*columns).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return [row[0] for row in rows], None
+
+    rows = rows[:limit]
+    return [row[0] for row in rows], encode_cursor(list(rows[-1][1:]))
+
+
+def with_next_cursor(response, cursor):
+    """
+    Sets the X-Next-Cursor header of a paginated response, if there is a next page.
+    """
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return response
+
+
+def wants_stream(params):
+    """
+    Whether a request asked for all of its results, streamed, instead of a page.
+
+    Args:
+    - params (dict): The request's query string or JSON body, with the optional
+      "stream" flag (true, or "true" in a query string).
+
+    Returns:
+    - bool: True to stream the results.
+    """
+    stream = params.get("stream")
+    return stream is True or str(stream).lower() in ("1", "true")
+
+
+def stream_json(query, serialize, key=None):
+    """
+    Streams every row of a query as a JSON array. The rows are read through a
+    server-side cursor STREAM_BATCH_SIZE at a time (yield_per), and each batch is
+    sent as soon as it is serialized, so memory use does not grow with the
+    number of rows and the first rows are sent before the rest are read.
+
+    Args:
+    - query (Query): The rows to send, in order.
+    - serialize (function): Turns a list of rows into a list of JSON
+      serializable values, so a batch's related data can be fetched at once.
+    - key (str): Sends the array as this key of an object, e.g. "sold_items",
+      or None to send the array itself.
+
+    Returns:
+    - Response: The streamed JSON.
+    """
+    batch_size = app.config["STREAM_BATCH_SIZE"]
+
+    def generate():
+        yield b"[" if key is None else b"{" + app.json.dumps(key).encode() + b":["
+
+        rows = iter(query.yield_per(batch_size))
+        separator = b""
+        while batch := list(itertools.islice(rows, batch_size)):
+            # The batch's elements, without the brackets of its array
+            yield separator + app.json.dumps(serialize(batch)).encode()[1:-1]
+            separator = b","
+
+        yield b"]" if key is None else b"]}"
+
+    return app.response_class(
+        stream_with_context(generate()), mimetype=app.json.mimetype
+    )
@@ -0,0 +1,56 @@
+from app import app, stripe
+from werkzeug.utils import import_string
+import threading
+import time
+import uuid
+
+
+class LocalPaymentIntent:
+    """
+    Offline stand-in for stripe.PaymentIntent, so auction settlement can be run
+    and benchmarked without network access. Selected by setting PAYMENT_INTENTS
+    to "app.payments.LocalPaymentIntent".
+
+    Like Stripe, repeating a request with the same idempotency key returns the
+    original payment intent instead of charging again. The payment method
+    "pm_card_chargeDeclined" is declined, as it is in Stripe's test mode.
+    """
+
+    # Payment intents created so far, by idempotency key
+    intents = {}
+    lock = threading.Lock()
+
+    def __init__(self, amount, currency, customer):
+        self.id = f"pi_local_{uuid.uuid4().hex}"
+        self.client_secret = f"{self.id}_secret"
+        self.status = "succeeded"
+        self.amount = amount
+        self.currency = currency
+        self.customer = customer
+
+    @classmethod
+    def create(cls, amount, currency, idempotency_key=None, **kwargs):
+        # Simulates the round trip to Stripe
+        time.sleep(app.config.get("LOCAL_PAYMENT_LATENCY", 0))
+
+        if kwargs.get("payment_method") == "pm_card_chargeDeclined":
+            raise stripe.error.CardError(
+                "Your card was declined.", None, "card_declined"
+            )
+
+        with cls.lock:
+            if idempotency_key in cls.intents:
+                return cls.intents[idempotency_key]
+
+            intent = cls(amount, currency, kwargs.get("customer"))
+            if idempotency_key is not None:
+                cls.intents[idempotency_key] = intent
+
+            return intent
+
+
+def get_payment_intents():
+    """
+    Gets the PaymentIntent API configured by PAYMENT_INTENTS (Stripe's by default).
+    """
+    return import_string(app.config.get("PAYMENT_INTENTS", "stripe.PaymentIntent"))
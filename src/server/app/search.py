@@ -0,0 +1,468 @@
+from app import app, db
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects import postgresql
+import re
+
+# Models
+from .models import Items, User, Types, Middle_type
+from .pagination import paginate_ranked
+
+# The search document of an item: its name, description and tag names.
+# Used to (re)build the item's row in the items_fts full-text index.
+ITEM_DOCUMENT = """
+    SELECT
+        i.Item_id,
+        i.Listing_name,
+        coalesce(i.Description, ''),
+        coalesce(
+            (
+                SELECT group_concat(t.Type_name, ' ')
+                FROM middle_type m JOIN types t ON t.Type_id = m.Type_id
+                WHERE m.Item_id = i.Item_id
+            ),
+            ''
+        )
+    FROM items i
+"""
+
+
+def reindex_items(item_ids):
+    """
+    Builds the SQL statements (for use in a trigger) that refresh the index rows
+    of the items selected by item_ids, a SQL expression.
+    """
+    return f"""
+        DELETE FROM items_fts WHERE rowid IN ({item_ids});
+        INSERT INTO items_fts (rowid, Listing_name, Description, Tags)
+        {ITEM_DOCUMENT} WHERE i.Item_id IN ({item_ids});
+    """
+
+
+# SQLite FTS5 index over the items, with prefix indexes so that partially typed
+# words are matched quickly. Triggers keep it in sync with items, their tags and
+# tag names, whichever code path changes them.
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        Listing_name, Description, Tags,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    # Indexes existing items when the index is first created
+    f"""
+    INSERT INTO items_fts (rowid, Listing_name, Description, Tags)
+    {ITEM_DOCUMENT} WHERE NOT EXISTS (SELECT 1 FROM items_fts)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    # Bids update items all the time, so only name or description changes reindex
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_update
+    AFTER UPDATE OF Listing_name, Description ON items BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = OLD.Item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_tag_insert AFTER INSERT ON middle_type
+    BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_tag_delete AFTER DELETE ON middle_type
+    BEGIN
+        {reindex_items("OLD.Item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_type_update
+    AFTER UPDATE OF Type_name ON types BEGIN
+        {reindex_items("SELECT Item_id FROM middle_type WHERE Type_id = NEW.Type_id")}
+    END
+    """,
+]
+
+# The search document of a user: their names
+USER_DOCUMENT = """
+    SELECT u.User_id, u.First_name, coalesce(u.Middle_name, ''), u.Surname
+    FROM "user" u
+"""
+
+# Index of user names for managers looking users up, with prefix indexes down to
+# a single letter as names are often searched by their initials
+USER_SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        First_name, Middle_name, Surname,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3 4 5'
+    )
+    """,
+    f"""
+    INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+    {USER_DOCUMENT} WHERE NOT EXISTS (SELECT 1 FROM users_fts)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON "user" BEGIN
+        INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+        {USER_DOCUMENT} WHERE u.User_id = NEW.User_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF First_name, Middle_name, Surname ON "user" BEGIN
+        DELETE FROM users_fts WHERE rowid = NEW.User_id;
+        INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+        {USER_DOCUMENT} WHERE u.User_id = NEW.User_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON "user" BEGIN
+        DELETE FROM users_fts WHERE rowid = OLD.User_id;
+    END
+    """,
+]
+
+for statement in SEARCH_INDEX_DDL + USER_SEARCH_INDEX_DDL:
+    event.listen(
+        db.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+
+# The indexes are not part of the metadata, so they are dropped along with the tables
+for index in ("items_fts", "users_fts"):
+    event.listen(
+        db.metadata,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {index}").execute_if(dialect="sqlite"),
+    )
+
+# The search vectors of item names and descriptions, tag names and user names on
+# PostgreSQL. The queries use the same expressions as the GIN indexes over them,
+# which the planner only uses for an exact match.
+ITEM_VECTOR = """(
+    setweight(to_tsvector('simple', "Listing_name"), 'A')
+    || setweight(to_tsvector('simple', coalesce("Description", '')), 'D')
+)"""
+TAG_VECTOR = """to_tsvector('simple', "Type_name")"""
+USER_VECTOR = """to_tsvector(
+    'simple',
+    "First_name" || ' ' || coalesce("Middle_name", '') || ' ' || "Surname"
+)"""
+
+# PostgreSQL has no FTS5, searches use GIN indexes over the search vectors instead
+POSTGRESQL_SEARCH_INDEX_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin (({ITEM_VECTOR}))",
+    f"CREATE INDEX IF NOT EXISTS ix_types_search ON types USING gin (({TAG_VECTOR}))",
+    f'CREATE INDEX IF NOT EXISTS ix_user_search ON "user" USING gin (({USER_VECTOR}))',
+]
+
+for statement in POSTGRESQL_SEARCH_INDEX_DDL:
+    event.listen(
+        db.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
+
+
+def optimize_search_index():
+    """
+    Merges the search indexes into a single segment each. Every change to an item
+    or user adds a small segment to the index, which slows searches down until they
+    are merged.
+    """
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            for index in ("items_fts", "users_fts"):
+                db.session.execute(
+                    db.text(f"INSERT INTO {index} ({index}) VALUES ('optimize')")
+                )
+            db.session.commit()
+
+
+@app.cli.command("optimize-search-index")
+def optimize_search_index_command():
+    """
+    CLI command to merge the search indexes, e.g. after importing many items.
+    """
+    optimize_search_index()
+    print("Optimized the search indexes.")
+
+
+# Weights of the Listing_name, Description and Tags columns when ranking matches
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+def match_expression(search_query, min_prefix=2):
+    """
+    Turns a search query into an FTS5 query matching rows that contain every
+    word of the query, the words may be partially typed.
+
+    Args:
+    - search_query (str): The text the user searched for.
+    - min_prefix (int): Words shorter than this are matched as whole words. Nearly
+      every item has a word starting with any single letter.
+
+    Returns:
+    - str: The FTS5 query, or None if the search query has no words.
+    """
+    tokens = re.findall(r"\w+", search_query.lower())
+    if not tokens:
+        return None
+
+    return " ".join(
+        f'"{token}"*' if len(token) >= min_prefix else f'"{token}"' for token in tokens
+    )
+
+
+def tsquery_expression(search_query, min_prefix=2):
+    """
+    Turns a search query into a PostgreSQL tsquery, matching rows the same way
+    as match_expression does with FTS5.
+
+    Args:
+    - search_query (str): The text the user searched for.
+    - min_prefix (int): Words shorter than this are matched as whole words.
+
+    Returns:
+    - str: The tsquery, or None if the search query has no words.
+    """
+    tokens = re.findall(r"\w+", search_query.lower())
+    if not tokens:
+        return None
+
+    return " & ".join(
+        f"{token}:*" if len(token) >= min_prefix else token for token in tokens
+    )
+
+
+def ranked_matches(search_query):
+    """
+    Finds and scores the items matching a search query. SQLite searches the
+    items_fts index, other databases use PostgreSQL's full-text search functions.
+
+    Args:
+    - search_query (str): The text the user searched for.
+
+    Returns:
+    - Subquery: Item_id and rank columns, lower ranks are better matches. None if
+      the search query has no words.
+    """
+    if db.engine.dialect.name == "sqlite":
+        match = match_expression(search_query)
+        if match is None:
+            return None
+
+        ranked = db.text(
+            "SELECT rowid AS Item_id,"
+            " bm25(items_fts, :name, :description, :tags) AS rank"
+            " FROM items_fts WHERE items_fts MATCH :match"
+        ).bindparams(
+            match=match,
+            name=SEARCH_WEIGHTS[0],
+            description=SEARCH_WEIGHTS[1],
+            tags=SEARCH_WEIGHTS[2],
+        )
+        return ranked.columns(Item_id=db.Integer, rank=db.Float).subquery("ranked")
+
+    tsquery = tsquery_expression(search_query)
+    if tsquery is None:
+        return None
+
+    return tsvector_matches(tsquery)
+
+
+def tsvector_matches(tsquery):
+    """
+    Finds and scores the items matching a tsquery, weighting their names, tags
+    and descriptions like the FTS5 index does.
+
+    Args:
+    - tsquery (str): The tsquery built by tsquery_expression.
+
+    Returns:
+    - Subquery: Item_id and rank columns, lower ranks are better matches.
+    """
+    tags = (
+        db.select(db.func.string_agg(Types.Type_name, " "))
+        .join(Middle_type, Middle_type.Type_id == Types.Type_id)
+        .where(Middle_type.Item_id == Items.Item_id)
+        .scalar_subquery()
+    )
+    document = (
+        db.func.setweight(db.func.to_tsvector("simple", Items.Listing_name), "A")
+        .op("||")(
+            db.func.setweight(
+                db.func.to_tsvector("simple", db.func.coalesce(tags, "")), "B"
+            )
+        )
+        .op("||")(
+            db.func.setweight(
+                db.func.to_tsvector("simple", db.func.coalesce(Items.Description, "")),
+                "D",
+            )
+        )
+    )
+    query = db.func.to_tsquery("simple", tsquery)
+
+    # ts_rank takes the weights of D, C, B and A labelled words, from 0 to 1
+    name, description, tags_weight = (
+        weight / max(SEARCH_WEIGHTS) for weight in SEARCH_WEIGHTS
+    )
+    weights = db.cast(
+        postgresql.array([description, 0.0, tags_weight, name]),
+        postgresql.ARRAY(db.REAL),
+    )
+
+    # The whole document cannot be indexed, as the tags are in another table. An
+    # item matching the query either matches it by its name and description, or
+    # has a tag with one of the query's words, both found through the GIN indexes.
+    any_word = db.func.to_tsquery("simple", tsquery.replace(" & ", " | "))
+    candidates = db.union(
+        db.select(Items.Item_id).where(db.literal_column(ITEM_VECTOR).op("@@")(query)),
+        db.select(Middle_type.Item_id)
+        .join(Types, Types.Type_id == Middle_type.Type_id)
+        .where(db.literal_column(TAG_VECTOR).op("@@")(any_word)),
+    )
+
+    # ts_rank is higher for better matches. It is a real, cast to double precision
+    # so that it survives being sent back in a page's cursor unchanged.
+    rank = db.cast(-db.func.ts_rank(weights, document, query), db.Double)
+    return (
+        db.select(Items.Item_id.label("Item_id"), rank.label("rank"))
+        .where(Items.Item_id.in_(candidates), document.op("@@")(query))
+        .subquery("ranked")
+    )
+
+
+def matching_items(query, search_query):
+    """
+    Filters a query of items down to those matching a search query.
+
+    Args:
+    - query (Query): A query of Items.
+    - search_query (str): The text the user searched for.
+
+    Returns:
+    - tuple: The matching items, unordered, and their sort key by relevance
+      ([rank, Item_id], best first). None instead of the key if the search query
+      has no words.
+    """
+    ranked = ranked_matches(search_query)
+    if ranked is None:
+        return query.filter(db.false()), None
+
+    # Ties are broken by the index's rowid, which FTS5 reads without a lookup
+    query = query.join(ranked, ranked.c.Item_id == Items.Item_id)
+    return query, [ranked.c.rank, ranked.c.Item_id]
+
+
+def search_items(query, search_query):
+    """
+    Filters a query of items down to those matching a search query, best
+    matches first. Every match is ranked, however broad the search is.
+
+    Args:
+    - query (Query): A query of Items.
+    - search_query (str): The text the user searched for.
+
+    Returns:
+    - Query: The matching items, ranked by relevance.
+    """
+    query, sort_key = matching_items(query, search_query)
+    if sort_key is None:
+        return query
+
+    return query.order_by(*sort_key)
+
+
+def search_page(query, search_query, params):
+    """
+    Fetches one page of the items matching a search query, best matches first.
+    The cursor holds the rank of the page's last item, so later pages do not
+    rank and skip the earlier ones again.
+
+    Args:
+    - query (Query): A query of Items.
+    - search_query (str): The text the user searched for.
+    - params (dict): The request's query string or JSON body, with the optional
+      "cursor" of the page and "limit" on its size.
+
+    Returns:
+    - tuple: The page's items, and the cursor of the next page (None if this is
+      the last page).
+    """
+    query, sort_key = matching_items(query, search_query)
+    if sort_key is None:
+        return [], None
+
+    return paginate_ranked(query, sort_key, params)
+
+
+def search_users(search_query, after=None, limit=None):
+    """
+    Finds the users whose first, middle or last names start with every word of a
+    search query, e.g. "jo sm" finds John Smith.
+
+    Args:
+    - search_query (str): The text the manager searched for.
+    - after (int): Only users with a higher User_id are returned, or None for all.
+    - limit (int): The most users to return, or None for all of them.
+
+    Returns:
+    - Query: The matching users, in order of User_id.
+    """
+    if db.engine.dialect.name == "sqlite":
+        match = match_expression(search_query, min_prefix=1)
+        if match is None:
+            return User.query.filter(db.false())
+
+        # Pages through the index itself, so only the users returned are looked up
+        matched_ids = db.text(
+            "SELECT rowid FROM users_fts WHERE users_fts MATCH :match AND rowid > :after"
+            " ORDER BY rowid LIMIT :limit"
+        ).bindparams(
+            match=match,
+            after=0 if after is None else after,
+            limit=-1 if limit is None else limit,
+        )
+        matched_ids = matched_ids.columns(rowid=db.Integer)
+    else:
+        tsquery = tsquery_expression(search_query, min_prefix=1)
+        if tsquery is None:
+            return User.query.filter(db.false())
+
+        matched_ids = tsvector_user_matches(tsquery, after, limit)
+
+    return User.query.filter(User.User_id.in_(matched_ids)).order_by(User.User_id)
+
+
+def tsvector_user_matches(tsquery, after=None, limit=None):
+    """
+    Finds the IDs of the users whose names match a tsquery, in order of User_id.
+
+    Args:
+    - tsquery (str): The tsquery built by tsquery_expression.
+    - after (int): Only users with a higher User_id are returned, or None for all.
+    - limit (int): The most users to return, or None for all of them.
+
+    Returns:
+    - Select: The matching user IDs.
+    """
+    return (
+        db.select(User.User_id)
+        .where(
+            db.literal_column(USER_VECTOR).op("@@")(
+                db.func.to_tsquery("simple", tsquery)
+            ),
+            User.User_id > (0 if after is None else after),
+        )
+        .order_by(User.User_id)
+        .limit(limit)
+    )
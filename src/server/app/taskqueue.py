@@ -1,8 +1,12 @@
 from app import app, db, stripe, socketio
 import datetime
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.triggers.date import DateTrigger
+from sqlalchemy.exc import OperationalError, ProgrammingError
+import threading
+import time
 
 # Models and other imports
 from .models import (
@@ -19,22 +23,32 @@ from .models import (
     Availabilities,
     Middle_expertise,
     ScheduledTask,
+    Email_outbox,
 )
+from .cache import bump_version, invalidate_item
+from .database import as_utc
+from .payments import get_payment_intents
+from .search import optimize_search_index
+from .blobstore import sweep_blobs
 
 # Email setup
 from flask_mail import Mail, Message
-
-app.config["MAIL_SERVER"] = "smtp.fastmail.com"
-app.config["MAIL_PORT"] = 465
-app.config["MAIL_USERNAME"] = "ebuy@fastmail.com"
-app.config["MAIL_PASSWORD"] = "3d3y6d472e2j7635"
-app.config["MAIL_USE_TLS"] = False
-app.config["MAIL_USE_SSL"] = True
-app.config["MAIL_DEFAULT_SENDER"] = "ebuy@fastmail.com"
+import smtplib
+
+# Can be overridden in config.py, e.g. to use a local debugging SMTP server
+app.config.setdefault("MAIL_SERVER", "smtp.fastmail.com")
+app.config.setdefault("MAIL_PORT", 465)
+app.config.setdefault("MAIL_USERNAME", "ebuy@fastmail.com")
+app.config.setdefault("MAIL_PASSWORD", "3d3y6d472e2j7635")
+app.config.setdefault("MAIL_USE_TLS", False)
+app.config.setdefault("MAIL_USE_SSL", True)
+app.config.setdefault("MAIL_DEFAULT_SENDER", "ebuy@fastmail.com")
 mail = Mail(app)
 
-# Initialize scheduler
-scheduler = BackgroundScheduler()
+# Initialize scheduler, auctions are settled in parallel on its worker pool
+scheduler = BackgroundScheduler(
+    executors={"default": ThreadPoolExecutor(app.config["SETTLEMENT_WORKERS"])}
+)
 
 
 def init_scheduler():
@@ -45,98 +59,253 @@ def init_scheduler():
     if not scheduler.running:
         scheduler.app = app
 
-        # Create tables if they don't exist
-        with app.app_context():
-            db.create_all()
+        scheduler.start()
+
+        try:
+            # Schedules the auctions that were pending when the server last stopped
+            load_scheduled_tasks()
+
+            # Sends any emails left in the outbox
+            wake_outbox()
+        except (OperationalError, ProgrammingError) as e:
+            # The database has not been migrated yet, e.g. the app is being
+            # loaded by `flask db upgrade` itself
+            app.logger.warning(
+                f"Pending tasks not loaded, run `flask db upgrade` first: {e.orig}"
+            )
 
-        # Check for pending tasks every 3 seconds
+        # Merges the search index nightly, while few people are searching
         scheduler.add_job(
-            process_task_queue,
-            trigger=IntervalTrigger(seconds=3),
-            id="task_queue_processor",
+            optimize_search_index,
+            "cron",
+            hour=4,
+            id="optimize_search_index",
+            replace_existing=True,
         )
-        scheduler.start()
 
+        # Deletes image blobs no longer referenced by any image
+        scheduler.add_job(
+            sweep_blobs,
+            "cron",
+            hour=4,
+            minute=30,
+            id="sweep_blobs",
+            replace_existing=True,
+        )
 
-def schedule_auction(item):
+
+def auction_job_id(item_id):
+    return f"auction_{item_id}"
+
+
+def add_auction_job(item_id, execute_at):
     """
-    Schedule an auction to end at its Available_until time
+    Adds (or moves) the job that ends an item's auction. The scheduler sleeps
+    until the earliest job is due, so nothing runs while no auction is ending.
+
+    Args:
+    - item_id (int): The ID of the item.
+    - execute_at (datetime): When the auction ends.
+    """
+    scheduler.add_job(
+        process_auction_ending,
+        trigger=DateTrigger(run_date=as_utc(execute_at)),
+        args=[item_id],
+        id=auction_job_id(item_id),
+        replace_existing=True,
+        # Auctions that ended while the server was down are closed immediately
+        misfire_grace_time=None,
+    )
+
+
+def load_scheduled_tasks():
+    """
+    Adds a job for every pending auction ending stored in the database.
     """
 
     with scheduler.app.app_context():
-        task = ScheduledTask(
-            task_name="process_auction_ending",
-            task_args={"item_id": item.Item_id},
-            execute_at=item.Available_until,
-            completed=False,
+        adopt_legacy_tasks()
+
+        pending_tasks = (
+            db.session.query(ScheduledTask.item_id, ScheduledTask.execute_at)
+            .filter(
+                ScheduledTask.status == "pending",
+                ScheduledTask.task_name == "process_auction_ending",
+            )
+            .order_by(ScheduledTask.execute_at)
+            .all()
         )
-        db.session.add(task)
-        db.session.commit()
+
+    for item_id, execute_at in pending_tasks:
+        add_auction_job(item_id, execute_at)
 
 
-def process_task_queue():
+def adopt_legacy_tasks():
     """
-    Check for tasks that are due to execute
+    Fills in the item_id of auction endings stored before it had a column, when
+    the item was only in task_args, so they are scheduled and closed like the
+    rest. Completed tasks are deleted, as they are now once processed.
     """
+    legacy_tasks = ScheduledTask.query.filter(
+        ScheduledTask.item_id.is_(None),
+        ScheduledTask.status == "pending",
+        ScheduledTask.task_name == "process_auction_ending",
+    ).all()
 
-    with scheduler.app.app_context():
-        now = datetime.now(timezone.utc)
-        due_tasks = ScheduledTask.query.filter(
-            ScheduledTask.execute_at <= now, ScheduledTask.completed == False
-        ).all()
+    for task in legacy_tasks:
+        task.item_id = (task.task_args or {}).get("item_id")
+        if task.completed:
+            db.session.delete(task)
+        elif task.item_id is None:
+            task.status = "dead"
+            task.last_error = "No item_id in task_args"
 
-        for task in due_tasks:
-            try:
-                if task.task_name == "process_auction_ending":
-                    item = Items.query.filter_by(
-                        Item_id=task.task_args["item_id"]
-                    ).first()
-                    if item:
-                        handle_auction_ending(item)
+    db.session.commit()
 
-                db.session.delete(task)
-                db.session.commit()
 
-            except Exception as e:
-                db.session.rollback()
+def schedule_auction(item):
+    """
+    Schedule an auction to end at its Available_until time.
+    Rescheduling an item replaces its pending task instead of adding another.
+    """
 
+    with scheduler.app.app_context():
+        task = ScheduledTask.query.filter_by(
+            task_name="process_auction_ending", item_id=item.Item_id, status="pending"
+        ).first()
+
+        if task is None:
+            task = ScheduledTask(
+                task_name="process_auction_ending",
+                task_args={"item_id": item.Item_id},
+                item_id=item.Item_id,
+                completed=False,
+                status="pending",
+                attempts=0,
+            )
+            db.session.add(task)
 
-def handle_auction_ending(item):
+        task.execute_at = item.Available_until
+        db.session.commit()
+
+    add_auction_job(item.Item_id, item.Available_until)
+
+
+def process_auction_ending(item_id):
     """
-    Handle the auction ending logic
+    Ends an item's auction once its scheduled time is reached.
+    Runs on the scheduler's worker pool, so many auctions are settled at once.
+
+    Args:
+    - item_id (int): The ID of the item.
     """
 
-    try:
-        # Get winning bid
-        winning_bid = (
-            Bidding_history.query.filter_by(Item_id=item.Item_id)
-            .order_by(Bidding_history.Bid_price.desc())
+    with scheduler.app.app_context():
+        # Claims the task. On databases with row locks, a task another server is
+        # already settling is skipped rather than settled twice.
+        task = (
+            ScheduledTask.query.filter_by(
+                task_name="process_auction_ending", item_id=item_id, status="pending"
+            )
+            .with_for_update(skip_locked=True)
             .first()
         )
+        if task is None:
+            return
+
+        task_id = task.id
+
+        try:
+            # Bids on the item wait until it is settled
+            item = Items.query.filter_by(Item_id=item_id).with_for_update().first()
+            if item:
+                handle_auction_ending(item)
+
+            # The auction drops out of the listings. The sale and the task's
+            # removal are committed together, so the task stays claimed until
+            # the auction is settled.
+            bump_version(item_id)
+            db.session.delete(task)
+            db.session.commit()
 
-        if not winning_bid:
+        except Exception as e:
+            db.session.rollback()
+            retry_task(task_id, e)
             return
 
-        # Process payment
-        charge_success = charge_expired_auction(winning_bid)
-        if not charge_success:
-            raise Exception("Payment processing failed")
+        # Sends the winner's email, queued with the sale
+        wake_outbox()
 
-        # Update item and bid status
-        item.Sold = True
-        winning_bid.Winning_bid = True
 
-        db.session.add(item)
-        db.session.add(winning_bid)
+def retry_task(task_id, error):
+    """
+    Reschedules a failed task with exponential backoff, or marks it as dead once
+    it has failed SETTLEMENT_MAX_ATTEMPTS times.
 
-        # Send notifications
-        send_auction_notifications(item, winning_bid)
+    Args:
+    - task_id (int): The ID of the failed ScheduledTask.
+    - error (Exception): The error the task failed with.
+    """
+    task = db.session.get(ScheduledTask, task_id)
+    if task is None:
+        return
+
+    task.attempts += 1
+    task.last_error = str(error)
 
+    if task.attempts >= app.config["SETTLEMENT_MAX_ATTEMPTS"]:
+        task.status = "dead"
         db.session.commit()
+        print(f"Giving up ending auction for item {task.item_id}: {error}")
+        return
 
-    except Exception as e:
-        db.session.rollback()
-        raise
+    delay = app.config["SETTLEMENT_RETRY_DELAY"] * 2 ** (task.attempts - 1)
+    task.execute_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    db.session.commit()
+
+    print(
+        f"Error ending auction for item {task.item_id}, retrying in {delay}s: {error}"
+    )
+    add_auction_job(task.item_id, task.execute_at)
+
+
+def handle_auction_ending(item):
+    """
+    Handle the auction ending logic. The changes are left for the caller to
+    commit, and any error is raised for it to retry the settlement.
+    """
+
+    # Already settled by an earlier attempt
+    if item.Sold:
+        return
+
+    # Get winning bid
+    winning_bid = (
+        Bidding_history.query.filter_by(Item_id=item.Item_id)
+        .order_by(Bidding_history.Bid_price.desc())
+        .first()
+    )
+
+    if not winning_bid:
+        return
+
+    # The listing and its bidders' histories show it as sold once it is
+    invalidate_item(item.Item_id)
+
+    # Process payment
+    charge_success = charge_expired_auction(winning_bid)
+    if not charge_success:
+        raise Exception("Payment processing failed")
+
+    # Update item and bid status
+    item.Sold = True
+    winning_bid.Winning_bid = True
+
+    db.session.add(item)
+    db.session.add(winning_bid)
+
+    # Send notifications
+    send_auction_notifications(item, winning_bid)
 
 
 def send_auction_notifications(item, winning_bid):
@@ -177,34 +346,152 @@ def send_auction_notifications(item, winning_bid):
         raise Exception("Failed to send notifications")
 
 
-def send_email(recipient, subject, body):
+def queue_email(recipient, subject, body):
     """
-    Sends an email to the specified recipient with the given subject and body.
+    Adds an email to the outbox, in the current transaction. Call wake_outbox()
+    after committing to send it.
 
     Args:
     - subject (str): The subject of the email.
     - recipient (str): The email address of the recipient.
     - body (str): The body of the email.
     """
-    try:
-        msg = Message(subject, recipients=[recipient])
-        msg.body = body
-        mail.send(msg)
-        print("Email sent successfully (in send_email!\n")
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    db.session.add(
+        Email_outbox(
+            Recipient=recipient,
+            Subject=subject,
+            Body=body,
+            Status="pending",
+            Attempts=0,
+            Send_after=datetime.now(timezone.utc),
+        )
+    )
+
 
+# Only one sender runs at a time, a sender woken while another is running waits
+# for it and then sends anything queued in the meantime
+outbox_lock = threading.Lock()
+outbox_wake_lock = threading.Lock()
 
-def charge_user(
-    user_tbc,
-    bid_price,
-):
+
+def wake_outbox(run_at=None):
+    """
+    Schedules the outbox sender to run at the given time (now by default),
+    unless it is already due to run sooner.
+
+    Args:
+    - run_at (datetime): When to send the emails that are due by then.
+    """
+    run_at = as_utc(run_at) if run_at else datetime.now(timezone.utc)
+
+    with outbox_wake_lock:
+        job = scheduler.get_job("outbox_sender")
+        if job is not None and job.next_run_time <= run_at:
+            return
+
+        scheduler.add_job(
+            send_outbox,
+            trigger=DateTrigger(run_date=run_at),
+            id="outbox_sender",
+            replace_existing=True,
+            misfire_grace_time=None,
+            max_instances=2,
+        )
+
+
+def send_outbox():
+    """
+    Sends the emails in the outbox that are due. Each batch of OUTBOX_BATCH_SIZE
+    emails is sent over a single SMTP connection, at most OUTBOX_RATE_LIMIT emails
+    a second. Failed emails are retried with exponential backoff.
+    """
+
+    with outbox_lock, scheduler.app.app_context():
+        interval = 1 / app.config["OUTBOX_RATE_LIMIT"]
+        last_sent = 0
+
+        while True:
+            # Emails being sent by another server are locked and skipped
+            batch = (
+                Email_outbox.query.filter(
+                    Email_outbox.Status == "pending",
+                    Email_outbox.Send_after <= datetime.now(timezone.utc),
+                )
+                .order_by(Email_outbox.Send_after, Email_outbox.Email_id)
+                .limit(app.config["OUTBOX_BATCH_SIZE"])
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not batch:
+                break
+
+            remaining = list(batch)
+            try:
+                with mail.connect() as connection:
+                    while remaining:
+                        email = remaining[0]
+
+                        # Rate limits the emails sent
+                        time.sleep(max(0, last_sent + interval - time.monotonic()))
+                        last_sent = time.monotonic()
+
+                        try:
+                            message = Message(
+                                email.Subject, recipients=[email.Recipient]
+                            )
+                            message.body = email.Body
+                            connection.send(message)
+
+                            email.Status = "sent"
+                            email.Sent_at = datetime.now(timezone.utc)
+                        except smtplib.SMTPRecipientsRefused as e:
+                            # Only this email failed, the connection can be reused
+                            retry_email(email, e)
+
+                        remaining.pop(0)
+
+            except Exception as e:
+                # Connecting failed or the connection was lost
+                print(f"Error sending emails: {e}")
+                for email in remaining:
+                    retry_email(email, e)
+
+            db.session.commit()
+
+        # Wakes up again when the next failed email is due to be retried
+        next_retry = (
+            db.session.query(db.func.min(Email_outbox.Send_after))
+            .filter(Email_outbox.Status == "pending")
+            .scalar()
+        )
+
+    if next_retry is not None:
+        wake_outbox(next_retry)
+
+
+def retry_email(email, error):
+    """
+    Reschedules a failed email with exponential backoff, or marks it as dead once
+    it has failed OUTBOX_MAX_ATTEMPTS times.
+    """
+    email.Attempts += 1
+    email.Last_error = str(error)
+
+    if email.Attempts >= app.config["OUTBOX_MAX_ATTEMPTS"]:
+        email.Status = "dead"
+        print(f"Giving up sending email {email.Email_id}: {error}")
+        return
+
+    delay = app.config["OUTBOX_RETRY_DELAY"] * 2 ** (email.Attempts - 1)
+    email.Send_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+def charge_user(user_tbc, bid_price, idempotency_key=None):
     """
     Args:
     - user_tbc: user to be charged
     - bid_price: price to be charged
+    - idempotency_key: retrying a charge with the same key does not charge again
     Charges the user for an auction item
 
     Returns:
@@ -218,7 +505,7 @@ def charge_user(
     # bidder_id = None # user id to be charged
     try:
 
-        payment_intent = stripe.PaymentIntent.create(
+        payment_intent = get_payment_intents().create(
             amount=int(bid_price * 100),  # convert to pence
             currency="gbp",
             confirm=True,
@@ -226,6 +513,7 @@ def charge_user(
             payment_method=user_tbc.Payment_method_ID,
             receipt_email=user_tbc.Email,
             automatic_payment_methods={"enabled": True, "allow_redirects": "never"},
+            idempotency_key=idempotency_key,
         )
         print("Charged user in charge_user()!\n")
         return {
@@ -241,48 +529,45 @@ def charge_user(
 
 def charge_expired_auction(bid_details):
     """
-    Check expired auctions and charge the highest bidder for each item.
+    Charges the highest bidder of an expired auction, and marks the item as sold
+    in the current transaction. Errors are raised for the settlement to retry.
+
+    Returns:
+    - bool: Whether the bidder was charged.
     """
     bidder = User.query.filter_by(User_id=bid_details.Bidder_id).first()
     bid_price = bid_details.Bid_price
 
-    if bidder:
-        # Call the charge function
-        try:
-            charge_response = charge_user(bidder, bid_price)
-            if charge_response["success"] == True:
-
-                # After charging the user, update the item status: Sold = True
-                item = Items.query.filter_by(Item_id=bid_details.Item_id).first()
-                item.Sold = True
-                bid_details.Winning_bid = True
-
-                db.session.commit()
-                # send email to user
-                email_body = (
-                    "Congratulations "
-                    + bidder.First_name
-                    + "! You have won the auction for the item "
-                    + item.Listing_name
-                    + " at a price of £"
-                    + str(bid_price)
-                    + "."
-                )
-
-                email_sent = send_email(bidder.Email, "Auction Won!", email_body)
-
-                if email_sent == True:
-                    print("Email sent successfully!\n")
-                    return True
-                else:
-                    print("Error sending email!\n")
-                    raise Exception("Failed to send email")
+    if not bidder:
+        return False
 
-            else:
-                raise Exception("Failed to charge user")
+    # One key per winning bid, so a retried settlement never charges twice
+    charge_response = charge_user(
+        bidder,
+        bid_price,
+        idempotency_key=f"auction_{bid_details.Item_id}_bid_{bid_details.Bid_id}",
+    )
+    if not charge_response["success"]:
+        return False
 
-        except Exception as e:
-            pass
+    # After charging the user, update the item status: Sold = True
+    item = Items.query.filter_by(Item_id=bid_details.Item_id).first()
+    item.Sold = True
+    bid_details.Winning_bid = True
+
+    # Queues the email to the user in the same transaction, so it is sent once
+    # (and only if) the sale is committed
+    email_body = (
+        "Congratulations "
+        + bidder.First_name
+        + "! You have won the auction for the item "
+        + item.Listing_name
+        + " at a price of £"
+        + str(bid_price)
+        + "."
+    )
+    queue_email(bidder.Email, "Auction Won!", email_body)
+    return True
 
 
 # Milas Code - not used
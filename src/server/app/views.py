@@ -1,8 +1,43 @@
 from app import app, db, admin, stripe
 from app.notifications import *
-import base64
 import datetime
+import hashlib
+import io
 from app.taskqueue import schedule_auction
+from app.bidding import record_bid
+from app.search import search_items, search_page, search_users
+from app.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_page_size,
+    invalid_request,
+    paginate,
+    stream_json,
+    wants_stream,
+    with_next_cursor,
+)
+from app.listings import (
+    build_listing_cards,
+    get_item_images,
+    listing_cards_response,
+)
+from app.filters import (
+    BID_STATUSES,
+    available_listings,
+    bid_status_filter,
+    category_filter,
+    items_with_bid_status,
+    parse_categories,
+    price_filter,
+)
+from app.blobstore import get_blob_store
+from app.database import as_utc, read_only
+from app.images import (
+    image_url,
+    guess_mimetype,
+    queue_thumbnails,
+    THUMBNAIL_SIZES,
+)
 
 # Flask related imports
 from flask import (
@@ -12,6 +47,7 @@ from flask import (
     redirect,
     url_for,
     send_file,
+    make_response,
     Flask,
     jsonify,
     session,
@@ -25,9 +61,15 @@ from sqlalchemy import and_, exists
 
 # Cache related imports
 from sqlalchemy.orm import joinedload
-from flask_caching import Cache
-
-cache = Cache(app, config={"CACHE_TYPE": "simple"})
+from app.cache import (
+    bump_version,
+    cached_view,
+    catalogue_version,
+    conditional_view,
+    invalidate,
+    invalidate_item,
+    item_version,
+)
 
 # Models, forms and database related imports
 from .models import (
@@ -36,6 +78,7 @@ from .models import (
     Payment,
     Items,
     Images,
+    Image_variants,
     Middle_type,
     Types,
     Watchlist,
@@ -51,12 +94,16 @@ from sqlalchemy import func
 # Security related imports
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException
 
 
 # Debug and loggin related imports
 import traceback
 import logging
 
+# Image responses are cached by the browser for a year
+IMAGE_MAX_AGE = 365 * 24 * 60 * 60
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -304,53 +351,6 @@ def create_setup_intent():
         return jsonify({"error": e}), 400
 
 
-def update_item_bid(item_id, bid_amount, user_id):
-    """
-    Updates the current bid of an item in the database.
-
-    Args:
-    - item_id (int): The ID of the item to update.
-    - bid_amount (float): The new bid amount.
-    - user_id (int): The ID of the user placing the bid.
-    """
-    try:
-        print("Updating item bid...\n")
-        logger.error("Updating item bid...\n")
-        # Updates the item's current bid
-        item = Items.query.filter_by(Item_id=item_id).first()
-        item.Current_bid = bid_amount
-        db.session.commit()
-
-        # makes previous bid (if exists) unsuccessful
-        prev_bid = (
-            Bidding_history.query.filter_by(Item_id=item_id, Successful_bid=True)
-            .order_by(Bidding_history.Bid_datetime.desc())
-            .first()
-        )
-        if prev_bid is not None:
-            prev_bid.Successful_bid = False
-            db.session.commit()
-
-        # Adds the new bid to the bidding history
-        new_bid = Bidding_history(
-            Item_id=item_id,
-            Bidder_id=user_id,
-            Successful_bid=True,
-            Bid_datetime=datetime.datetime.now(datetime.timezone.utc),
-            Winning_bid=False,
-            Bid_price=bid_amount,
-        )
-
-        # Adds the user to the database and commits the changes
-        db.session.add(new_bid)
-        db.session.commit()
-        print("Updated item bid successfully!\n")
-    except Exception as e:
-        logger.error(f"Error: {e}")
-        logger.error(traceback.format_exc())
-        print(f"Error: {e}")
-
-
 @app.route("/api/place-bid", methods=["POST"])
 def place_bid():
     """
@@ -385,8 +385,10 @@ def place_bid():
         if float(bid_amount) <= float(item.Current_bid):
             return jsonify({"message": "Bid must be higher than the current bid"}), 400
 
-        # Place the bid and update the item price
-        update_item_bid(item_id, bid_amount, user_id)
+        # Place the bid and update the item price, fails if a higher bid was
+        # placed since the item was read
+        if not record_bid(item_id, user_id, bid_amount):
+            return jsonify({"message": "Bid must be higher than the current bid"}), 400
 
         return jsonify({"message": "Bid placed successfully"}), 200
     except Exception as e:
@@ -422,32 +424,45 @@ def get_current_user():
 
 @app.route("/api/get_all_users", methods=["POST"])
 def get_all_users():
-    print("Wuery reached")
+    """
+    Retrieves a page of users, in order of user ID.
 
-    users = User.query.all()
-    print("USERS:", users)
-    user_details_list = []
+    Request Body (JSON):
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of users per page.
+    - stream (bool): Optional, streams every user instead of a page.
 
-    if not users:
-        return jsonify({"message": "No users found"}), 404
+    Returns:
+        json_object: list of the users' details, X-Next-Cursor is set if there are more
+        status_code: HTTP status code (200 for success, 404 if there are no users)
+    """
+
+    def user_details(users):
+        return [
+            {
+                "User_id": user.User_id,
+                "First_name": user.First_name,
+                "Middle_name": user.Middle_name,
+                "Surname": user.Surname,
+                "DOB": user.DOB.strftime("%Y-%m-%d"),
+                "Email": user.Email,
+                "Username": user.Username,
+                "Level_of_access": user.Level_of_access,
+                "is_expert": user.Is_expert,
+            }
+            for user in users
+        ]
 
-    for user in users:
+    params = request.get_json(silent=True) or {}
+    if wants_stream(params):
+        return stream_json(User.query.order_by(User.User_id), user_details), 200
 
-        user_details_dict = {
-            "User_id": user.User_id,
-            "First_name": user.First_name,
-            "Middle_name": user.Middle_name,
-            "Surname": user.Surname,
-            "DOB": user.DOB.strftime("%Y-%m-%d"),
-            "Email": user.Email,
-            "Username": user.Username,
-            "Level_of_access": user.Level_of_access,
-            "is_expert": user.Is_expert,
-        }
-        user_details_list.append(user_details_dict)
-    print(user_details_list)
+    users, next_cursor = paginate(User.query, [User.User_id], params)
+
+    if not users and not params.get("cursor"):
+        return jsonify({"message": "No users found"}), 404
 
-    return jsonify(user_details_list), 200
+    return with_next_cursor(jsonify(user_details(users)), next_cursor), 200
 
 
 @app.route("/api/get-user-details", methods=["POST"])
@@ -640,6 +655,21 @@ def update_user_details():
         user.Surname = data["Surname"].capitalize()
         user.DOB = DOB
 
+        # The user's name is shown on the listings they sell, and the ones they won
+        item_ids = [
+            item_id
+            for item_id, in Items.query.with_entities(Items.Item_id)
+            .filter(Items.Seller_id == user_id)
+            .union(
+                Bidding_history.query.with_entities(Bidding_history.Item_id).filter(
+                    Bidding_history.Bidder_id == user_id,
+                    Bidding_history.Winning_bid.is_(True),
+                )
+            )
+        ]
+        bump_version(*item_ids)
+        invalidate(*(f"item:{item_id}" for item_id in item_ids))
+
         db.session.commit()
 
         return jsonify({"message": "Details Updated Successfully"}), 200
@@ -695,162 +725,110 @@ def update_level():
 
 @app.route("/api/get_bid_filtering", methods=["POST"])
 def get_bid_filtering():
+    """
+    Filters the given listings down to those the logged in user bid on with the
+    selected bid status.
+
+    Request Body (JSON):
+    - bid_status (str): One of won, payment_failed, expired or out_bid.
+    - listing_Ids (list): The IDs of the listings to filter.
+
+    Returns:
+        json_object: list of the matching listing IDs, in the order they were given
+        status_code: HTTP status code (200 for success,
+                     401 if not logged in)
+    """
+    if not current_user.is_authenticated:
+        return jsonify({"message": "Not logged in"}), 401
 
     data = request.json
     bid_status_selected = data.get("bid_status", "")
 
     listing_Ids = data.get("listing_Ids", [])
     listing_Ids = list(map(int, listing_Ids))
-    filtered_listing_Ids = []
-    # print(bid_status_selected)
-    user_id = current_user.User_id
 
-    for Id in listing_Ids:
-        bid_table = (
-            db.session.query(
-                Items.Item_id,
-                Items.Available_until,
-                Bidding_history.Successful_bid,
-                Bidding_history.Winning_bid,
-            )
-            .join(Bidding_history, Items.Item_id == Bidding_history.Item_id)
-            .filter(Bidding_history.Bidder_id == user_id, Items.Item_id == Id)
-            .all()
-        )
+    if bid_status_selected not in BID_STATUSES:
+        return jsonify([])
 
-
-        # print("BID", bid_table)
-        for item_id, available_until, successful_bid, winning_bid in bid_table:
-            # Condition to check if the bid has expired
-            if available_until.replace(
-                tzinfo=datetime.timezone.utc
-            ) < datetime.datetime.now(
-                datetime.timezone.utc
-            ):  # Check if the bid has expired, won is only possible after expired
-                if bid_status_selected:  # Ensure bid_status_selected is not None
-                    if bid_status_selected == "won":
-                        if successful_bid == True and winning_bid == True:
-                            filtered_listing_Ids.append(Id)
-
-                    elif bid_status_selected == "payment_failed":
-                        if successful_bid == True and winning_bid != True:
-                            filtered_listing_Ids.append(Id)
-
-                    elif bid_status_selected == "expired":
-                        filtered_listing_Ids.append(Id)
-
-                    if bid_status_selected == "out_bid":
-                        if successful_bid == False:
-                            filtered_listing_Ids.append(Id)
-            else:
-                # out bid possible even when item is not expired
-                if bid_status_selected == "out_bid":
-                    print("in out_bid, checking succesful_bid", successful_bid)
-                    if successful_bid == False:
-                        filtered_listing_Ids.append(Id)
+    # Classifies all of the user's bids in one query, however many IDs are sent
+    matching_Ids = items_with_bid_status(current_user.User_id, bid_status_selected)
+    filtered_listing_Ids = [Id for Id in listing_Ids if Id in matching_Ids]
 
     return jsonify(filtered_listing_Ids)
 
 
 @app.route("/api/get_category_filters", methods=["POST"])
+@read_only
+@conditional_view(catalogue_version)
 def get_category_filters():
+    """
+    Retrieves a page of the available items with a tag matching any (or all) of the
+    given categories, in order of when they end.
+
+    Request Body (JSON):
+    - categories (str): Comma separated categories, all available items are returned if empty.
+    - category_match (str): Optional, "all" to only return items with a tag matching
+      every category, "any" by default.
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of items per page.
+
+    Returns:
+        json_object: list of listing cards, X-Next-Cursor is set if there are more
+        status_code: HTTP status code (200 for success)
+    """
     data = request.json
-    categories_str = data.get("categories", "")
-    categories_list = categories_str.split(",") if categories_str else []
+    categories_list = parse_categories(data.get("categories"))
 
     # Query all available items efficiently
-    available_items = (
-        db.session.query(Items)
-        .join(User, Items.Seller_id == User.User_id)
-        .filter(
-
-            Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
-            db.or_(
-                db.and_(
-                    Items.Authentication_request == False,
-                    Items.Verified == True,
-                    Items.Authentication_request_approved == True,
-                ),
-                db.and_(
-                    Items.Authentication_request == False,
-                    Items.Verified == False,
-                    Items.Authentication_request_approved == None,
-                ),
-            ),
-        )
-        .options(joinedload(Items.seller))  # Preload seller data
-        .all()
-    )
+    available_items = available_listings()
 
-    # If no categories are selected, return all available items
-    if not categories_list:
-        return _generate_response(available_items)
-
-    # Query item types and filter by category using SQL
-    filtered_ids = set()
-    for category in categories_list:
-        matching_items = (
-            db.session.query(Items.Item_id)
-            .join(Middle_type, Middle_type.Item_id == Items.Item_id)
-            .join(Types, Types.Type_id == Middle_type.Type_id)
-            .filter(Types.Type_name.ilike(f"%{category}%"))  # SQL filtering
-            .all()
+    # Filters by the categories' tag IDs in SQL if any categories are selected
+    if categories_list:
+        available_items = available_items.filter(
+            category_filter(categories_list, data.get("category_match") == "all")
         )
-        filtered_ids.update(item_id for item_id, in matching_items)
-
-    # If no matching items found for given categories, return empty response
-    if not filtered_ids:
-        return _generate_response([])
 
-    # Get items that match the filtered IDs and are available
-    filtered_items = [item for item in available_items if item.Item_id in filtered_ids]
+    items, next_cursor = paginate(
+        available_items, [Items.Available_until, Items.Item_id], data
+    )
 
-    return _generate_response(filtered_items)
+    response, status = _generate_response(items)
+    return with_next_cursor(response, next_cursor), status
 
 
 def _generate_response(items):
     """Helper function to format and return JSON response."""
-    item_ids = [item.Item_id for item in items]
-
-    # Fetch images in a single query
-    images = {
-        img.Item_id: base64.b64encode(img.Image).decode("utf-8")
-        for img in Images.query.filter(Images.Item_id.in_(item_ids)).all()
-    }
-
-    items_list = [
-        {
-            "Item_id": item.Item_id,
-            "Seller_username": item.seller.First_name if item.seller else None,
-            "Listing_name": item.Listing_name,
-            "Seller_id": item.Seller_id,
-            "Available_until": item.Available_until,
-            "Verified": item.Verified,
-            "Min_price": item.Min_price,
-            "Current_bid": item.Current_bid,
-            "Image": images.get(item.Item_id),
-        }
-        for item in items
-    ]
-
-    response = jsonify(items_list)
-    response.headers["Cache-Control"] = "public, max-age=86400"  # Cache for 24 hours
-    return response, 200
+    return listing_cards_response(items), 200
 
 @app.route("/api/get_search_filter", methods=["POST"])
+@read_only
+@conditional_view(
+    lambda: (
+        catalogue_version()
+        if (request.get_json(silent=True) or {}).get("item")
+        else None
+    )
+)
 def get_search_filter():
     """
     This endpoint handles filtering of items based on the search query provided by the user.
     It can filter either by user or item based on the input flags (`user` or `item`) and search query.
 
     Request Body (JSON):
-    - user (bool): Indicates whether to filter by users (not implemented in this version).
-    - item (bool): Indicates whether to filter by items (required for this version).
-    - searchQuery (str): The search term used to filter item names and item tags.
+    - user (bool): Indicates whether to filter by users.
+    - item (bool): Indicates whether to filter by items.
+    - searchQuery (str): The search term used to filter item names, descriptions and tags,
+      or user names.
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of results per page.
+    - stream (bool): Optional, streams every result instead of a page.
 
     Response Body:
     - A list of dictionaries containing filtered item details, including the item ID, listing name,
       seller ID, availability, verification status, minimum price, current bid, and item image (if available).
+      Items are ranked by relevance, or in order of when they end if there is no search query.
+    - Or, when filtering by users, a list of the matching users' details in order of user ID.
+    - The X-Next-Cursor header is set if there are more results.
 
     Returns:
         JSON: A list of filtered item details (based on the search query).
@@ -867,303 +845,161 @@ def get_search_filter():
     filtered_users = []
 
     if item:
-        available_items = (
-            db.session.query(Items)
-            .join(User, Items.Seller_id == User.User_id)
-            .filter(
+        available_items = available_listings()
+        if wants_stream(data):
+            if searchQuery == "":
+                available_items = available_items.order_by(
+                    Items.Available_until, Items.Item_id
+                )
+            else:
+                available_items = search_items(available_items, searchQuery)
+            return stream_json(available_items, build_listing_cards), 200
 
-                Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
-                db.or_(
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == True,
-                        Items.Authentication_request_approved == True,
-                    ),
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == False,
-                        Items.Authentication_request_approved == None,
-                    ),
-                ),
-            )
-            .all()
-        )
         if searchQuery == "":
-            # Return all items
-            filtered_items = available_items
-        else:
-            # filter by item name, works with space seperated strings
-            item_names_and_Ids = [
-                (item.Listing_name, item.Item_id) for item in available_items
-            ]
-            
-            for name, item_id in item_names_and_Ids:
-                name = name.lower()
-                name_tokens = name.split()
-                search_tokens = searchQuery.split()
-
-                for i in range(len(name_tokens) - len(search_tokens) + 1):
-                    if all(
-                        name_tokens[i + j].startswith(search_tokens[j])
-                        for j in range(len(search_tokens))
-                    ):
-                        filtered_ids.append(item_id)
-
-             # filter by item_tags, works for tags that have more than one token
-            type_names = (
-            db.session.query(Types.Type_name, Items.Item_id)
-            .join(Middle_type, Middle_type.Item_id == Items.Item_id)
-            .join(Types, Types.Type_id == Middle_type.Type_id)
-            .filter(
-                Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
-                db.or_(
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == True,
-                        Items.Authentication_request_approved == True,
-                    ),
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == False,
-                        Items.Authentication_request_approved == None,
-                    ),
-                ),
-            )
-            .all()
-            )
-
-            item_ids_unique = list(set(item_id for _, item_id in type_names)) 
-            # print(item_ids_unique)
-            for tag_name, item_id in type_names:
-                tag_name = tag_name.lower()
-                tag_name_tokens = tag_name.split()
-                for i in range(len(tag_name_tokens) - len(search_tokens) + 1):
-                    # print("Search tags",search_tokens)
-                    if all(
-                        tag_name_tokens[i + j].startswith(search_tokens[j])
-                        for j in range(len(search_tokens))
-                    ):
-                        # ensure no duplicates of item_ids
-                        if item_id not in filtered_ids:
-                            filtered_ids.append(item_id)
-                            
-                
-            # search for multiple tags seperated by " ", tag 1 AND tag 2 AND ...
-            for item_id in item_ids_unique :
-                multiple_tags_count = 0
-                item_types = {type_name.lower() for type_name, id in type_names if id == item_id}
-
-                for token in search_tokens:
-                    for type_name in item_types:
-                        # print(f"comparing search token {token} with type {type_name}")
-                        if type_name.startswith(token):
-                            multiple_tags_count += 1
-                
-                # print(multiple_tags_count)
-                if multiple_tags_count >= len(search_tokens):
-                    if item_id not in filtered_ids:
-                            filtered_ids.append(item_id)
-
-            # get items from filtered Ids
-            # print(type_names)
-            filtered_items = (
-                db.session.query(Items).filter(Items.Item_id.in_(filtered_ids)).all()
+            # Return all items, in order of when they end
+            filtered_items, next_cursor = paginate(
+                available_items, [Items.Available_until, Items.Item_id], data
             )
-
-        # Turn into dict
-        items_list = []
-        for item in filtered_items:
-            image = Images.query.filter(Images.Item_id == item.Item_id).first()
-            tags = (
-                db.session.query(Types.Type_name)
-                .join(Middle_type, Types.Type_id == Middle_type.Type_id)
-                .filter(Middle_type.Item_id == item.Item_id)
-                .all()
+        else:
+            # Matches the words of the search query (the last ones may be partially
+            # typed) against the full-text index of item names, descriptions and tags
+            filtered_items, next_cursor = search_page(
+                available_items, searchQuery, data
             )
 
-            tag_list = [tag.Type_name for tag in tags]
-
-            item_details_dict = {
-                "Item_id": item.Item_id,
-                "Listing_name": item.Listing_name,
-                "Seller_name": User.query.filter_by(User_id=item.Seller_id)
-                .first()
-                .First_name,
-                "Seller_id": item.Seller_id,
-                "Available_until": item.Available_until,
-                "Verified": item.Verified,
-                "Min_price": item.Min_price,
-                "Current_bid": item.Current_bid,
-                "Image": (
-                    base64.b64encode(image.Image).decode("utf-8") if image else None
-                ),
-                "Tags": tag_list,
-            }
-
-            items_list.append(item_details_dict)
+        return (
+            with_next_cursor(listing_cards_response(filtered_items), next_cursor),
+            200,
+        )
 
-        return jsonify(items_list), 200
-        # Ensure Items model has a to_dict() method
-        
     # filter for users
     elif user:
-        # returns all if no search query
-        if not searchQuery or searchQuery == " ":
-            filtered_users = db.session.query(User).all()
-            print(filtered_users)
-
-        else:
-            # print("Searching users")
-            filtered_user_ids = []
 
-            # filtering by first, middle, last name
-            user_names_and_Ids = db.session.query(
-                User.First_name, User.Middle_name, User.Surname, User.User_id
-            ).all()
-
-            for first, middle, last, user_id in user_names_and_Ids:
-                if middle == "" or middle == None:
-                    name_tokens = [first.lower(), middle, last.lower()]
-                else:
-                    name_tokens = [first.lower(), middle.lower(), last.lower()]
-
-                search_tokens = searchQuery.lower().split()
-
-                # if searchQuery has two tokens or more, it matches both in the same sequence to the name token
-                if len(search_tokens) > 1:
-                    # print("SEARCH", search_tokens)
-                    matched = False
-                    if len(search_tokens) <= len(name_tokens):
-                        # if name_tokens >= two, it matches first search_token to first name,
-                        # second to middle name, third to last
-                        
-                        # if name_tokens has a middle name
-                        if name_tokens[1] != "" and name_tokens[1] != None:
-                            for i in range(len(search_tokens)):
-                                if (
-                                    not name_tokens[i]
-                                    .lower()
-                                    .startswith(search_tokens[i])
-                                ):
-                                    matched = False
-                                    print("NOT MATCHED : comparing name_toke", name_tokens[i], " with search query token ", search_tokens[i])
-                                    break
-                                else:
-                                    print("MATCHED : comparing name_toke", name_tokens[i], " with search query token ", search_tokens[i])
-                                    matched = True
-                            # if name has middle name but search query has first + last
-                            # this matches first name to seach quary token 1 and last name to search query token 2
-                            if len(search_tokens) == 2 and name_tokens[0] == search_tokens[0] and name_tokens[2].startswith(search_tokens[1]):
-                                matched = True
-                                
-
-                        else:
-                            # if name has no middle name, then second search token should match with last name or middle name
-                            if name_tokens[0] == search_tokens[0]:
-                                if name_tokens[2].startswith(search_tokens[1]):
-                                    matched = True
-                                else:
-                                    matched = False
-                            else:
-                                matched = False
-
-                    if matched:
-                        filtered_user_ids.append(user_id)
+        def user_details(users):
+            users_list = []
+            for user in users:
+                middle_name = user.Middle_name
+                if user.Middle_name == None:
+                    middle_name = ""
+                user_details_dict = {
+                    "User_id": user.User_id,
+                    "Username": user.Username,
+                    "Password": user.Password,
+                    "Email": user.Email,
+                    "First_name": user.First_name,
+                    "Middle_name": middle_name,
+                    "Surname": user.Surname,
+                    "DOB": user.DOB,
+                    "Level_of_access": user.Level_of_access,
+                    "Is_expert": user.Is_expert,
+                }
 
-                # deals with single search query : basic keyword matching
-                elif len(search_tokens) == 1:
-                    for i in range(len(name_tokens)):
-                        if name_tokens[i] != None:
-                            if name_tokens[i].lower().startswith(search_tokens[0]):
-                                filtered_user_ids.append(user_id)
+                users_list.append(user_details_dict)
+            return users_list
 
-            filtered_users = (
-                db.session.query(User).filter(User.User_id.in_(filtered_user_ids)).all()
-            )
-            # print(filtered_users)
-
-        users_list = []
-        for user in filtered_users:
-            middle_name = user.Middle_name
-            if user.Middle_name == None:
-                middle_name = ""
-            user_details_dict = {
-                "User_id": user.User_id,
-                "Username": user.Username,
-                "Password": user.Password,
-                "Email": user.Email,
-                "First_name": user.First_name,
-                "Middle_name": middle_name,
-                "Surname": user.Surname,
-                "DOB": user.DOB,
-                "Level_of_access": user.Level_of_access,
-                "Is_expert": user.Is_expert,
-            }
+        if wants_stream(data):
+            if not searchQuery:
+                filtered_users = User.query.order_by(User.User_id)
+            else:
+                filtered_users = search_users(searchQuery)
+            return stream_json(filtered_users, user_details), 200
 
-            users_list.append(user_details_dict)
+        # returns all if no search query
+        if not searchQuery:
+            filtered_users, next_cursor = paginate(User.query, [User.User_id], data)
+        else:
+            # Matches the words of the search query against the prefixes of the
+            # users' first, middle and last names, paging through the index itself
+            limit = get_page_size(data)
+            after = None
+            if data.get("cursor"):
+                (after,) = decode_cursor(data["cursor"], 1)
+                if not isinstance(after, int):
+                    invalid_request("Invalid cursor")
+
+            filtered_users = search_users(searchQuery, after, limit + 1).all()
+            next_cursor = None
+            if len(filtered_users) > limit:
+                filtered_users = filtered_users[:limit]
+                next_cursor = encode_cursor([filtered_users[-1].User_id])
 
-        return jsonify(users_list), 200
+        return (
+            with_next_cursor(jsonify(user_details(filtered_users)), next_cursor),
+            200,
+        )
 
 
 
 @app.route("/api/get_filtered_listings", methods=["POST"])
+@read_only
+@conditional_view(catalogue_version)
 def get_filtered_listings():
-    """Filters listings based on the selected price range. (will be implementing more categories)
+    """
+    Retrieves a page of listings matching all of the given filters, composed into
+    a single query. Filters left out of the request are not applied.
 
-    Receives a JSON payload containing:
-    - price_range (str): Selected price filter category.
-    - listing_Ids (list): List of listing IDs to filter.
+    Request Body (JSON):
+    - min_price (float): Optional, the lowest price (current bid or minimum price).
+    - max_price (float): Optional, the highest price.
+    - categories (str): Optional, comma separated categories, listings with a tag
+      matching any of them are returned.
+    - category_match (str): Optional, "all" to only return listings with a tag
+      matching every category, "any" by default.
+    - searchQuery (str): Optional, words matched against item names, descriptions and tags.
+    - bid_status (str): Optional, one of won, payment_failed, expired or out_bid.
+      Filters the listings the logged in user bid on, including ended ones.
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of listings per page.
 
     Returns:
-    - JSON response with a list of filtered listing IDs that match the price range.
-    - Returns an error response if an exception occurs.
+        json_object: list of listing cards, ranked by relevance if there is a search
+                     query or in order of when they end otherwise. X-Next-Cursor is
+                     set if there are more.
+        status_code: HTTP status code (200 for success,
+                     400 for invalid filters,
+                     401 if filtering by bid status while logged out)
     """
-    # Intakes all filter data
-    # filter_price, filter_searchQuery, filter_bid_status
-    # These are NULL if filter is not applied or have the filter type parsed through
-
-    try:
-        data = request.json
-        min_price = data.get("min_price", "")
-        max_price = data.get("max_price", "")
-        listing_Ids = data.get("listing_Ids", [])
-        listing_Ids = list(map(int, listing_Ids))
-        filtered_listing_Ids = []
-        if min_price != "" and max_price != "":
-            for Id in listing_Ids:
-                item = Items.query.filter_by(Item_id=Id).first()
-                print(item.Listing_name)
-
-                if (
-                    get_listing_price(item) <= max_price
-                    and get_listing_price(item) >= min_price
-                ):
-                    filtered_listing_Ids.append(Id)
-
-        return jsonify(filtered_listing_Ids)
-
-    except Exception as e:
-        print(f"Error : {e}")
-        return jsonify({"error": "Interal Server Error"}), 500
-
+    data = request.get_json(silent=True) or {}
 
-def get_listing_price(listing):
-    """
-    Determines the correct price of a listing.
+    prices = {}
+    for key in ("min_price", "max_price"):
+        if data.get(key) not in (None, ""):
+            try:
+                prices[key] = float(data[key])
+            except (TypeError, ValueError):
+                invalid_request("Invalid price")
+
+    bid_status = data.get("bid_status") or ""
+    if bid_status:
+        if bid_status not in BID_STATUSES:
+            invalid_request("Invalid bid status")
+        if not current_user.is_authenticated:
+            return jsonify({"message": "Not logged in"}), 401
+
+        # Ended auctions the user bid on are included when filtering by bid status
+        listings = Items.query.filter(
+            bid_status_filter(current_user.User_id, bid_status)
+        )
+    else:
+        listings = available_listings()
 
-    If the current bid is lower than the minimum price, the function returns the minimum price.
-    Otherwise, it returns the current bid.
+    listings = listings.filter(price_filter(**prices))
 
-    Args:
-    - listing (object): An item object containing 'Current_bid' and 'Min_price' attributes.
+    categories = parse_categories(data.get("categories"))
+    if categories:
+        listings = listings.filter(
+            category_filter(categories, data.get("category_match") == "all")
+        )
 
-    Returns:
-    - int: The listing's current price.
-    """
-    if listing.Current_bid < listing.Min_price:
-        return listing.Min_price
+    search_query = (data.get("searchQuery") or "").strip().lower()
+    if search_query:
+        items, next_cursor = search_page(listings, search_query, data)
     else:
-        return listing.Current_bid
+        items, next_cursor = paginate(
+            listings, [Items.Available_until, Items.Item_id], data
+        )
+
+    return with_next_cursor(listing_cards_response(items), next_cursor), 200
 
 
 @app.route("/api/update-address", methods=["POST"])
@@ -1280,9 +1116,7 @@ def update_auth_request():
             if data["action"] == "accept":
                 request_to_update.Available_until += datetime.datetime.now(
                     datetime.timezone.utc
-                ) - request_to_update.Upload_datetime.replace(
-                    tzinfo=datetime.timezone.utc
-                )
+                ) - as_utc(request_to_update.Upload_datetime)
                 request_to_update.Verified = True
                 request_to_update.Authentication_request = False
                 request_to_update.Authentication_request_approved = True
@@ -1291,8 +1125,17 @@ def update_auth_request():
                 request_to_update.Authentication_request = False
                 request_to_update.Authentication_request_approved = False
 
+            invalidate(f"item:{request_to_update.Item_id}")
+            bump_version(request_to_update.Item_id)
             db.session.commit()
 
+            # Accepted listings are open for longer, so their auction ends later
+            if data["action"] == "accept":
+                try:
+                    schedule_auction(request_to_update)
+                except Exception as e:
+                    logger.error(f"Failed to reschedule auction: {e}")
+
             return jsonify({"message": "Successfully updated information"}), 200
 
         return jsonify({"message": "User has invalid access level"}), 401
@@ -1383,14 +1226,14 @@ def Create_listing():
             for image in images:
                 image_record = Images(
                     Item_id=listing.Item_id,
-                    Image=image.read(),
+                    Image_hash=get_blob_store().put(image.read()),
                     Image_description="This is an image",
                 )
                 saved_images.append(image_record)
 
-        # Bulk saves all the images in saved_images
+        # Bulk saves all the images in saved_images (returning their IDs for the thumbnails)
         if saved_images:
-            db.session.bulk_save_objects(saved_images)
+            db.session.bulk_save_objects(saved_images, return_defaults=True)
 
         # Adds the tags in.
         tags = json.loads(request.form.get("tags", "[]"))
@@ -1399,8 +1242,11 @@ def Create_listing():
             db.session.add(middle_type_record)
 
         # Commits to complete the transaction
+        bump_version()
         db.session.commit()
-        print("here")
+
+        # Generates the image thumbnails in the background
+        queue_thumbnails([image.Image_id for image in saved_images])
         item = Items.query.filter_by(
             Seller_id=int(request.form["seller_id"]), Upload_datetime=time_now
         ).first()
@@ -1421,69 +1267,39 @@ def Create_listing():
 
 
 @app.route("/api/get-items", methods=["POST"])
+@read_only
+@conditional_view(catalogue_version)
 def get_listings():
     """
-    Retrieves the item details from the database that are still available.
+    Retrieves a page of the item details from the database that are still available,
+    in order of when they end.
+
+    Request Body (JSON):
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of items per page.
 
     Returns:
-        json_object:  containing the items details
+        json_object:  containing the items details, X-Next-Cursor is set if there are more
         status_code: HTTP status code (200 for success,
                                        401 for unauthorized access)
     """
 
     try:
         # Checks if the listing is available and doesn't still need authentication.
-        available_items = (
-            db.session.query(Items, User.Username)
-            .join(User, Items.Seller_id == User.User_id)
-            .filter(
-
-                Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
-                db.or_(
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == True,
-                        Items.Authentication_request_approved == True,
-                    ),
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == False,
-                        Items.Authentication_request_approved == None,
-                    ),
-                ),
-            )
-            .all()
+        available_items, next_cursor = paginate(
+            available_listings(),
+            [Items.Available_until, Items.Item_id],
+            request.get_json(silent=True) or {},
         )
 
-        items_list = []
-        for item, username in available_items:
-
-            image = Images.query.filter(Images.Item_id == item.Item_id).first()
-
-            tags = (
-                db.session.query(Types.Type_name)
-                .join(Middle_type, Types.Type_id == Middle_type.Type_id)
-                .filter(Middle_type.Item_id == item.Item_id)
-                .all()
-            )
-
-            tag_list = [tag.Type_name for tag in tags]
-
-            item_details_dict = {
-                "Item_id": item.Item_id,
-                "Listing_name": item.Listing_name,
-                "Seller_id": item.Seller_id,
-                "Seller_username": username,
-                "Available_until": item.Available_until,
-                "Verified": item.Verified,
-                "Min_price": item.Min_price,
-                "Current_bid": item.Current_bid,
-                "Image": base64.b64encode(image.Image).decode("utf-8"),
-                "Tags": tag_list,
-            }
-            items_list.append(item_details_dict)
+        return (
+            with_next_cursor(listing_cards_response(available_items), next_cursor),
+            200,
+        )
 
-        return jsonify(items_list), 200
+    except HTTPException:
+        # Invalid cursor or page size
+        raise
 
     except Exception as e:
         print("Error: ", e)
@@ -1491,6 +1307,7 @@ def get_listings():
 
 
 @app.route("/api/get-seller-items", methods=["POST"])
+@conditional_view(catalogue_version)
 def get_seller_listings():
     """
     Retrieves the item details that were sold by user from the database that are still available.
@@ -1504,48 +1321,19 @@ def get_seller_listings():
     try:
         # Checks if the listing is available and doesn't still need authentication.
         available_items = (
-            db.session.query(Items, User.Username)
-            .join(User, Items.Seller_id == User.User_id)
-            .filter(
-                Items.Seller_id == current_user.User_id,
-
-                Items.Available_until > datetime.datetime.now(datetime.timezone.utc),
-                db.or_(
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == True,
-                        Items.Authentication_request_approved == True,
-                    ),
-                    db.and_(
-                        Items.Authentication_request == False,
-                        Items.Verified == False,
-                        Items.Authentication_request_approved == None,
-                    ),
-                ),
-            )
+            available_listings()
+            .filter(Items.Seller_id == current_user.User_id)
             .all()
         )
 
-        items_list = []
-        for item, username in available_items:
-
-            image = Images.query.filter(Images.Item_id == item.Item_id).first()
-
-            item_details_dict = {
-                "Item_id": item.Item_id,
-                "Listing_name": item.Listing_name,
-                "Seller_id": item.Seller_id,
-                "Seller_username": username,
-                "Available_until": item.Available_until,
-                "Verified": item.Verified,
-                "Min_price": item.Min_price,
-                "Current_bid": item.Current_bid,
-                "Image": base64.b64encode(image.Image).decode("utf-8"),
-                "Expert_id": item.Expert_id,
-                "Authentication_request_approved": item.Authentication_request_approved,
-                "Authentication_request": item.Authentication_request,
-            }
-            items_list.append(item_details_dict)
+        items_list = build_listing_cards(
+            available_items,
+            extra_fields=(
+                "Expert_id",
+                "Authentication_request_approved",
+                "Authentication_request",
+            ),
+        )
         return jsonify(items_list), 200
 
     except Exception as e:
@@ -1554,6 +1342,7 @@ def get_seller_listings():
 
 
 @app.route("/api/get-sellerss-items", methods=["POST"])
+@conditional_view(catalogue_version)
 def get_sellerss_listings():
     """
     Retrieves the item details that were sold by user from the database that are still available.
@@ -1566,43 +1355,22 @@ def get_sellerss_listings():
     try:
         # Get all items for the current seller
         items_query = (
-            db.session.query(Items, User.Username)
+            db.session.query(Items)
             .join(User, Items.Seller_id == User.User_id)
             .filter(Items.Seller_id == current_user.User_id)
             .order_by(Items.Available_until.desc())
             .all()
         )
 
-        items_list = []
-        for item, username in items_query:
-            image = Images.query.filter(Images.Item_id == item.Item_id).first()
-
-            tags = (
-                db.session.query(Types.Type_name)
-                .join(Middle_type, Types.Type_id == Middle_type.Type_id)
-                .filter(Middle_type.Item_id == item.Item_id)
-                .all()
-            )
-
-            tag_list = [tag.Type_name for tag in tags]
-
-            item_details_dict = {
-                "Item_id": item.Item_id,
-                "Listing_name": item.Listing_name,
-                "Seller_id": item.Seller_id,
-                "Seller_username": username,
-                "Available_until": item.Available_until,
-                "Verified": item.Verified,
-                "Min_price": item.Min_price,
-                "Current_bid": item.Current_bid,
-                "Image": base64.b64encode(image.Image).decode("utf-8") if image else "",
-                "Expert_id": item.Expert_id,
-                "Authentication_request_approved": item.Authentication_request_approved,
-                "Authentication_request": item.Authentication_request,
-                "Tags": tag_list,
-                "Sold": item.Sold,
-            }
-            items_list.append(item_details_dict)
+        items_list = build_listing_cards(
+            items_query,
+            extra_fields=(
+                "Expert_id",
+                "Authentication_request_approved",
+                "Authentication_request",
+                "Sold",
+            ),
+        )
         return jsonify(items_list), 200
 
     except Exception as e:
@@ -1660,31 +1428,15 @@ def get_bids():
         if not bid_data:
             return jsonify({"message": "No current bids"}), 400
 
+        # Fetch the image URLs of every item in a single query
+        images = get_item_images(list({item.Item_id for item in bid_data}))
+
         # Create a dictionary to store the highest bid per item
         unique_bids = {}
 
         for item in bid_data:
             if item.Item_id not in unique_bids:
-                images = Images.query.filter_by(Item_id=item.Item_id).all()
-                image_list = []
-
-                for image in images:
-                    image_data = image.Image
-                    image_base64 = (
-                        base64.b64encode(image_data).decode("utf-8")
-                        if image_data
-                        else None
-                    )
-                    image_list.append(
-                        {
-                            "Image": image_base64,
-                            "Image_description": (
-                                image.Image_description
-                                if image.Image_description
-                                else "No description available"
-                            ),
-                        }
-                    )
+                image_list = images.get(item.Item_id, [])
 
                 tags = (
                     db.session.query(Types.Type_name)
@@ -1720,15 +1472,21 @@ def get_bids():
         return jsonify({"message": "No user logged in"}), 401
 
 
-@cache.cached(timeout=30, key_prefix=lambda: f"user_history_{current_user.User_id}")
 @app.route("/api/get-history", methods=["GET"])
+@cached_view(
+    timeout=30, tags=lambda: [f"history:{current_user.get_id()}"], per_user=True
+)
 def get_history():
     """
-    Retrieves the user's expired bids from the database, ensuring that only the highest bid for each item
-    is returned, if they are currently logged in.
+    Retrieves a page of the user's expired bids from the database, ensuring that only the highest bid for each item
+    is returned, if they are currently logged in. The most recently ended auctions come first.
+
+    Query Parameters:
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of items per page.
 
     Returns:
-        json_object: dictionary containing the user's highest bid per item
+        json_object: dictionary containing the user's highest bid per item, X-Next-Cursor is set if there are more
         status_code: HTTP status code (200 for success,
                                        401 for unauthorized access,
                                        400 for no bidding information)
@@ -1736,6 +1494,24 @@ def get_history():
 
     # Checks if user is logged in
     if current_user.is_authenticated:
+        # Pages through the expired items the user bid on
+        expired_items = Items.query.with_entities(
+            Items.Item_id, Items.Available_until
+        ).filter(
+            Items.Available_until < datetime.datetime.now(datetime.timezone.utc),
+            db.exists().where(
+                Bidding_history.Item_id == Items.Item_id,
+                Bidding_history.Bidder_id == current_user.User_id,
+            ),
+        )
+        expired_items, next_cursor = paginate(
+            expired_items,
+            [Items.Available_until, Items.Item_id],
+            request.args,
+            descending=True,
+        )
+        item_ids = [item.Item_id for item in expired_items]
+
         bid_data = (
             Bidding_history.query.join(
                 Items, Bidding_history.Item_id == Items.Item_id
@@ -1748,9 +1524,7 @@ def get_history():
             )  # Outer join Images table to get item image
             .filter(
                 Bidding_history.Bidder_id == current_user.User_id,
-
-                Items.Available_until
-                < datetime.datetime.now(datetime.timezone.utc),  # Only expired bids
+                Items.Item_id.in_(item_ids),  # Only expired bids on this page
             )
             .with_entities(
                 Bidding_history.Bid_id,
@@ -1764,7 +1538,6 @@ def get_history():
                 Items.Current_bid,
                 Items.Available_until,
                 User.Username,
-                Images.Image,
                 Images.Image_description,
                 Items.Min_price,
             )
@@ -1774,34 +1547,18 @@ def get_history():
             .all()
         )
 
-        if not bid_data:
+        if not bid_data and not request.args.get("cursor"):
             return jsonify({"message": "No expired bids"}), 400
 
+        # Fetch the image URLs of every item in a single query
+        images = get_item_images(item_ids)
+
         # Create a dictionary to store the highest bid per item
         unique_bids = {}
 
         for item in bid_data:
             if item.Item_id not in unique_bids:
-                images = Images.query.filter_by(Item_id=item.Item_id).all()
-                image_list = []
-
-                for image in images:
-                    image_data = image.Image
-                    image_base64 = (
-                        base64.b64encode(image_data).decode("utf-8")
-                        if image_data
-                        else None
-                    )
-                    image_list.append(
-                        {
-                            "Image": image_base64,
-                            "Image_description": (
-                                image.Image_description
-                                if image.Image_description
-                                else "No description available"
-                            ),
-                        }
-                    )
+                image_list = images.get(item.Item_id, [])
 
                 tags = (
                     db.session.query(Types.Type_name)
@@ -1830,13 +1587,14 @@ def get_history():
                     "Tags": tag_list,
                 }
 
-        # Convert dictionary to list for JSON response
-        history = list(unique_bids.values())
+        # Convert dictionary to list for JSON response, in the order of the page
+        history = [unique_bids[item_id] for item_id in item_ids]
         response = jsonify({"history": history})
-        response.headers["Cache-Control"] = (
-            "public, max-age=86400"  # Cache for 24 hours
-        )
-        return response, 200
+        # The history is the user's own and changes when their auctions end, so
+        # browsers and proxies must not share it or reuse it without asking again
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return with_next_cursor(response, next_cursor), 200
 
     else:
         return jsonify({"message": "No user logged in"}), 401
@@ -1873,30 +1631,13 @@ def get_pending_auth():
             if not unassigned_items:
                 return jsonify({"message": "No items require authentication"}), 200
 
+            # Fetch the image URLs of every item in a single query
+            images = get_item_images([item.Item_id for item in unassigned_items])
+
             # Convert query results to JSON
             unassigned_data = []
             for item in unassigned_items:
-                # Fetch all images for the current item
-                images = Images.query.filter_by(Item_id=item.Item_id).all()
-                image_list = []
-
-                for image in images:
-                    image_data = image.Image
-                    image_base64 = (
-                        base64.b64encode(image_data).decode("utf-8")
-                        if image_data
-                        else None
-                    )
-                    image_list.append(
-                        {
-                            "Image": image_base64,
-                            "Image_description": (
-                                image.Image_description
-                                if image.Image_description
-                                else "No description available"
-                            ),
-                        }
-                    )
+                image_list = images.get(item.Item_id, [])
 
                 tags = (
                     db.session.query(Types.Type_name)
@@ -2004,6 +1745,8 @@ def update_item_auth():
                 return jsonify({"message": "Invalid expert ID"}), 404
 
             item.Expert_id = expert_id
+            invalidate(f"item:{item.Item_id}")
+            bump_version(item.Item_id)
             db.session.commit()
 
             return jsonify({"message": "Item successfully assigned to expert"}), 200
@@ -2125,10 +1868,16 @@ def update_profit_structure():
 @app.route("/api/get-sold", methods=["GET"])
 def get_sold():
     """
-    Fetches all the sold items (items that are past their 'available_until' dates) and links with the profit structure.
+    Fetches a page of the sold items (items that are past their 'available_until' dates) and links with the profit structure.
+    The most recently sold items come first.
+
+    Query Parameters:
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of items per page.
+    - stream (bool): Optional, streams every sold item instead of a page.
 
     Returns:
-        json_object: details of all the items that were "sold"
+        json_object: details of the items that were "sold", X-Next-Cursor is set if there are more
         status_code: HTTP status code (200 for success, 401 for incorrect level of access / no user, 500 for server error)
     """
     if current_user.is_authenticated:
@@ -2141,10 +1890,9 @@ def get_sold():
                     )
                     .join(Bidding_history, Items.Item_id == Bidding_history.Item_id)
                     .filter(
-
                         Items.Available_until
                         < datetime.datetime.now(datetime.timezone.utc),
-                        Bidding_history.Winning_bid == 1,
+                        Bidding_history.Winning_bid.is_(True),
                     )
                     .with_entities(
                         Items.Item_id,
@@ -2166,45 +1914,71 @@ def get_sold():
                     )
                 )
 
-                sold_items_data = []
-                for item in sold_items:
+                def sold_item_details(items):
+                    sold_items_data = []
+                    for item in items:
 
-                    if item.Authentication_request_approved == 1 and item.Verified == 1:
-                        if item.Structure_id is None:
-                            eSplit = 0.04
-                            mSplit = 0.01
-                        else:
-                            eSplit = item.Expert_split
-                            mSplit = item.Manager_split
-                    else:
-                        if item.Structure_id:
-                            mSplit = item.Manager_split
-                            eSplit = 0
+                        if item.Authentication_request_approved and item.Verified:
+                            if item.Structure_id is None:
+                                eSplit = 0.04
+                                mSplit = 0.01
+                            else:
+                                eSplit = item.Expert_split
+                                mSplit = item.Manager_split
                         else:
-                            mSplit = 0.01
-                            eSplit = 0
+                            if item.Structure_id:
+                                mSplit = item.Manager_split
+                                eSplit = 0
+                            else:
+                                mSplit = 0.01
+                                eSplit = 0
+
+                        sold_items_data.append(
+                            {
+                                "Item_id": item.Item_id,
+                                "Listing_name": item.Listing_name,
+                                "Seller_id": item.Seller_id,
+                                "Upload_datetime": item.Upload_datetime,
+                                "Available_until": item.Available_until,
+                                "Min_price": item.Min_price,
+                                "Current_bid": item.Current_bid,
+                                "Structure_id": item.Structure_id,
+                                "Expert_id": item.Expert_id,
+                                "Expert_split": eSplit,
+                                "Manager_split": mSplit,
+                                "Enforced_datetime": item.Enforced_datetime,
+                                "Authentication_request": item.Authentication_request,
+                                "Authentication_request_approved": item.Authentication_request_approved,
+                                "Bid_price": item.Bid_price,
+                            }
+                        )
 
-                    sold_items_data.append(
-                        {
-                            "Item_id": item.Item_id,
-                            "Listing_name": item.Listing_name,
-                            "Seller_id": item.Seller_id,
-                            "Upload_datetime": item.Upload_datetime,
-                            "Available_until": item.Available_until,
-                            "Min_price": item.Min_price,
-                            "Current_bid": item.Current_bid,
-                            "Structure_id": item.Structure_id,
-                            "Expert_id": item.Expert_id,
-                            "Expert_split": eSplit,
-                            "Manager_split": mSplit,
-                            "Enforced_datetime": item.Enforced_datetime,
-                            "Authentication_request": item.Authentication_request,
-                            "Authentication_request_approved": item.Authentication_request_approved,
-                            "Bid_price": item.Bid_price,
-                        }
+                    return sold_items_data
+
+                if wants_stream(request.args):
+                    most_recent_first = sold_items.order_by(
+                        Items.Available_until.desc(), Items.Item_id.desc()
                     )
+                    return (
+                        stream_json(
+                            most_recent_first, sold_item_details, key="sold_items"
+                        ),
+                        200,
+                    )
+
+                sold_items, next_cursor = paginate(
+                    sold_items,
+                    [Items.Available_until, Items.Item_id],
+                    request.args,
+                    descending=True,
+                )
+
+                response = jsonify({"sold_items": sold_item_details(sold_items)})
+                return with_next_cursor(response, next_cursor), 200
 
-                return jsonify({"sold_items": sold_items_data}), 200
+            except HTTPException:
+                # Invalid cursor or page size
+                raise
 
             except Exception as e:
                 return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -2215,6 +1989,13 @@ def get_sold():
 
 
 @app.route("/api/get-single-listing", methods=["POST"])
+@read_only
+@conditional_view(
+    lambda: item_version((request.get_json(silent=True) or {}).get("Item_id"))
+)
+@cached_view(
+    tags=lambda: [f"item:{(request.get_json(silent=True) or {}).get('Item_id')}"]
+)
 def get_single_listing():
     """
     Gets listing information for a given item ID
@@ -2230,7 +2011,12 @@ def get_single_listing():
 
         item = Items.query.filter_by(Item_id=data["Item_id"]).first()
         seller = User.query.filter_by(User_id=item.Seller_id).first()
-        images = Images.query.filter_by(Item_id=item.Item_id).all()
+        images = (
+            db.session.query(Images.Image_id)
+            .filter_by(Item_id=item.Item_id)
+            .order_by(Images.Image_id)
+            .all()
+        )
 
         tags = (
             db.session.query(Types.Type_name)
@@ -2272,7 +2058,7 @@ def get_single_listing():
             "Second_opinion": item.Second_opinion,
             "Current_bid": item.Current_bid,
             "Images": [
-                base64.b64encode(image.Image).decode("utf-8") for image in images
+                image_url(image.Image_id, variant="detail") for image in images
             ],
             "Available_until": item.Available_until,
             "Verified": item.Verified,
@@ -2288,6 +2074,90 @@ def get_single_listing():
         return jsonify({"Error": "Failed to retrieve items"}), 400
 
 
+@app.route("/api/images/<int:image_id>", methods=["GET"])
+def get_image(image_id):
+    """
+    Serves the raw bytes of an item image, or one of its thumbnails.
+
+    Images are never modified after upload, so the response is cached by the
+    browser indefinitely, with the image's SHA-256 hash as a strong ETag.
+    If the requested thumbnail has not been generated yet the original is
+    served instead, without the long-lived caching.
+
+    Query parameters:
+    - variant (str): Optional thumbnail size (grid, chat or detail).
+
+    Returns:
+        image: the raw image bytes
+        status_code: HTTP status code (200 for success,
+                                       304 if the client's copy is current,
+                                       404 if the image doesn't exist)
+    """
+
+    variant = request.args.get("variant")
+    if variant is not None and variant not in THUMBNAIL_SIZES:
+        return jsonify({"message": "Invalid image variant"}), 400
+
+    source = None
+    if variant:
+        source = (
+            db.session.query(
+                Image_variants.Variant_id,
+                Image_variants.Image_hash,
+                Image_variants.Image.is_(None),
+            )
+            .filter_by(Image_id=image_id, Variant=variant)
+            .first()
+        )
+
+    if source is not None:
+        table, key = Image_variants, Image_variants.Variant_id
+    else:
+        table, key = Images, Images.Image_id
+        source = (
+            db.session.query(Images.Image_id, Images.Image_hash, Images.Image.is_(None))
+            .filter_by(Image_id=image_id)
+            .first()
+        )
+        if source is None:
+            return jsonify({"message": "Image not found"}), 404
+
+    source_id, image_hash, in_blob_store = source
+
+    # Answers revalidation requests without reading the image bytes
+    if image_hash and request.if_none_match.contains(image_hash):
+        response = make_response("", 304)
+        response.set_etag(image_hash)
+
+    elif in_blob_store:
+        # Streams the blob straight from its file
+        path = get_blob_store().path(image_hash)
+        with open(path, "rb") as blob:
+            mimetype = guess_mimetype(blob.read(16))
+
+        response = send_file(path, mimetype=mimetype, etag=image_hash, conditional=True)
+
+    else:
+        # Rows created before the blob store keep their bytes in the database
+        image = db.session.query(table.Image).filter(key == source_id).scalar()
+        response = send_file(
+            io.BytesIO(image),
+            mimetype=guess_mimetype(image),
+            etag=image_hash or hashlib.sha256(image).hexdigest(),
+            conditional=True,
+        )
+
+    if variant and table is Images:
+        # The thumbnail will replace this response once it is generated
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMAGE_MAX_AGE
+        response.cache_control.immutable = True
+
+    return response
+
+
 @app.route("/api/request-second-opinion", methods=["POST"])
 def request_second_opinion():
     """
@@ -2309,6 +2179,8 @@ def request_second_opinion():
             item.Second_opinion = True
             item.Expert_id = None
 
+            invalidate(f"item:{item.Item_id}")
+            bump_version(item.Item_id)
             db.session.commit()
 
             return jsonify({"message": "Details Updated Successfully"}), 200
@@ -2321,14 +2193,19 @@ def request_second_opinion():
 @app.route("/api/get-watchlist", methods=["GET"])
 def get_watchlist():
     """
-    Retrieves the user's watchlist items if they are currently logged in.
+    Retrieves a page of the user's watchlist items if they are currently logged in,
+    in order of when they end.
+
+    Query Parameters:
+    - cursor (str): Optional, the X-Next-Cursor of the previous page.
+    - limit (int): Optional, the number of items per page.
 
     Returns:
-        json_object: dictionary containing the user's watchlist items
+        json_object: dictionary containing the user's watchlist items, X-Next-Cursor is set if there are more
         status_code: HTTP status code (200 for success, 401 for unauthorized access)
     """
     if current_user.is_authenticated:
-        # Fetch all watchlist items in one query
+        # Fetch a page of watchlist items in one query
         watchlist_items = (
             Watchlist.query.join(
                 Items, Watchlist.Item_id == Items.Item_id
@@ -2344,34 +2221,21 @@ def get_watchlist():
                 User.Username.label("Seller_name"),
                 Items.Min_price,
             )
-            .all()
+        )
+        watchlist_items, next_cursor = paginate(
+            watchlist_items, [Items.Available_until, Items.Item_id], request.args
         )
 
-        if not watchlist_items:
+        if not watchlist_items and not request.args.get("cursor"):
             return jsonify({"message": "No items in watchlist"}), 200
 
+        # Fetch the image URLs of every item in a single query
+        images = get_item_images([item.Item_id for item in watchlist_items])
+
         # Convert query results to JSON
         watchlist_data = []
         for item in watchlist_items:
-            # Fetch all images for the current item
-            images = Images.query.filter_by(Item_id=item.Item_id).all()
-            image_list = []
-
-            for image in images:
-                image_data = image.Image
-                image_base64 = (
-                    base64.b64encode(image_data).decode("utf-8") if image_data else None
-                )
-                image_list.append(
-                    {
-                        "Image": image_base64,
-                        "Image_description": (
-                            image.Image_description
-                            if image.Image_description
-                            else "No description available"
-                        ),
-                    }
-                )
+            image_list = images.get(item.Item_id, [])
 
             tags = (
                 db.session.query(Types.Type_name)
@@ -2396,7 +2260,8 @@ def get_watchlist():
                 }
             )
 
-        return jsonify({"watchlist": watchlist_data}), 200
+        response = jsonify({"watchlist": watchlist_data})
+        return with_next_cursor(response, next_cursor), 200
 
     else:
         return jsonify({"message": "No user logged in"}), 401
@@ -2498,6 +2363,8 @@ def check_watchlist():
 
 
 @app.route("/api/get-tags", methods=["GET"])
+@read_only
+@cached_view(tags=lambda: ["tags"])
 def get_tags():
     """
     Gets all the tags from the tags table
@@ -2850,24 +2717,40 @@ def update_listing():
         # Handle images
         images_to_keep = json.loads(request.form.get("images_to_keep", "[]"))
 
-        # Delete images not being kept
+        # Delete images not being kept, along with their thumbnails. Their blobs
+        # are left for sweep_blobs, as another upload may share them.
+        removed_images = db.session.query(Images.Image_id).filter(
+            Images.Item_id == item_id, ~Images.Image_id.in_(images_to_keep)
+        )
+        Image_variants.query.filter(Image_variants.Image_id.in_(removed_images)).delete(
+            synchronize_session=False
+        )
         Images.query.filter(
             Images.Item_id == item_id, ~Images.Image_id.in_(images_to_keep)
         ).delete()
 
         # Add new images
+        new_images = []
         if "new_images" in request.files:
             for image in request.files.getlist("new_images"):
-                db.session.add(
+                new_images.append(
                     Images(
                         Item_id=item_id,
-                        Image=image.read(),
+                        Image_hash=get_blob_store().put(image.read()),
                         Image_description="Item image",
                     )
                 )
+            db.session.add_all(new_images)
+            db.session.flush()
 
+        new_image_ids = [image.Image_id for image in new_images]
+        invalidate_item(item.Item_id)
+        bump_version(item.Item_id)
         db.session.commit()
 
+        # Generates the new images' thumbnails in the background
+        queue_thumbnails(new_image_ids)
+
         # Reschedule the auction end task
         try:
             schedule_auction(item)
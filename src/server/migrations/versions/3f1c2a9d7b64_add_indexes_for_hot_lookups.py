@@ -0,0 +1,74 @@
+"""Add indexes for hot lookups
+
+Adds the indexes to databases that were created by db.create_all() before they
+were declared in app/models.py. Indexes over tables or columns a database does
+not have yet are skipped, and created along with them by 5d2a7c91e4b3.
+
+Revision ID: 3f1c2a9d7b64
+Revises:
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2a9d7b64"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ("ix_user_email", "user", ["Email"], True),
+    ("ix_user_username", "user", ["Username"], True),
+    ("ix_address_user", "address", ["User_id"], False),
+    ("ix_items_seller", "items", ["Seller_id", "Available_until"], False),
+    ("ix_items_expert", "items", ["Expert_id"], False),
+    ("ix_images_item", "images", ["Item_id", "Image_id"], False),
+    ("ix_images_hash", "images", ["Image_hash"], False),
+    ("ix_image_variants_image", "image_variants", ["Image_id", "Variant"], True),
+    ("ix_image_variants_hash", "image_variants", ["Image_hash"], False),
+    (
+        "ix_availabilities_expert_week",
+        "availabilities",
+        ["Expert_id", "Week_start_date"],
+        False,
+    ),
+    ("ix_chat_participants", "chat", ["Sender_id", "Recipient_id", "Item_id"], False),
+    ("ix_chat_messages_chat", "chat_messages", ["Chat_id", "Timestamp"], False),
+    (
+        "ix_chat_messages_unread",
+        "chat_messages",
+        ["Chat_id", "Sender_id", "Read"],
+        False,
+    ),
+    ("ix_chat_messages_hash", "chat_messages", ["Image_hash"], False),
+    (
+        "ix_middle_expertise_expert_type",
+        "middle_expertise",
+        ["Expert_id", "Type_id"],
+        False,
+    ),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns, unique in INDEXES:
+        # Left for 5d2a7c91e4b3 to create with the table or column
+        if not inspector.has_table(table):
+            continue
+        if not set(columns) <= {
+            column["name"] for column in inspector.get_columns(table)
+        }:
+            continue
+
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,629 @@
+"""Create missing tables, columns and indexes
+
+Brings every database up to date with app/models.py, so that `flask db upgrade`
+is all that is needed to create or update one:
+- new databases get every table, as the revisions before this one only change
+  tables that already exist
+- databases created by db.create_all() before migrations were used get the
+  changes made since:
+  - image hashes, for the blob store and image ETags, and image thumbnails
+  - the items' generated Effective_price and Is_live columns
+  - the auction task columns and the email outbox
+  - the indexes of the listing, bid, watchlist and tag lookups
+  - the SQLite full-text search indexes
+
+Anything a database already has is left as it is.
+
+Revision ID: 5d2a7c91e4b3
+Revises: 8b4e6d2f1a35
+Create Date: 2026-10-18 18:24:05.193846
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+
+# revision identifiers, used by Alembic.
+revision = "5d2a7c91e4b3"
+down_revision = "8b4e6d2f1a35"
+branch_labels = None
+depends_on = None
+
+
+# Indexes added since the tables were first created by db.create_all(), as
+# (index name, table, columns, unique)
+INDEXES = [
+    ("ix_items_available_until", "items", ["Available_until", "Item_id"], False),
+    ("ix_items_effective_price", "items", ["Effective_price"], False),
+    ("ix_middle_type_Item_id", "middle_type", ["Item_id"], False),
+    ("ix_middle_type_type_item", "middle_type", ["Type_id", "Item_id"], False),
+    ("ix_watchlist_user_item", "watchlist", ["User_id", "Item_id"], False),
+    (
+        "ix_bidding_history_item_price",
+        "bidding_history",
+        ["Item_id", "Bid_price"],
+        False,
+    ),
+    (
+        "ix_bidding_history_bidder_item",
+        "bidding_history",
+        ["Bidder_id", "Item_id"],
+        False,
+    ),
+    ("ix_scheduled_task_item_id", "scheduled_task", ["item_id"], False),
+    ("ix_scheduled_task_pending", "scheduled_task", ["status", "execute_at"], False),
+    ("ix_email_outbox_pending", "email_outbox", ["Status", "Send_after"], False),
+]
+
+# The indexes of revision 3f1c2a9d7b64, which skips those over tables or columns
+# the database did not have yet. They are dropped by its downgrade.
+HOT_LOOKUP_INDEXES = [
+    ("ix_user_email", "user", ["Email"], True),
+    ("ix_user_username", "user", ["Username"], True),
+    ("ix_address_user", "address", ["User_id"], False),
+    ("ix_items_seller", "items", ["Seller_id", "Available_until"], False),
+    ("ix_items_expert", "items", ["Expert_id"], False),
+    ("ix_images_item", "images", ["Item_id", "Image_id"], False),
+    ("ix_images_hash", "images", ["Image_hash"], False),
+    ("ix_image_variants_image", "image_variants", ["Image_id", "Variant"], True),
+    ("ix_image_variants_hash", "image_variants", ["Image_hash"], False),
+    (
+        "ix_availabilities_expert_week",
+        "availabilities",
+        ["Expert_id", "Week_start_date"],
+        False,
+    ),
+    ("ix_chat_participants", "chat", ["Sender_id", "Recipient_id", "Item_id"], False),
+    ("ix_chat_messages_chat", "chat_messages", ["Chat_id", "Timestamp"], False),
+    (
+        "ix_chat_messages_unread",
+        "chat_messages",
+        ["Chat_id", "Sender_id", "Read"],
+        False,
+    ),
+    ("ix_chat_messages_hash", "chat_messages", ["Image_hash"], False),
+    (
+        "ix_middle_expertise_expert_type",
+        "middle_expertise",
+        ["Expert_id", "Type_id"],
+        False,
+    ),
+]
+
+# The search documents of items (name, description and tag names) and users,
+# as they were when this revision was written
+ITEM_DOCUMENT = """
+    SELECT
+        i.Item_id,
+        i.Listing_name,
+        coalesce(i.Description, ''),
+        coalesce(
+            (
+                SELECT group_concat(t.Type_name, ' ')
+                FROM middle_type m JOIN types t ON t.Type_id = m.Type_id
+                WHERE m.Item_id = i.Item_id
+            ),
+            ''
+        )
+    FROM items i
+"""
+
+USER_DOCUMENT = """
+    SELECT u.User_id, u.First_name, coalesce(u.Middle_name, ''), u.Surname
+    FROM "user" u
+"""
+
+
+def reindex_items(item_ids):
+    return f"""
+        DELETE FROM items_fts WHERE rowid IN ({item_ids});
+        INSERT INTO items_fts (rowid, Listing_name, Description, Tags)
+        {ITEM_DOCUMENT} WHERE i.Item_id IN ({item_ids});
+    """
+
+
+# The SQLite FTS5 indexes of items and users, and the triggers keeping them in
+# sync with the tables
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        Listing_name, Description, Tags,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    f"""
+    INSERT INTO items_fts (rowid, Listing_name, Description, Tags)
+    {ITEM_DOCUMENT} WHERE NOT EXISTS (SELECT 1 FROM items_fts)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_update
+    AFTER UPDATE OF Listing_name, Description ON items BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = OLD.Item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_tag_insert AFTER INSERT ON middle_type
+    BEGIN
+        {reindex_items("NEW.Item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_tag_delete AFTER DELETE ON middle_type
+    BEGIN
+        {reindex_items("OLD.Item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_fts_type_update
+    AFTER UPDATE OF Type_name ON types BEGIN
+        {reindex_items("SELECT Item_id FROM middle_type WHERE Type_id = NEW.Type_id")}
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        First_name, Middle_name, Surname,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3 4 5'
+    )
+    """,
+    f"""
+    INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+    {USER_DOCUMENT} WHERE NOT EXISTS (SELECT 1 FROM users_fts)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON "user" BEGIN
+        INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+        {USER_DOCUMENT} WHERE u.User_id = NEW.User_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF First_name, Middle_name, Surname ON "user" BEGIN
+        DELETE FROM users_fts WHERE rowid = NEW.User_id;
+        INSERT INTO users_fts (rowid, First_name, Middle_name, Surname)
+        {USER_DOCUMENT} WHERE u.User_id = NEW.User_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON "user" BEGIN
+        DELETE FROM users_fts WHERE rowid = OLD.User_id;
+    END
+    """,
+]
+
+
+def columns(table):
+    return {
+        column["name"]: column
+        for column in sa.inspect(op.get_bind()).get_columns(table)
+    }
+
+
+def hash_images(table_name, key):
+    """
+    Sets the Image_hash of rows that only have their image bytes, the SHA-256 the
+    app gives every new image.
+    """
+    table = sa.table(
+        table_name,
+        sa.column(key, sa.Integer()),
+        sa.column("Image", sa.LargeBinary()),
+        sa.column("Image_hash", sa.String()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(table.c[key], table.c.Image).where(
+            table.c.Image.is_not(None), table.c.Image_hash.is_(None)
+        )
+    )
+    for row_id, image in rows.all():
+        connection.execute(
+            table.update()
+            .where(table.c[key] == row_id)
+            .values(Image_hash=hashlib.sha256(image).hexdigest())
+        )
+
+
+def create_tables():
+    """
+    Creates the tables as they were when they were created by db.create_all(),
+    if they do not exist. The rest of the upgrade brings them up to date.
+    """
+    op.create_table(
+        "user",
+        sa.Column("User_id", sa.Integer(), nullable=False),
+        sa.Column("Username", sa.String(length=50), nullable=False),
+        sa.Column("Password", sa.String(length=500), nullable=False),
+        sa.Column("Email", sa.String(length=50), nullable=False),
+        sa.Column("Customer_ID", sa.String(length=100), nullable=True),
+        sa.Column("Setup_intent_ID", sa.String(length=100), nullable=True),
+        sa.Column("Payment_method_ID", sa.String(length=100), nullable=True),
+        sa.Column("First_name", sa.String(length=50), nullable=False),
+        sa.Column("Middle_name", sa.String(length=50), nullable=True),
+        sa.Column("Surname", sa.String(length=50), nullable=False),
+        sa.Column("DOB", sa.Date(), nullable=False),
+        sa.Column("Level_of_access", sa.Integer(), nullable=False),
+        sa.Column("Is_expert", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("User_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "profit_structure",
+        sa.Column("Structure_id", sa.Integer(), nullable=False),
+        sa.Column("Expert_split", sa.Float(), nullable=False),
+        sa.Column("Manager_split", sa.Float(), nullable=False),
+        sa.Column("Enforced_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("Structure_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "types",
+        sa.Column("Type_id", sa.Integer(), nullable=False),
+        sa.Column("Type_name", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("Type_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "scheduled_task",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_name", sa.String(length=50), nullable=False),
+        sa.Column("task_args", sa.JSON(), nullable=True),
+        sa.Column("execute_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "address",
+        sa.Column("Address_id", sa.Integer(), nullable=False),
+        sa.Column("User_id", sa.Integer(), nullable=False),
+        sa.Column("Line_1", sa.String(length=50), nullable=False),
+        sa.Column("Line_2", sa.String(length=50), nullable=False),
+        sa.Column("Country", sa.String(length=50), nullable=False),
+        sa.Column("City", sa.String(length=50), nullable=False),
+        sa.Column("Region", sa.String(length=50), nullable=False),
+        sa.Column("Postcode", sa.String(length=50), nullable=False),
+        sa.Column("Is_billing", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["User_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Address_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "payment",
+        sa.Column("Payment_id", sa.Integer(), nullable=False),
+        sa.Column("User_id", sa.Integer(), nullable=False),
+        sa.Column("Card_Number", sa.Integer(), nullable=False),
+        sa.Column("CVV", sa.Integer(), nullable=False),
+        sa.Column("Expiry", sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(["User_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Payment_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "availabilities",
+        sa.Column("Availability_id", sa.Integer(), nullable=False),
+        sa.Column("Expert_id", sa.Integer(), nullable=False),
+        sa.Column("Day_of_week", sa.Integer(), nullable=False),
+        sa.Column("Start_time", sa.Time(), nullable=False),
+        sa.Column("End_time", sa.Time(), nullable=False),
+        sa.Column("Week_start_date", sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(["Expert_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Availability_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "middle_expertise",
+        sa.Column("Middle_expertise_id", sa.Integer(), nullable=False),
+        sa.Column("Expert_id", sa.Integer(), nullable=False),
+        sa.Column("Type_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["Expert_id"], ["user.User_id"]),
+        sa.ForeignKeyConstraint(["Type_id"], ["types.Type_id"]),
+        sa.PrimaryKeyConstraint("Middle_expertise_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "items",
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.Column("Listing_name", sa.String(length=50), nullable=False),
+        sa.Column("Seller_id", sa.Integer(), nullable=False),
+        sa.Column("Upload_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("Available_until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("Min_price", sa.Float(), nullable=False),
+        sa.Column("Current_bid", sa.Float(), nullable=False),
+        sa.Column("Description", sa.String(length=500), nullable=False),
+        sa.Column("Structure_id", sa.Integer(), nullable=True),
+        sa.Column("Sold", sa.Boolean(), nullable=True),
+        sa.Column("Expert_id", sa.Integer(), nullable=True),
+        sa.Column("Verified", sa.Boolean(), nullable=False),
+        sa.Column("Authentication_request", sa.Boolean(), nullable=False),
+        sa.Column("Authentication_request_approved", sa.Boolean(), nullable=True),
+        sa.Column("Second_opinion", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["Expert_id"], ["user.User_id"]),
+        sa.ForeignKeyConstraint(["Seller_id"], ["user.User_id"]),
+        sa.ForeignKeyConstraint(["Structure_id"], ["profit_structure.Structure_id"]),
+        sa.PrimaryKeyConstraint("Item_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "images",
+        sa.Column("Image_id", sa.Integer(), nullable=False),
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.Column("Image", sa.LargeBinary(), nullable=False),
+        sa.Column("Image_description", sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(["Item_id"], ["items.Item_id"]),
+        sa.PrimaryKeyConstraint("Image_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "middle_type",
+        sa.Column("Middle_type_id", sa.Integer(), nullable=False),
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.Column("Type_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["Item_id"], ["items.Item_id"]),
+        sa.ForeignKeyConstraint(["Type_id"], ["types.Type_id"]),
+        sa.PrimaryKeyConstraint("Middle_type_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "watchlist",
+        sa.Column("Watchlist_id", sa.Integer(), nullable=False),
+        sa.Column("User_id", sa.Integer(), nullable=False),
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["Item_id"], ["items.Item_id"]),
+        sa.ForeignKeyConstraint(["User_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Watchlist_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "bidding_history",
+        sa.Column("Bid_id", sa.Integer(), nullable=False),
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.Column("Bidder_id", sa.Integer(), nullable=False),
+        sa.Column("Successful_bid", sa.Boolean(), nullable=False),
+        sa.Column("Bid_datetime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("Bid_price", sa.Float(), nullable=False),
+        sa.Column("Winning_bid", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["Bidder_id"], ["user.User_id"]),
+        sa.ForeignKeyConstraint(["Item_id"], ["items.Item_id"]),
+        sa.PrimaryKeyConstraint("Bid_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "chat",
+        sa.Column("Chat_id", sa.Integer(), nullable=False),
+        sa.Column("Sender_id", sa.Integer(), nullable=False),
+        sa.Column("Recipient_id", sa.Integer(), nullable=False),
+        sa.Column("Item_id", sa.Integer(), nullable=False),
+        sa.Column("Active", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["Item_id"], ["items.Item_id"]),
+        sa.ForeignKeyConstraint(["Recipient_id"], ["user.User_id"]),
+        sa.ForeignKeyConstraint(["Sender_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Chat_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "chat_messages",
+        sa.Column("Message_id", sa.Integer(), nullable=False),
+        sa.Column("Chat_id", sa.Integer(), nullable=False),
+        sa.Column("Sender_id", sa.Integer(), nullable=False),
+        sa.Column("Content", sa.Text(), nullable=True),
+        sa.Column("Image", sa.LargeBinary(), nullable=True),
+        sa.Column("Timestamp", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("Read", sa.Boolean(), nullable=False),
+        sa.Column("Read_timestamp", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["Chat_id"], ["chat.Chat_id"]),
+        sa.ForeignKeyConstraint(["Sender_id"], ["user.User_id"]),
+        sa.PrimaryKeyConstraint("Message_id"),
+        if_not_exists=True,
+    )
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    create_tables()
+
+    # Images are kept in the blob store under their hash, with thumbnails
+    images = columns("images")
+    if "Image_hash" not in images:
+        op.add_column("images", sa.Column("Image_hash", sa.String(length=64)))
+    if not images["Image"]["nullable"]:
+        with op.batch_alter_table("images") as batch_op:
+            batch_op.alter_column(
+                "Image", existing_type=sa.LargeBinary(), nullable=True
+            )
+    hash_images("images", "Image_id")
+
+    if "Image_hash" not in columns("chat_messages"):
+        op.add_column("chat_messages", sa.Column("Image_hash", sa.String(length=64)))
+    hash_images("chat_messages", "Message_id")
+
+    op.create_table(
+        "image_variants",
+        sa.Column("Variant_id", sa.Integer(), nullable=False),
+        sa.Column("Image_id", sa.Integer(), nullable=False),
+        sa.Column("Variant", sa.String(length=20), nullable=False),
+        sa.Column("Image", sa.LargeBinary(), nullable=True),
+        sa.Column("Image_hash", sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(["Image_id"], ["images.Image_id"]),
+        sa.PrimaryKeyConstraint("Variant_id"),
+        if_not_exists=True,
+    )
+
+    # SQLite can only add stored generated columns by rebuilding the table
+    items = columns("items")
+    if "Effective_price" not in items or "Is_live" not in items:
+        with op.batch_alter_table(
+            "items", recreate="always" if dialect == "sqlite" else "auto"
+        ) as batch_op:
+            if "Effective_price" not in items:
+                batch_op.add_column(
+                    sa.Column(
+                        "Effective_price",
+                        sa.Float(),
+                        sa.Computed(
+                            'CASE WHEN "Current_bid" < "Min_price" THEN "Min_price" '
+                            'ELSE "Current_bid" END',
+                            persisted=True,
+                        ),
+                    )
+                )
+            if "Is_live" not in items:
+                batch_op.add_column(
+                    sa.Column(
+                        "Is_live",
+                        sa.Boolean(),
+                        sa.Computed(
+                            'CASE WHEN NOT "Authentication_request" AND ('
+                            '("Verified" AND "Authentication_request_approved") OR '
+                            '(NOT "Verified" AND "Authentication_request_approved" '
+                            "IS NULL)) THEN TRUE ELSE FALSE END",
+                            persisted=True,
+                        ),
+                    )
+                )
+
+    # New databases had no items table for revision 8b4e6d2f1a35 to add it to
+    if "Version" not in columns("items"):
+        op.add_column(
+            "items",
+            sa.Column("Version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Each item has at most one pending auction task, retried until it is dead
+    tasks = columns("scheduled_task")
+    if "item_id" not in tasks:
+        op.add_column("scheduled_task", sa.Column("item_id", sa.Integer()))
+    if "status" not in tasks:
+        op.add_column(
+            "scheduled_task",
+            sa.Column(
+                "status", sa.String(length=20), nullable=False, server_default="pending"
+            ),
+        )
+    if "attempts" not in tasks:
+        op.add_column(
+            "scheduled_task",
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if "last_error" not in tasks:
+        op.add_column("scheduled_task", sa.Column("last_error", sa.Text()))
+
+    # Tasks stored before item_id had a column only name the item in task_args.
+    # Completed tasks are deleted, as they are now once processed.
+    scheduled_task = sa.table(
+        "scheduled_task",
+        sa.column("id", sa.Integer()),
+        sa.column("task_args", sa.JSON()),
+        sa.column("item_id", sa.Integer()),
+        sa.column("completed", sa.Boolean()),
+    )
+    connection = op.get_bind()
+    connection.execute(
+        scheduled_task.delete().where(
+            scheduled_task.c.item_id.is_(None), scheduled_task.c.completed == True
+        )
+    )
+    legacy_tasks = connection.execute(
+        sa.select(scheduled_task.c.id, scheduled_task.c.task_args).where(
+            scheduled_task.c.item_id.is_(None)
+        )
+    )
+    for task_id, task_args in legacy_tasks.all():
+        item_id = (task_args or {}).get("item_id")
+        if item_id is not None:
+            connection.execute(
+                scheduled_task.update()
+                .where(scheduled_task.c.id == task_id)
+                .values(item_id=item_id)
+            )
+
+    op.create_table(
+        "email_outbox",
+        sa.Column("Email_id", sa.Integer(), nullable=False),
+        sa.Column("Recipient", sa.String(length=50), nullable=False),
+        sa.Column("Subject", sa.String(length=200), nullable=False),
+        sa.Column("Body", sa.Text(), nullable=False),
+        sa.Column("Status", sa.String(length=20), nullable=False),
+        sa.Column("Attempts", sa.Integer(), nullable=False),
+        sa.Column("Last_error", sa.Text(), nullable=True),
+        sa.Column("Send_after", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("Sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("Email_id"),
+        if_not_exists=True,
+    )
+
+    for name, table, index_columns, unique in INDEXES + HOT_LOOKUP_INDEXES:
+        op.create_index(name, table, index_columns, unique=unique, if_not_exists=True)
+    op.create_index(
+        "ix_items_live",
+        "items",
+        ["Available_until", "Item_id"],
+        sqlite_where=sa.text('"Is_live" = 1'),
+        postgresql_where=sa.text('"Is_live"'),
+        if_not_exists=True,
+    )
+
+    # Rebuilding the items table drops its triggers, so they are (re)created after
+    if dialect == "sqlite":
+        for statement in SEARCH_INDEX_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        for table in ("items_fts", "users_fts"):
+            op.execute(f"DROP TABLE IF EXISTS {table}")
+        for trigger in (
+            "items_fts_insert",
+            "items_fts_update",
+            "items_fts_delete",
+            "items_fts_tag_insert",
+            "items_fts_tag_delete",
+            "items_fts_type_update",
+            "users_fts_insert",
+            "users_fts_update",
+            "users_fts_delete",
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    op.drop_index("ix_items_live", table_name="items", if_exists=True)
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+
+    op.drop_table("email_outbox")
+
+    with op.batch_alter_table("scheduled_task") as batch_op:
+        for column in ("last_error", "attempts", "status", "item_id"):
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table("items") as batch_op:
+        batch_op.drop_column("Is_live")
+        batch_op.drop_column("Effective_price")
+
+    op.drop_table("image_variants")
+
+    # The hash indexes of revision 3f1c2a9d7b64 go with their columns
+    op.drop_index("ix_chat_messages_hash", table_name="chat_messages", if_exists=True)
+    op.drop_index("ix_images_hash", table_name="images", if_exists=True)
+
+    with op.batch_alter_table("chat_messages") as batch_op:
+        batch_op.drop_column("Image_hash")
+
+    # Images kept in the blob store have no bytes, so Image stays nullable
+    with op.batch_alter_table("images") as batch_op:
+        batch_op.drop_column("Image_hash")
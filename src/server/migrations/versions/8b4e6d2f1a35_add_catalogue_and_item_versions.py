@@ -0,0 +1,54 @@
+"""Add catalogue and item versions
+
+The versions are incremented whenever a listing changes, and are used as the
+ETags of the listing endpoints.
+
+Revision ID: 8b4e6d2f1a35
+Revises: 3f1c2a9d7b64
+Create Date: 2026-10-18 16:21:07.348211
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8b4e6d2f1a35"
+down_revision = "3f1c2a9d7b64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalogue_version = op.create_table(
+        "catalogue_version",
+        sa.Column("Id", sa.Integer(), nullable=False),
+        sa.Column("Version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("Id"),
+        if_not_exists=True,
+    )
+    op.execute(
+        catalogue_version.insert().from_select(
+            ["Id", "Version"],
+            sa.select(sa.literal(1), sa.literal(0)).where(
+                ~sa.exists().where(catalogue_version.c.Id == 1)
+            ),
+        )
+    )
+
+    # Databases created by db.create_all() may already have the column, and new
+    # databases get it with the items table from 5d2a7c91e4b3
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("items") and "Version" not in {
+        column["name"] for column in inspector.get_columns("items")
+    }:
+        op.add_column(
+            "items",
+            sa.Column("Version", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade():
+    op.drop_column("items", "Version")
+
+    op.drop_table("catalogue_version")
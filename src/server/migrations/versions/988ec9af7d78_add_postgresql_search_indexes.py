@@ -0,0 +1,54 @@
+"""Add PostgreSQL search indexes
+
+GIN indexes over the search vectors of items, tags and users, which searches on
+PostgreSQL match against. SQLite searches use the FTS5 indexes instead.
+
+The planner only uses an expression index for the exact same expression, so
+these must match ITEM_VECTOR, TAG_VECTOR and USER_VECTOR in app/search.py.
+
+Revision ID: 988ec9af7d78
+Revises: 5d2a7c91e4b3
+Create Date: 2026-10-18 17:36:52.480917
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "988ec9af7d78"
+down_revision = "5d2a7c91e4b3"
+branch_labels = None
+depends_on = None
+
+
+SEARCH_INDEX_DDL = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin (((
+        setweight(to_tsvector('simple', "Listing_name"), 'A')
+        || setweight(to_tsvector('simple', coalesce("Description", '')), 'D')
+    )))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_types_search ON types
+    USING gin ((to_tsvector('simple', "Type_name")))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_user_search ON "user" USING gin ((to_tsvector(
+        'simple',
+        "First_name" || ' ' || coalesce("Middle_name", '') || ' ' || "Surname"
+    )))
+    """,
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for statement in SEARCH_INDEX_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for index in ("ix_user_search", "ix_types_search", "ix_items_search"):
+            op.execute(f"DROP INDEX IF EXISTS {index}")
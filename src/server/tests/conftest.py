@@ -0,0 +1,235 @@
+import sys
+import os
+import pytest
+import threading
+import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.security import generate_password_hash
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import User, Items
+
+# Password of the users added by add_user
+PASSWORD = "UserPass123@"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmarks",
+        action="store_true",
+        help="run the benchmarks, which seed large tables and take minutes",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: seeds a large table and prints timings, "
+        "only run with --benchmarks or RUN_BENCHMARKS=1",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Skips the benchmarks unless asked for, so the default run stays fast and
+    does not depend on the speed of the machine.
+    """
+    if config.getoption("--benchmarks") or os.environ.get("RUN_BENCHMARKS") == "1":
+        return
+
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def database():
+    """
+    A test client, with the app context pushed and the tables created for the
+    test and dropped after it.
+    """
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+
+            yield client
+
+            db.session.remove()
+            db.drop_all()
+
+
+def add_user(username, level_of_access=1, **columns):
+    """
+    Adds a user who can log in with PASSWORD.
+
+    Args:
+    - username (str): The username, also used for the email address.
+    - level_of_access (int): 1 for users, 2 for experts and 3 for managers.
+    - columns: Values for any other columns, e.g. First_name.
+
+    Returns:
+    - User: The added user.
+    """
+    user = User(
+        **{
+            "Username": username,
+            "Password": generate_password_hash(PASSWORD),
+            "Email": f"{username}@gmail.com",
+            "First_name": "Jane",
+            "Surname": "Smith",
+            "DOB": datetime.date(1988, 6, 15),
+            "Level_of_access": level_of_access,
+            "Is_expert": level_of_access == 2,
+            **columns,
+        }
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client, username):
+    """
+    Logs a user added by add_user in, logging out whoever was logged in.
+
+    Returns:
+    - User: The logged in user.
+    """
+    client.post("/api/logout")
+    response = client.post(
+        "/api/login",
+        json={"email_or_username": username, "password": PASSWORD},
+    )
+    assert response.status_code == 200
+    return User.query.filter_by(Username=username).first()
+
+
+def seed_users(count, **columns):
+    """
+    Bulk inserts users named user<id>, who cannot log in.
+
+    Args:
+    - count (int): The number of users.
+    - columns: Values for other columns, the same for every user.
+
+    Returns:
+    - list: The IDs of the users.
+    """
+    start = (db.session.query(db.func.max(User.User_id)).scalar() or 0) + 1
+    user_ids = range(start, start + count)
+
+    for offset in range(0, count, 50000):
+        db.session.execute(
+            db.insert(User),
+            [
+                {
+                    "User_id": user_id,
+                    "Username": f"user{user_id}",
+                    "Password": "not a real hash",
+                    "Email": f"user{user_id}@gmail.com",
+                    "First_name": "John",
+                    "Surname": f"Smith{user_id}",
+                    "DOB": datetime.date(1990, 1, 1),
+                    "Level_of_access": 1,
+                    "Is_expert": False,
+                    **columns,
+                }
+                for user_id in user_ids[offset : offset + 50000]
+            ],
+        )
+    db.session.commit()
+    return list(user_ids)
+
+
+def seed_items(
+    count,
+    ends_in=datetime.timedelta(days=2),
+    spacing=datetime.timedelta(minutes=1),
+    **columns,
+):
+    """
+    Bulk inserts items named Item <id>, ending one after another.
+
+    Args:
+    - count (int): The number of items.
+    - ends_in (timedelta): How long from now the first item ends.
+    - spacing (timedelta): The time between one item ending and the next.
+    - columns: Values for other columns, the same for every item, e.g.
+      Seller_id (the first user by default).
+
+    Returns:
+    - list: The IDs of the items.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = (db.session.query(db.func.max(Items.Item_id)).scalar() or 0) + 1
+    item_ids = range(start, start + count)
+
+    for offset in range(0, count, 50000):
+        db.session.execute(
+            db.insert(Items),
+            [
+                {
+                    "Item_id": item_id,
+                    "Listing_name": f"Item {item_id}",
+                    "Seller_id": 1,
+                    "Upload_datetime": now,
+                    "Available_until": now + ends_in + spacing * (item_id - start),
+                    "Min_price": 10,
+                    "Current_bid": 0,
+                    "Description": "A test item",
+                    "Verified": False,
+                    "Authentication_request": False,
+                    **columns,
+                }
+                for item_id in item_ids[offset : offset + 50000]
+            ],
+        )
+    db.session.commit()
+    return list(item_ids)
+
+
+def capture_statements(run):
+    """
+    Records the SQL statements, and their parameters, executed by run().
+    Statements run by background threads (e.g. the scheduler) are ignored.
+
+    Returns:
+    - tuple: What run() returned, and the list of (statement, parameters).
+    """
+    statements = []
+    thread = threading.get_ident()
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if threading.get_ident() == thread:
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = run()
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    return result, statements
+
+
+def count_queries(request):
+    """
+    Counts the SQL statements executed while serving a request.
+
+    Args:
+    - request (callable): Makes the request, e.g. lambda: client.post(url).
+
+    Returns:
+    - tuple: The response, and the number of statements.
+    """
+    response, statements = capture_statements(request)
+    return response, len(statements)
@@ -0,0 +1,192 @@
+import sys
+import os
+import pytest
+import time
+import threading
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Items, ScheduledTask
+from app.taskqueue import (
+    scheduler,
+    schedule_auction,
+    load_scheduled_tasks,
+    auction_job_id,
+)
+from sqlalchemy import event
+from conftest import add_user, login
+
+
+@pytest.fixture
+def client(database):
+    add_user("testseller")
+
+    yield database
+
+    for job in scheduler.get_jobs():
+        if job.id.startswith("auction_"):
+            job.remove()
+
+
+def add_item(ends_in):
+    item = Items(
+        Listing_name="Rolex Watch",
+        Seller_id=1,
+        Upload_datetime=datetime.datetime.now(datetime.timezone.utc),
+        Available_until=datetime.datetime.now(datetime.timezone.utc) + ends_in,
+        Min_price=100,
+        Current_bid=0,
+        Description="Luxury Rolex Watch",
+        Verified=True,
+        Authentication_request=False,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def wait_for_task(item_id, timeout=5):
+    """
+    Waits until the item's pending task has been processed.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        db.session.expire_all()
+        if ScheduledTask.query.filter_by(item_id=item_id).count() == 0:
+            return time.perf_counter()
+        time.sleep(0.005)
+    raise AssertionError("Auction was not ended")
+
+
+def test_rescheduling_replaces_task(client):
+    item = add_item(datetime.timedelta(days=1))
+    schedule_auction(item)
+
+    item.Available_until += datetime.timedelta(days=1)
+    db.session.commit()
+    schedule_auction(item)
+
+    tasks = ScheduledTask.query.filter_by(item_id=item.Item_id).all()
+    assert len(tasks) == 1
+    job = scheduler.get_job(auction_job_id(item.Item_id))
+    assert job.next_run_time == item.Available_until.replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def test_accepted_request_reschedules_auction(client):
+    expert = add_user("testexpert", 2, Is_expert=True)
+    item = add_item(datetime.timedelta(days=1))
+    item.Upload_datetime -= datetime.timedelta(days=5)
+    item.Verified = False
+    item.Authentication_request = True
+    item.Expert_id = expert.User_id
+    db.session.commit()
+    schedule_auction(item)
+
+    login(client, "testexpert")
+    response = client.post(
+        "/api/update_auth_request",
+        json={"request_id": item.Item_id, "action": "accept"},
+    )
+    assert response.status_code == 200
+
+    # The auction ends when the listing now does, not when it was going to
+    db.session.expire_all()
+    item = db.session.get(Items, item.Item_id)
+    task = ScheduledTask.query.filter_by(item_id=item.Item_id).one()
+    assert task.execute_at == item.Available_until
+    job = scheduler.get_job(auction_job_id(item.Item_id))
+    assert job.next_run_time == item.Available_until.replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def test_auction_ends_at_deadline(client):
+    item = add_item(datetime.timedelta(milliseconds=300))
+    schedule_auction(item)
+    deadline = time.perf_counter() + 0.3
+
+    ended_at = wait_for_task(item.Item_id)
+    latency = ended_at - deadline
+    print(f"\nAuction closed {latency * 1000:.0f}ms after its deadline")
+
+    assert latency < 1
+    assert scheduler.get_job(auction_job_id(item.Item_id)) is None
+
+
+def test_pending_tasks_loaded_on_startup(client):
+    future_item = add_item(datetime.timedelta(days=1))
+    past_item = add_item(datetime.timedelta(seconds=-10))
+    for item in [future_item, past_item]:
+        db.session.add(
+            ScheduledTask(
+                task_name="process_auction_ending",
+                task_args={"item_id": item.Item_id},
+                item_id=item.Item_id,
+                execute_at=item.Available_until,
+                completed=False,
+            )
+        )
+    db.session.commit()
+
+    load_scheduled_tasks()
+
+    assert scheduler.get_job(auction_job_id(future_item.Item_id)) is not None
+    # Auctions that ended while the server was down are closed straight away
+    wait_for_task(past_item.Item_id)
+
+
+def test_legacy_tasks_loaded_on_startup(client):
+    future_item = add_item(datetime.timedelta(days=1))
+    past_item = add_item(datetime.timedelta(seconds=-10))
+    ended_item = add_item(datetime.timedelta(days=-1))
+
+    # Tasks stored before item_id had a column only name the item in task_args
+    for item, completed in [
+        (future_item, False),
+        (past_item, False),
+        (ended_item, True),
+    ]:
+        db.session.add(
+            ScheduledTask(
+                task_name="process_auction_ending",
+                task_args={"item_id": item.Item_id},
+                execute_at=item.Available_until,
+                completed=completed,
+            )
+        )
+    db.session.commit()
+
+    load_scheduled_tasks()
+
+    assert scheduler.get_job(auction_job_id(future_item.Item_id)) is not None
+    assert ScheduledTask.query.filter_by(item_id=future_item.Item_id).one()
+    wait_for_task(past_item.Item_id)
+
+    # Completed tasks are not run again
+    assert scheduler.get_job(auction_job_id(ended_item.Item_id)) is None
+    assert ScheduledTask.query.filter_by(item_id=None).count() == 0
+    assert ScheduledTask.query.count() == 1
+
+
+def test_no_queries_while_idle(client):
+    schedule_auction(add_item(datetime.timedelta(days=1)))
+
+    statements = []
+    test_thread = threading.get_ident()
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if threading.get_ident() != test_thread:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        time.sleep(4)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    assert statements == []
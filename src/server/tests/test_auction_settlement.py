@@ -0,0 +1,199 @@
+import sys
+import os
+import pytest
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import User, Items, Bidding_history, ScheduledTask, Email_outbox
+from app.payments import LocalPaymentIntent
+from app.taskqueue import (
+    load_scheduled_tasks,
+    process_auction_ending,
+    charge_user,
+)
+from conftest import add_user, seed_items
+
+# Auctions settled by the benchmark, set to 10000 for the full offline run
+BENCHMARK_AUCTIONS = int(os.environ.get("SETTLEMENT_BENCHMARK_AUCTIONS", 500))
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    # Settles auctions against the local payment and mail stand-ins
+    monkeypatch.setitem(
+        app.config, "PAYMENT_INTENTS", "app.payments.LocalPaymentIntent"
+    )
+    monkeypatch.setitem(app.config, "SETTLEMENT_RETRY_DELAY", 0.05)
+    monkeypatch.setitem(app.config, "SETTLEMENT_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(app.extensions["mail"], "suppress", True)
+    monkeypatch.setitem(app.config, "OUTBOX_RATE_LIMIT", 10000)
+    LocalPaymentIntent.intents.clear()
+
+    return database
+
+
+def seed_auctions(count, payment_method="pm_card_visa"):
+    """
+    Adds a bidder and count auctions that have ended with a bid from them.
+    """
+    bidder = add_user(
+        "bidder", Customer_ID="cus_local", Payment_method_ID=payment_method
+    )
+    seed_items(
+        count,
+        ends_in=-datetime.timedelta(minutes=1),
+        spacing=datetime.timedelta(0),
+        Seller_id=bidder.User_id,
+        Current_bid=20,
+        Sold=False,
+    )
+
+    ended = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+    db.session.execute(
+        db.insert(Bidding_history),
+        [
+            {
+                "Item_id": i,
+                "Bidder_id": bidder.User_id,
+                "Successful_bid": True,
+                "Bid_datetime": ended,
+                "Bid_price": 20,
+                "Winning_bid": False,
+            }
+            for i in range(1, count + 1)
+        ],
+    )
+    db.session.execute(
+        db.insert(ScheduledTask),
+        [
+            {
+                "task_name": "process_auction_ending",
+                "task_args": {"item_id": i},
+                "item_id": i,
+                "execute_at": ended,
+                "completed": False,
+                "status": "pending",
+                "attempts": 0,
+            }
+            for i in range(1, count + 1)
+        ],
+    )
+    db.session.commit()
+
+
+def wait_for_settlement(timeout=120):
+    """
+    Waits until no auction is waiting to be settled.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        db.session.expire_all()
+        if ScheduledTask.query.filter_by(status="pending").count() == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError("Auctions were not settled")
+
+
+def test_auction_settled(client):
+    seed_auctions(1)
+
+    load_scheduled_tasks()
+    wait_for_settlement()
+
+    assert db.session.get(Items, 1).Sold
+    assert Bidding_history.query.one().Winning_bid
+    assert ScheduledTask.query.count() == 0
+    assert len(LocalPaymentIntent.intents) == 1
+    # The winner's email is queued with the sale
+    assert [email.Subject for email in Email_outbox.query.all()] == ["Auction Won!"]
+
+
+def test_failed_settlement_is_dead_lettered(client):
+    seed_auctions(1, payment_method="pm_card_chargeDeclined")
+
+    load_scheduled_tasks()
+    wait_for_settlement()
+
+    task = ScheduledTask.query.one()
+    assert task.status == "dead"
+    assert task.attempts == 3
+    assert task.last_error == "Payment processing failed"
+    assert not db.session.get(Items, 1).Sold
+
+
+def test_settlement_committed_as_a_whole(client, monkeypatch):
+    seed_auctions(1)
+
+    def send_auction_notifications(item, winning_bid):
+        raise Exception("Failed to send notifications")
+
+    monkeypatch.setattr(
+        "app.taskqueue.send_auction_notifications", send_auction_notifications
+    )
+    load_scheduled_tasks()
+    wait_for_settlement()
+
+    # Nothing from the failed attempts is committed, and the error is kept
+    task = ScheduledTask.query.one()
+    assert task.status == "dead"
+    assert task.last_error == "Failed to send notifications"
+    assert not db.session.get(Items, 1).Sold
+    assert not Bidding_history.query.one().Winning_bid
+    assert Email_outbox.query.count() == 0
+    # The retries reuse the first charge
+    assert len(LocalPaymentIntent.intents) == 1
+
+
+def test_charge_is_idempotent(client):
+    seed_auctions(1)
+    bidder = User.query.first()
+
+    first = charge_user(bidder, 20, idempotency_key="auction_1_bid_1")
+    retry = charge_user(bidder, 20, idempotency_key="auction_1_bid_1")
+
+    assert first["success"] and retry["success"]
+    assert first["payment_intent_id"] == retry["payment_intent_id"]
+    assert len(LocalPaymentIntent.intents) == 1
+
+
+def test_many_auctions_settled_once(client):
+    seed_auctions(20)
+
+    load_scheduled_tasks()
+    wait_for_settlement()
+
+    assert Items.query.filter_by(Sold=True).count() == 20
+    assert Bidding_history.query.filter_by(Winning_bid=True).count() == 20
+    assert len(LocalPaymentIntent.intents) == 20
+    assert ScheduledTask.query.count() == 0
+
+
+@pytest.mark.benchmark
+def test_settlement_throughput_benchmark(client, monkeypatch):
+    # Roughly the round trip of a real Stripe request
+    monkeypatch.setitem(app.config, "LOCAL_PAYMENT_LATENCY", 0.05)
+    seed_auctions(BENCHMARK_AUCTIONS)
+
+    # Settles a sample one at a time, as the old polling loop did
+    sample = BENCHMARK_AUCTIONS // 10
+    start = time.perf_counter()
+    for item_id in range(1, sample + 1):
+        process_auction_ending(item_id)
+    serial_rate = sample / (time.perf_counter() - start)
+
+    # Settles the rest on the worker pool
+    start = time.perf_counter()
+    load_scheduled_tasks()
+    wait_for_settlement()
+    pool_rate = (BENCHMARK_AUCTIONS - sample) / (time.perf_counter() - start)
+
+    print(
+        f"\nSettled {BENCHMARK_AUCTIONS} auctions: {serial_rate:.0f}/s serially, "
+        f"{pool_rate:.0f}/s on the worker pool"
+    )
+
+    assert Items.query.filter_by(Sold=True).count() == BENCHMARK_AUCTIONS
+    assert len(LocalPaymentIntent.intents) == BENCHMARK_AUCTIONS
+    assert pool_rate > serial_rate * 3
@@ -6,6 +6,7 @@ import datetime
 from werkzeug.security import generate_password_hash
 from app import app, db
 from app.models import User, Items, Bidding_history
+from conftest import count_queries
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -266,3 +267,58 @@ def test_get_bid_filtering_expired(client, logged_in_user):
     filtered_listing_ids = json.loads(response.data)
     assert len(filtered_listing_ids) > 0
     assert expired_item.Item_id in filtered_listing_ids
+
+
+def test_get_bid_filtering_query_count(client, logged_in_user):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    item_ids = []
+    for i in range(200):
+        item = Items(
+            Listing_name=f"Item {i}",
+            Seller_id=3,
+            Available_until=now + datetime.timedelta(days=1 if i % 2 else -1),
+            Min_price=10,
+            Current_bid=20,
+            Description="A test item",
+            Verified=False,
+            Authentication_request=False,
+        )
+        db.session.add(item)
+        db.session.flush()
+        item_ids.append(item.Item_id)
+
+        # Wins the ended auctions at even positions, is outbid on the others
+        db.session.add(
+            Bidding_history(
+                Item_id=item.Item_id,
+                Bidder_id=logged_in_user.User_id,
+                Successful_bid=i % 2 == 0,
+                Bid_datetime=now,
+                Bid_price=20,
+                Winning_bid=i % 2 == 0,
+            )
+        )
+    db.session.commit()
+
+    # Loads the logged in user into the session first, so only the filter is counted
+    client.post("/api/get_bid_filtering", json={"bid_status": "won"})
+
+    counts = []
+    for listing_ids in (item_ids[:2], item_ids):
+        response, count = count_queries(
+            lambda: client.post(
+                "/api/get_bid_filtering",
+                json={"bid_status": "won", "listing_Ids": listing_ids},
+            )
+        )
+        assert json.loads(response.data) == listing_ids[::2]
+        counts.append(count)
+
+    # The same number of queries, however many listings are filtered
+    assert counts[0] == counts[1]
+
+    response = client.post(
+        "/api/get_bid_filtering",
+        json={"bid_status": "out_bid", "listing_Ids": list(reversed(item_ids))},
+    )
+    assert json.loads(response.data) == list(reversed(item_ids[1::2]))
@@ -0,0 +1,151 @@
+import sys
+import os
+import pytest
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db, socketio
+from app.models import User, Items, Watchlist
+from app.bidding import record_bid
+from conftest import PASSWORD, add_user, capture_statements, seed_users
+
+
+@pytest.fixture
+def client(database):
+    for username in ["bidder", "watcher", "bystander"]:
+        add_user(username)
+
+    for name in ["Rolex Watch", "Omega Watch"]:
+        db.session.add(
+            Items(
+                Listing_name=name,
+                Seller_id=1,
+                Upload_datetime=datetime.datetime.now(datetime.timezone.utc),
+                Available_until=datetime.datetime.now(datetime.timezone.utc)
+                + datetime.timedelta(days=7),
+                Min_price=100,
+                Current_bid=0,
+                Description="A watch",
+                Verified=True,
+                Authentication_request=False,
+            )
+        )
+    db.session.commit()
+
+    return database
+
+
+def connect(username):
+    """
+    Logs a user in and connects a Socket.IO client with their session.
+
+    The test's app context is shared by every client, so handlers see the user
+    who logged in last; each client joins its rooms right after connecting.
+    """
+    http_client = app.test_client()
+    http_client.post(
+        "/api/login",
+        json={"email_or_username": username, "password": PASSWORD},
+        content_type="application/json",
+    )
+    socket = socketio.test_client(app, flask_test_client=http_client)
+    assert socket.is_connected()
+    return socket
+
+
+def bid_updates(socket):
+    return [
+        message["args"][0]
+        for message in socket.get_received()
+        if message["name"] == "bid_update"
+    ]
+
+
+def bid(socket, username, item_id, amount):
+    """
+    Places a bid and sends the place_bid event, as the listing page does.
+    """
+    user = User.query.filter_by(Username=username).first()
+    assert record_bid(item_id, user.User_id, amount)
+    socket.emit("place_bid", {"item_id": item_id, "bid_amount": amount})
+
+
+def test_bid_update_reaches_item_room_only(client):
+    watcher_id = User.query.filter_by(Username="watcher").first().User_id
+    db.session.add(Watchlist(User_id=watcher_id, Item_id=1))
+    db.session.commit()
+
+    bidder = connect("bidder")
+    watcher = connect("watcher")
+    watcher.emit("join_get_bids")
+    viewer = connect("bystander")
+    viewer.emit("join_item", {"item_id": 1})
+    other_viewer = connect("bystander")
+    other_viewer.emit("join_item", {"item_id": 2})
+
+    bid(bidder, "bidder", 1, 150)
+
+    expected = {"item_id": 1, "current_bid": 150, "bidder_id": 1}
+    assert bid_updates(bidder) == [expected]
+    assert bid_updates(watcher) == [expected]
+    assert bid_updates(viewer) == [expected]
+    assert bid_updates(other_viewer) == []
+
+
+def test_leave_item(client):
+    bidder = connect("bidder")
+    viewer = connect("bystander")
+
+    viewer.emit("join_item", {"item_id": 1})
+    viewer.emit("leave_item", {"item_id": 1})
+    bid(bidder, "bidder", 1, 150)
+
+    assert bid_updates(viewer) == []
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [None, "1", [1], {}, {"item_id": None}, {"item_id": "1"}, {"item_id": True}],
+)
+def test_invalid_item_rooms_rejected(client, payload):
+    bidder = connect("bidder")
+    viewer = connect("bystander")
+
+    viewer.emit("join_item", payload)
+    viewer.emit("leave_item", payload)
+    assert viewer.is_connected()
+
+    bid(bidder, "bidder", 1, 150)
+    assert bid_updates(viewer) == []
+
+
+def test_bid_fan_out_independent_of_users(client, monkeypatch):
+    emits = []
+    server_emit = socketio.server.emit
+
+    def counting_emit(event, *args, **kwargs):
+        emits.append(event)
+        return server_emit(event, *args, **kwargs)
+
+    monkeypatch.setattr(socketio.server, "emit", counting_emit)
+
+    bidder = connect("bidder")
+    bids = 5
+    # The first bid on an item has no previous bid to demote
+    bid(bidder, "bidder", 1, 150)
+    emits.clear()
+
+    def place_bids(start_amount):
+        for i in range(bids):
+            bid(bidder, "bidder", 1, start_amount + i)
+
+    _, small_statements = capture_statements(lambda: place_bids(200))
+    small_emits = len(emits)
+
+    seed_users(5000)
+    emits.clear()
+    _, large_statements = capture_statements(lambda: place_bids(1000))
+
+    # One bid_update per bid, and no query per registered user
+    assert small_emits == len(emits) == bids
+    assert len(large_statements) == len(small_statements)
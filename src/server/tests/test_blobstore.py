@@ -0,0 +1,145 @@
+import sys
+import os
+import pytest
+import hashlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Items, Images
+from app.blobstore import LocalBlobStore, get_blob_store, read_image, sweep_blobs
+from conftest import add_user, seed_items
+
+# A 1x1 PNG
+PNG_IMAGE = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d00000000"
+    "49454e44ae426082"
+)
+
+
+@pytest.fixture
+def client(database, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "BLOB_STORE_PATH", str(tmp_path))
+
+    seller = add_user("seller")
+    seed_items(
+        1,
+        Listing_name="Vintage Watch",
+        Seller_id=seller.User_id,
+        Min_price=100,
+        Description="An old watch",
+    )
+
+    return database
+
+
+def add_image(in_database=False):
+    """
+    Adds an image of the test item, either in the blob store or as a legacy row.
+    """
+    item = Items.query.first()
+    image = Images(Item_id=item.Item_id, Image_description="photo")
+    if in_database:
+        image.Image = PNG_IMAGE
+    else:
+        image.Image_hash = get_blob_store().put(PNG_IMAGE)
+
+    db.session.add(image)
+    db.session.commit()
+    return image
+
+
+def test_put_is_sharded_and_deduplicated(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    key = store.put(PNG_IMAGE)
+
+    assert key == hashlib.sha256(PNG_IMAGE).hexdigest()
+    assert store.path(key) == os.path.join(str(tmp_path), key[:2], key[2:4], key)
+    assert store.get(key) == PNG_IMAGE
+
+    # Storing the same content again reuses the existing blob
+    assert store.put(PNG_IMAGE) == key
+    assert os.listdir(os.path.dirname(store.path(key))) == [key]
+
+
+def test_get_image_from_blob_store(client):
+    image = add_image()
+    assert image.Image is None
+
+    response = client.get(f"/api/images/{image.Image_id}")
+    assert response.status_code == 200
+    assert response.data == PNG_IMAGE
+    assert response.mimetype == "image/png"
+    assert response.get_etag() == (image.Image_hash, False)
+    assert response.cache_control.immutable
+
+    response = client.get(
+        f"/api/images/{image.Image_id}",
+        headers={"If-None-Match": f'"{image.Image_hash}"'},
+    )
+    assert response.status_code == 304
+
+
+def test_migrate_blobs(client):
+    image_id = add_image(in_database=True).Image_id
+    db.session.expire_all()
+
+    result = app.test_cli_runner().invoke(args=["migrate-blobs"])
+    assert "Moved 1 images" in result.output
+
+    image = db.session.get(Images, image_id)
+    assert image.Image is None
+    assert image.Image_hash == hashlib.sha256(PNG_IMAGE).hexdigest()
+    assert read_image(image) == PNG_IMAGE
+
+    response = client.get(f"/api/images/{image_id}")
+    assert response.data == PNG_IMAGE
+
+
+def test_sweep_keeps_shared_blobs(client):
+    first = add_image()
+    second = add_image()
+    store = get_blob_store()
+    key = first.Image_hash
+
+    db.session.delete(first)
+    db.session.commit()
+    assert sweep_blobs(grace_period=0) == 0
+    assert store.exists(key)
+
+    db.session.delete(second)
+    db.session.commit()
+    assert sweep_blobs(grace_period=0) == 1
+    assert not store.exists(key)
+
+
+def test_sweep_keeps_recently_stored_blobs(client):
+    image = add_image()
+    key = image.Image_hash
+    db.session.delete(image)
+    db.session.commit()
+
+    # Unreferenced, but an upload of the same content may be about to use it
+    assert sweep_blobs(grace_period=60) == 0
+    assert get_blob_store().exists(key)
+
+
+def test_sweep_after_blob_stored_again(client):
+    image = add_image()
+    key = image.Image_hash
+    db.session.delete(image)
+    db.session.commit()
+
+    store = get_blob_store()
+    os.utime(store.path(key), (0, 0))
+
+    # An upload of the same content stores it again before its row is inserted
+    assert store.put(PNG_IMAGE) == key
+    assert not store.delete_if_stored_before(key, cutoff=60)
+    assert store.get(key) == PNG_IMAGE
+
+    # Once deleted, storing it again writes it back
+    os.utime(store.path(key), (0, 0))
+    assert store.delete_if_stored_before(key, cutoff=60)
+    assert store.put(PNG_IMAGE) == key
+    assert store.get(key) == PNG_IMAGE
@@ -2,6 +2,8 @@ import sys
 import os
 import pytest
 import json
+import random
+import time
 import datetime
 from werkzeug.security import generate_password_hash
 from app import app, db
@@ -9,6 +11,9 @@ from app.models import User, Items, Types, Middle_type, Images
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Live listings browsed by category in the benchmark
+BENCHMARK_LISTINGS = int(os.environ.get("CATEGORY_BENCHMARK_LISTINGS", 100000))
+
 
 # Test Setup - Fixtures
 @pytest.fixture
@@ -123,3 +128,139 @@ def test_get_category_filters_multiple_categories(client):
     filtered_items = json.loads(response.data)
     assert len(filtered_items) > 0  # We expect to get some items back
     assert any(item["Listing_name"] == "Vintage Watch" for item in filtered_items)
+
+
+def add_tagged_item(name, tags, ends_in=datetime.timedelta(days=30)):
+    item = Items(
+        Listing_name=name,
+        Seller_id=2,
+        Available_until=datetime.datetime.now(datetime.timezone.utc) + ends_in,
+        Verified=False,
+        Authentication_request=False,
+        Description=f"A {name.lower()}",
+        Min_price=10,
+        Current_bid=0,
+    )
+    db.session.add(item)
+    db.session.flush()
+
+    for tag in tags:
+        tag_type = Types.query.filter_by(Type_name=tag).first()
+        if tag_type is None:
+            tag_type = Types(Type_name=tag)
+            db.session.add(tag_type)
+            db.session.flush()
+        db.session.add(Middle_type(Item_id=item.Item_id, Type_id=tag_type.Type_id))
+
+    db.session.commit()
+    return item
+
+
+def category_names(client, categories, **kwargs):
+    response = client.post(
+        "/api/get_category_filters", json={"categories": categories, **kwargs}
+    )
+    assert response.status_code == 200
+    return [item["Listing_name"] for item in json.loads(response.data)]
+
+
+def test_get_category_filters_any_or_all(client):
+    add_tagged_item("Camera", ["Electronics", "Antiques"])
+    add_tagged_item("Phone", ["Electronics"])
+    add_tagged_item("Vase", ["Antiques"])
+
+    assert category_names(client, "Electronics,Antiques") == [
+        "Camera",
+        "Phone",
+        "Vase",
+    ]
+    assert category_names(client, "Electronics,Antiques", category_match="all") == [
+        "Camera"
+    ]
+
+    # A category matching no tags matches no items when all must match
+    assert category_names(client, "Electronics,Toys", category_match="all") == []
+    assert category_names(client, "Electronics,Toys") == ["Camera", "Phone"]
+
+
+def test_get_category_filters_excludes_ended(client):
+    add_tagged_item("Phone", ["Electronics"])
+    add_tagged_item("Radio", ["Electronics"], ends_in=-datetime.timedelta(days=1))
+
+    assert category_names(client, "electronics") == ["Phone"]
+
+
+def test_get_category_filters_new_tags(client):
+    # Loads the tags into memory
+    assert category_names(client, "Garden") == []
+
+    # A tag added afterwards is found straight away
+    add_tagged_item("Spade", ["Garden"])
+    assert category_names(client, "Garden") == ["Spade"]
+
+
+@pytest.mark.benchmark
+def test_category_browse_benchmark(client):
+    rng = random.Random(0)
+    categories = [f"Category {i}" for i in range(20)]
+    tags = [Types(Type_name=category) for category in categories]
+    db.session.add_all(tags)
+    db.session.commit()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    db.session.execute(
+        db.insert(Items),
+        [
+            {
+                "Item_id": i,
+                "Listing_name": f"Item {i}",
+                "Seller_id": 2,
+                "Upload_datetime": now,
+                "Available_until": now + datetime.timedelta(minutes=i),
+                "Min_price": 10,
+                "Current_bid": 0,
+                "Description": "A test item",
+                "Verified": False,
+                "Authentication_request": False,
+            }
+            for i in range(2, BENCHMARK_LISTINGS + 2)
+        ],
+    )
+    # Tags are skewed like a real catalogue, a few categories hold most items
+    weights = [1 / (rank + 1) for rank in range(len(tags))]
+    db.session.execute(
+        db.insert(Middle_type),
+        [
+            {"Item_id": i, "Type_id": tag.Type_id}
+            for i in range(2, BENCHMARK_LISTINGS + 2)
+            for tag in set(rng.choices(tags, weights, k=3))
+        ],
+    )
+    db.session.commit()
+
+    queries = []
+    for _ in range(200):
+        selected = rng.sample(categories, rng.randint(1, 3))
+        queries.append(
+            {
+                "categories": ",".join(selected),
+                "category_match": rng.choice(["any", "all"]),
+            }
+        )
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.post("/api/get_category_filters", json=query)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    print(
+        f"\nCategory browse over {BENCHMARK_LISTINGS} listings: "
+        f"p50 {p50:.1f}ms, p99 {p99:.1f}ms"
+    )
+
+    assert p99 < 50
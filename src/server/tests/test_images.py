@@ -0,0 +1,92 @@
+import sys
+import os
+import pytest
+import json
+import hashlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Images
+from conftest import add_user, seed_items
+
+# A 1x1 PNG
+PNG_IMAGE = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d00000000"
+    "49454e44ae426082"
+)
+
+
+@pytest.fixture
+def client(database):
+    seller = add_user("seller")
+    [item_id] = seed_items(
+        1,
+        Listing_name="Vintage Watch",
+        Seller_id=seller.User_id,
+        Min_price=100,
+        Description="An old watch",
+    )
+
+    db.session.add(
+        Images(Item_id=item_id, Image=PNG_IMAGE, Image_description="This is an image")
+    )
+    db.session.commit()
+
+    return database
+
+
+def test_image_hash_set_on_insert(client):
+    image = Images.query.first()
+    assert image.Image_hash == hashlib.sha256(PNG_IMAGE).hexdigest()
+
+
+def test_listings_return_image_urls(client):
+    response = client.post("/api/get-items")
+    assert response.status_code == 200
+
+    items = json.loads(response.data)
+    image = Images.query.first()
+    assert items[0]["Image"] == f"/api/images/{image.Image_id}?variant=grid"
+
+    # The listing JSON no longer embeds the image bytes
+    assert len(response.data) < len(PNG_IMAGE) * 4
+
+
+def test_single_listing_returns_image_urls(client):
+    image = Images.query.first()
+    response = client.post("/api/get-single-listing", json={"Item_id": image.Item_id})
+
+    assert response.status_code == 200
+    assert json.loads(response.data)["Images"] == [
+        f"/api/images/{image.Image_id}?variant=detail"
+    ]
+
+
+def test_get_image(client):
+    image = Images.query.first()
+    response = client.get(f"/api/images/{image.Image_id}")
+
+    assert response.status_code == 200
+    assert response.data == PNG_IMAGE
+    assert response.mimetype == "image/png"
+    assert response.get_etag() == (image.Image_hash, False)  # strong ETag
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+
+def test_get_image_not_modified(client):
+    image = Images.query.first()
+    response = client.get(
+        f"/api/images/{image.Image_id}",
+        headers={"If-None-Match": f'"{image.Image_hash}"'},
+    )
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_get_image_not_found(client):
+    response = client.get("/api/images/9999")
+    assert response.status_code == 404
@@ -0,0 +1,164 @@
+import sys
+import os
+import pytest
+import time
+import uuid
+import decimal
+import datetime
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from socketio import packet
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app
+from app.jsonprovider import OrjsonProvider
+
+# Listing cards and bids serialized when timing the providers
+JSON_BENCHMARK_ROWS = int(os.environ.get("JSON_BENCHMARK_ROWS", 5000))
+
+
+def listing_cards(count):
+    """
+    Builds listing cards shaped like the /api/get-items response.
+    """
+    now = datetime.datetime(2025, 3, 1, 12, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            "Item_id": i,
+            "Listing_name": f"Vintage Watch {i}",
+            "Seller_id": 2,
+            "Seller_username": "seller",
+            "Seller_name": "Jane",
+            "Available_until": now + datetime.timedelta(minutes=i),
+            "Verified": i % 2 == 0,
+            "Min_price": 10.5,
+            "Current_bid": float(i),
+            "Image": f"/api/images/{i}?variant=grid",
+            "Tags": ["Watches", "Vintage"],
+        }
+        for i in range(count)
+    ]
+
+
+def bids(count):
+    """
+    Builds bids shaped like the /api/get-bids response, with naive datetimes as
+    read from SQLite.
+    """
+    return [
+        {
+            "Item_id": i,
+            "Bid_price": decimal.Decimal("20.50"),
+            "Bid_datetime": datetime.datetime(2025, 3, 1, 12, 30)
+            + datetime.timedelta(seconds=i),
+            "Successful_bid": True,
+            "Listing_name": "Omega Watch",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def providers():
+    return OrjsonProvider(app), DefaultJSONProvider(app)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        listing_cards(3),
+        bids(3),
+        {"b": 1, "a": [None, True, 1.5], "date": datetime.date(2025, 3, 1)},
+        {
+            "ends": datetime.datetime(
+                2024,
+                12,
+                31,
+                23,
+                59,
+                59,
+                tzinfo=datetime.timezone(datetime.timedelta(hours=-5)),
+            )
+        },
+        {"id": uuid.UUID(int=1), "message": "Details Updated Successfully"},
+        [],
+    ],
+)
+def test_same_json_as_default_provider(providers, data):
+    fast, default = providers
+
+    assert fast.dumps(data) == default.dumps(data, separators=(",", ":"))
+    assert fast.loads(fast.dumps(data)) == default.loads(default.dumps(data))
+
+    with app.test_request_context():
+        assert fast.response(data).get_data() == default.response(data).get_data()
+
+
+def test_falls_back_for_unsupported_options(providers):
+    fast, default = providers
+    data = {"b": [1, 2], "a": "x"}
+
+    assert fast.dumps(data, indent=4) == default.dumps(data, indent=4)
+    assert fast.dumps(data, ensure_ascii=False) == default.dumps(
+        data, ensure_ascii=False
+    )
+
+    with pytest.raises(TypeError):
+        fast.dumps({"unserializable": object()})
+
+
+def test_used_by_app_and_socketio():
+    assert isinstance(app.json, OrjsonProvider)
+    assert packet.Packet.json is app.json
+
+    # Socket.IO packets are encoded by the provider too
+    bid_update = {"item_id": 1, "current_bid": 25.0, "bidder_id": 2}
+    encoded = packet.Packet(packet.EVENT, data=["bid_update", bid_update]).encode()
+    assert encoded == '2["bid_update",{"bidder_id":2,"current_bid":25.0,"item_id":1}]'
+
+    with app.test_request_context():
+        assert jsonify(bid_update).get_data() == (
+            app.json.dumps(bid_update).encode() + b"\n"
+        )
+
+
+def test_large_responses_match_default_provider(providers):
+    fast, default = providers
+
+    for data in (listing_cards(500), bids(500)):
+        with app.test_request_context():
+            assert fast.response(data).get_data() == default.response(data).get_data()
+
+
+@pytest.mark.benchmark
+def test_json_provider_benchmark(providers):
+    fast, default = providers
+
+    def cpu_time(provider, data, repeats=5):
+        start = time.process_time()
+        for _ in range(repeats):
+            with app.test_request_context():
+                body = provider.response(data).get_data()
+        return body, (time.process_time() - start) / repeats * 1000
+
+    timings = {}
+    for shape, data in (
+        ("listing cards", listing_cards(JSON_BENCHMARK_ROWS)),
+        ("bids", bids(JSON_BENCHMARK_ROWS)),
+    ):
+        fast_body, fast_time = cpu_time(fast, data)
+        default_body, default_time = cpu_time(default, data)
+        assert fast_body == default_body
+        timings[shape] = (default_time, fast_time)
+
+    print(
+        "\n"
+        + "\n".join(
+            f"Serializing {JSON_BENCHMARK_ROWS} {shape}: {default_time:.1f}ms with "
+            f"json, {fast_time:.1f}ms with orjson"
+            for shape, (default_time, fast_time) in timings.items()
+        )
+    )
+
+    for default_time, fast_time in timings.values():
+        assert fast_time < default_time
@@ -0,0 +1,185 @@
+import sys
+import os
+import pytest
+import json
+import time
+import datetime
+from flask import jsonify
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.bidding import record_bid
+from app.listings import build_listing_cards, listing_cards_response
+from app.models import Items, Images, Types, Middle_type
+import conftest
+from conftest import add_user, count_queries
+
+# Listings serialized when timing pre-serialized cards
+CARD_BENCHMARK_LISTINGS = int(os.environ.get("CARD_BENCHMARK_LISTINGS", 5000))
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database):
+    add_user("seller")
+    db.session.add_all([Types(Type_name="Watches"), Types(Type_name="Vintage")])
+    db.session.commit()
+
+    return database
+
+
+def seed_items(count):
+    """
+    Bulk inserts available items, each with two images and two tags.
+    """
+    type_ids = [t.Type_id for t in Types.query.all()]
+    item_ids = conftest.seed_items(count, ends_in=datetime.timedelta(days=7))
+
+    db.session.execute(
+        db.insert(Images),
+        [
+            {
+                "Item_id": item_id,
+                "Image": f"image-{position}-{item_id}".encode(),
+                "Image_description": "This is an image",
+            }
+            for item_id in item_ids
+            for position in range(2)
+        ],
+    )
+    db.session.execute(
+        db.insert(Middle_type),
+        [
+            {"Item_id": item_id, "Type_id": type_id}
+            for item_id in item_ids
+            for type_id in type_ids
+        ],
+    )
+    db.session.commit()
+
+
+def test_listing_card_contents(client):
+    seed_items(3)
+
+    response = client.post("/api/get-items")
+
+    assert response.status_code == 200
+    items = json.loads(response.data)
+    assert len(items) == 3
+
+    # Each card carries the first image, all tags and the seller's names
+    for item in items:
+        assert item["Seller_username"] == "seller"
+        assert item["Seller_name"] == "Jane"
+        assert sorted(item["Tags"]) == ["Vintage", "Watches"]
+        assert item["Image"] is not None
+
+
+def test_get_items_query_count_constant(client):
+    seed_items(10)
+    response, small_queries = count_queries(lambda: client.post("/api/get-items"))
+    assert response.status_code == 200
+    assert len(json.loads(response.data)) == 10
+
+    # Benchmark: grow the catalogue to 10,000 available items
+    seed_items(9990)
+    start = time.perf_counter()
+    response, large_queries = count_queries(lambda: client.post("/api/get-items"))
+    elapsed = time.perf_counter() - start
+    print(f"\n/api/get-items with 10000 items: {large_queries} queries, {elapsed:.3f}s")
+
+    # Only the first page is returned
+    assert response.status_code == 200
+    assert len(json.loads(response.data)) == app.config["PAGE_SIZE"]
+    assert large_queries == small_queries
+
+
+def test_search_filter_query_count_constant(client):
+    seed_items(10)
+    data = {"item": True, "searchQuery": "item"}
+    _, small_queries = count_queries(
+        lambda: client.post("/api/get_search_filter", json=data)
+    )
+
+    seed_items(990)
+    response, large_queries = count_queries(
+        lambda: client.post("/api/get_search_filter", json=data)
+    )
+
+    assert response.status_code == 200
+    assert len(json.loads(response.data)) == app.config["PAGE_SIZE"]
+    assert large_queries == small_queries
+
+
+def test_category_filter_query_count_constant(client):
+    seed_items(10)
+    data = {"categories": "vintage"}
+    # Loads the tags into memory and caches the cards first, neither are read
+    # again for each request
+    client.post("/api/get_category_filters", json=data)
+    _, small_queries = count_queries(
+        lambda: client.post("/api/get_category_filters", json=data)
+    )
+
+    seed_items(990)
+    client.post("/api/get_category_filters", json=data)
+    response, large_queries = count_queries(
+        lambda: client.post("/api/get_category_filters", json=data)
+    )
+
+    assert response.status_code == 200
+    assert len(json.loads(response.data)) == app.config["PAGE_SIZE"]
+    assert large_queries == small_queries
+
+
+def test_card_fragments_match_jsonify(client):
+    seed_items(3)
+    items = Items.query.order_by(Items.Item_id).all()
+
+    with app.test_request_context():
+        expected = jsonify(build_listing_cards(items)).get_data()
+        # Built, then read back from the cache
+        assert listing_cards_response(items).get_data() == expected
+        assert listing_cards_response(items).get_data() == expected
+
+        assert listing_cards_response([]).get_data() == jsonify([]).get_data()
+
+
+def test_card_rebuilt_when_item_changes(client):
+    seed_items(2)
+    client.post("/api/get-items")
+
+    assert record_bid(1, 1, 20)
+    items = json.loads(client.post("/api/get-items").data)
+    assert [item["Current_bid"] for item in items] == [20, 0]
+
+    # A renamed tag changes every card showing it
+    Types.query.filter_by(Type_name="Vintage").one().Type_name = "Antique"
+    db.session.commit()
+    items = json.loads(client.post("/api/get-items").data)
+    assert all(sorted(item["Tags"]) == ["Antique", "Watches"] for item in items)
+
+
+@pytest.mark.benchmark
+def test_card_serialization_benchmark(client):
+    seed_items(CARD_BENCHMARK_LISTINGS)
+    items = Items.query.order_by(Items.Item_id).all()
+
+    def cpu_time(build):
+        start = time.process_time()
+        with app.test_request_context():
+            body = build().get_data()
+        return body, (time.process_time() - start) * 1000
+
+    expected, rebuilt = cpu_time(lambda: jsonify(build_listing_cards(items)))
+    body, first = cpu_time(lambda: listing_cards_response(items))
+    assert body == expected
+    body, cached = cpu_time(lambda: listing_cards_response(items))
+    assert body == expected
+
+    print(
+        f"\nSerializing {CARD_BENCHMARK_LISTINGS} listing cards: {rebuilt:.1f}ms "
+        f"rebuilt, {first:.1f}ms caching them, {cached:.1f}ms from the cache"
+    )
+
+    assert cached < rebuilt
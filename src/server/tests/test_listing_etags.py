@@ -0,0 +1,164 @@
+import sys
+import os
+import pytest
+import datetime
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.bidding import record_bid
+from app.models import ScheduledTask
+from app.taskqueue import process_auction_ending
+from conftest import add_user, count_queries, login, seed_items
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database, monkeypatch):
+    monkeypatch.setattr(app.extensions["mail"], "suppress", True)
+    add_user("seller")
+    return database
+
+
+def test_unchanged_listings_not_modified(client):
+    seed_items(3)
+
+    response = client.post("/api/get-items")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    etag = response.headers["ETag"]
+
+    # Only the catalogue's version is read
+    response, queries = count_queries(
+        lambda: client.post("/api/get-items", headers={"If-None-Match": etag})
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert queries == 1
+
+    # Another page, or other filters, is a different response
+    for url, data in (
+        ("/api/get-items", {"limit": 1}),
+        ("/api/get_filtered_listings", {}),
+        ("/api/get_category_filters", {"categories": ""}),
+        ("/api/get_search_filter", {"item": True, "searchQuery": ""}),
+    ):
+        response = client.post(url, json=data, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+def test_changes_modify_listings(client):
+    seed_items(3)
+    ended = ScheduledTask(
+        task_name="process_auction_ending",
+        task_args={"item_id": 3},
+        item_id=3,
+        execute_at=datetime.datetime.now(datetime.timezone.utc),
+        status="pending",
+    )
+    db.session.add(ended)
+    db.session.commit()
+
+    etags = [client.post("/api/get-items").headers["ETag"]]
+    for change in (
+        lambda: record_bid(1, 1, 20),
+        lambda: process_auction_ending(3),
+    ):
+        change()
+        response = client.post("/api/get-items", headers={"If-None-Match": etags[-1]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] not in etags
+        etags.append(response.headers["ETag"])
+
+
+def test_ended_listings_modify_listings(client):
+    seed_items(1, ends_in=datetime.timedelta(seconds=1))
+    seed_items(1)
+
+    response = client.post("/api/get-items")
+    assert len(response.json) == 2
+    etag = response.headers["ETag"]
+    assert (
+        client.post("/api/get-items", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+
+    # The first listing ends without its auction being settled
+    time.sleep(1)
+    response = client.post("/api/get-items", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [item["Item_id"] for item in response.json] == [2]
+
+
+def test_single_listing_etag_follows_item(client):
+    seed_items(2)
+
+    def get_listing(item_id, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return client.post(
+            "/api/get-single-listing", json={"Item_id": item_id}, headers=headers
+        )
+
+    etag = get_listing(1).headers["ETag"]
+
+    # A bid on another item leaves the listing unchanged
+    assert record_bid(2, 1, 20)
+    assert get_listing(1, etag).status_code == 304
+
+    assert record_bid(1, 1, 20)
+    response = get_listing(1, etag)
+    assert response.status_code == 200
+    assert response.json["Current_bid"] == 20
+
+    # Listings that do not exist are not given an ETag
+    response = get_listing(3)
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+
+
+def test_polling_unchanged_catalogue(client):
+    seed_items(1000)
+
+    response = client.post("/api/get-items")
+    assert response.status_code == 200
+    assert response.data
+
+    # However many listings there are, polling an unchanged catalogue only reads
+    # its version and sends nothing back
+    response, queries = count_queries(
+        lambda: client.post(
+            "/api/get-items", headers={"If-None-Match": response.headers["ETag"]}
+        )
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+    assert queries == 1
+
+
+def test_seller_listings_not_modified(client):
+    login(client, "seller")
+    seed_items(2)
+
+    etags = {}
+    for url in ("/api/get-seller-items", "/api/get-sellerss-items"):
+        response = client.post(url)
+        assert response.status_code == 200
+        assert len(response.json) == 2
+        etag = etags[url] = response.headers["ETag"]
+
+        response, queries = count_queries(
+            lambda: client.post(url, headers={"If-None-Match": etag})
+        )
+        assert response.status_code == 304
+        assert queries == 1
+
+    # Another seller's listings are a different response
+    add_user("other")
+    login(client, "other")
+    for url, etag in etags.items():
+        response = client.post(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json == []
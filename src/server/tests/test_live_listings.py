@@ -0,0 +1,109 @@
+import sys
+import os
+import pytest
+import json
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Items
+from conftest import add_user, seed_items
+
+# Ended, rejected and pending listings browsed past by the benchmark
+BENCHMARK_HISTORY = int(os.environ.get("LIVE_LISTINGS_BENCHMARK_HISTORY", 100000))
+
+
+@pytest.fixture
+def client(database):
+    add_user("seller")
+    return database
+
+
+def add_item(authentication_request=False, ends_in=datetime.timedelta(days=2)):
+    item = Items(
+        Listing_name="Vintage Watch",
+        Seller_id=1,
+        Available_until=datetime.datetime.now(datetime.timezone.utc) + ends_in,
+        Min_price=10,
+        Current_bid=0,
+        Description="An old watch",
+        Verified=False,
+        Authentication_request=authentication_request,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def listing_ids(client):
+    response = client.post("/api/get-items")
+    return [item["Item_id"] for item in json.loads(response.data)]
+
+
+def test_live_status_follows_authentication(client):
+    listed = add_item()
+    pending = add_item(authentication_request=True)
+
+    assert listed.Is_live
+    assert not pending.Is_live
+    assert listing_ids(client) == [listed.Item_id]
+
+    # An expert approves the listing
+    pending.Authentication_request = False
+    pending.Verified = True
+    pending.Authentication_request_approved = True
+    db.session.commit()
+    assert pending.Is_live
+    assert listing_ids(client) == [listed.Item_id, pending.Item_id]
+
+    # A rejected listing is taken down
+    pending.Verified = False
+    pending.Authentication_request_approved = False
+    db.session.commit()
+    assert not pending.Is_live
+    assert listing_ids(client) == [listed.Item_id]
+
+
+def test_ended_listings_not_shown(client):
+    live = add_item()
+    add_item(ends_in=-datetime.timedelta(minutes=1))
+
+    assert listing_ids(client) == [live.Item_id]
+
+
+def browse_latency(client):
+    client.post("/api/get-items")
+
+    samples = []
+    for _ in range(20):
+        start = time.perf_counter()
+        response = client.post("/api/get-items")
+        samples.append(time.perf_counter() - start)
+    assert len(json.loads(response.data)) == app.config["PAGE_SIZE"]
+
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+@pytest.mark.benchmark
+def test_browse_latency_flat_with_history(client):
+    seed_items(1000, ends_in=datetime.timedelta(days=1))
+    timings = {}
+
+    # Adds ended listings, and rejected and pending listings ending before the
+    # live ones, timing browsing the live listings as they build up
+    soon = (datetime.timedelta(minutes=1), datetime.timedelta(milliseconds=500))
+    for history in (BENCHMARK_HISTORY // 10, BENCHMARK_HISTORY):
+        added = history - sum(timings)
+        seed_items(added // 2, ends_in=-datetime.timedelta(days=400))
+        seed_items(added // 4, *soon, Authentication_request_approved=False)
+        seed_items(added - added // 2 - added // 4, *soon, Authentication_request=True)
+        timings[history] = browse_latency(client)
+
+    small, large = timings
+    print(
+        f"\n/api/get-items with 1000 live listings: {small} others "
+        f"{timings[small]:.1f}ms, {large} others {timings[large]:.1f}ms"
+    )
+
+    assert timings[large] < timings[small] * 1.5
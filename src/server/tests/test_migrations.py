@@ -0,0 +1,288 @@
+import sys
+import os
+import pytest
+import hashlib
+import datetime
+import importlib.util
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    JSON,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    inspect,
+    text,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db, include_object
+from app.search import POSTGRESQL_SEARCH_INDEX_DDL
+
+MIGRATIONS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+# The head before the tables were created by migrations, which databases
+# created by db.create_all() may be stamped with
+CREATE_ALL_HEAD = "8b4e6d2f1a35"
+
+# Some of the tables as they were before migrations were added, when they were
+# created by db.create_all()
+baseline = MetaData()
+Table(
+    "user",
+    baseline,
+    Column("User_id", Integer, primary_key=True),
+    Column("Username", String(50), nullable=False),
+    Column("Password", String(500), nullable=False),
+    Column("Email", String(50), nullable=False),
+    Column("Customer_ID", String(100)),
+    Column("Setup_intent_ID", String(100)),
+    Column("Payment_method_ID", String(100)),
+    Column("First_name", String(50), nullable=False),
+    Column("Middle_name", String(50)),
+    Column("Surname", String(50), nullable=False),
+    Column("DOB", Date, nullable=False),
+    Column("Level_of_access", Integer, nullable=False),
+    Column("Is_expert", Boolean, nullable=False),
+)
+Table(
+    "profit_structure",
+    baseline,
+    Column("Structure_id", Integer, primary_key=True),
+    Column("Expert_split", Float, nullable=False),
+    Column("Manager_split", Float, nullable=False),
+    Column("Enforced_datetime", DateTime(timezone=True)),
+)
+Table(
+    "items",
+    baseline,
+    Column("Item_id", Integer, primary_key=True),
+    Column("Listing_name", String(50), nullable=False),
+    Column("Seller_id", Integer, ForeignKey("user.User_id"), nullable=False),
+    Column("Upload_datetime", DateTime(timezone=True)),
+    Column("Available_until", DateTime(timezone=True), nullable=False),
+    Column("Min_price", Float, nullable=False),
+    Column("Current_bid", Float, nullable=False),
+    Column("Description", String(500), nullable=False),
+    Column("Structure_id", Integer, ForeignKey("profit_structure.Structure_id")),
+    Column("Sold", Boolean),
+    Column("Expert_id", Integer, ForeignKey("user.User_id")),
+    Column("Verified", Boolean, nullable=False),
+    Column("Authentication_request", Boolean, nullable=False),
+    Column("Authentication_request_approved", Boolean),
+    Column("Second_opinion", Boolean),
+)
+Table(
+    "images",
+    baseline,
+    Column("Image_id", Integer, primary_key=True),
+    Column("Item_id", Integer, ForeignKey("items.Item_id"), nullable=False),
+    Column("Image", LargeBinary, nullable=False),
+    Column("Image_description", String(100), nullable=False),
+)
+Table(
+    "scheduled_task",
+    baseline,
+    Column("id", Integer, primary_key=True),
+    Column("task_name", String(50), nullable=False),
+    Column("task_args", JSON),
+    Column("execute_at", DateTime(timezone=True), nullable=False),
+    Column("completed", Boolean),
+)
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    yield engine
+    engine.dispose()
+
+
+def alembic_config(engine):
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS)
+    config.attributes["engine"] = engine
+    return config
+
+
+def upgrade(engine, revision="head"):
+    with app.app_context():
+        command.upgrade(alembic_config(engine), revision)
+
+
+def schema_differences(engine):
+    """
+    Returns the differences between the migrated database and the models.
+    """
+    with engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"include_object": include_object}
+        )
+        return compare_metadata(context, db.metadata)
+
+
+def test_upgrade_creates_schema(engine):
+    upgrade(engine)
+
+    assert schema_differences(engine) == []
+    tables = inspect(engine).get_table_names()
+    assert "items_fts" in tables
+    assert "users_fts" in tables
+
+
+def test_downgrade(engine):
+    upgrade(engine)
+    with app.app_context():
+        command.downgrade(alembic_config(engine), "base")
+
+    # Only the tables from before migrations are left, as db.create_all() made them
+    tables = inspect(engine).get_table_names()
+    assert "items" in tables
+    for table in ["catalogue_version", "email_outbox", "image_variants", "items_fts"]:
+        assert table not in tables
+    columns = [column["name"] for column in inspect(engine).get_columns("items")]
+    assert "Is_live" not in columns
+    assert "Version" not in columns
+
+    upgrade(engine)
+    assert schema_differences(engine) == []
+
+
+def test_upgrade_from_baseline(engine):
+    baseline.create_all(engine)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                'INSERT INTO "user" (User_id, Username, Password, Email, First_name, '
+                "Surname, DOB, Level_of_access, Is_expert) VALUES (1, 'seller', "
+                "'hash', 'seller@example.com', 'Sam', 'Seller', '2000-01-01', 1, 0)"
+            )
+        )
+        for item_id, min_price, current_bid, approved in [
+            (1, 20, 25, None),
+            (2, 50, 0, None),
+            (3, 5, 0, False),
+        ]:
+            connection.execute(
+                text(
+                    "INSERT INTO items (Item_id, Listing_name, Seller_id, "
+                    "Available_until, Min_price, Current_bid, Description, "
+                    "Verified, Authentication_request, "
+                    "Authentication_request_approved) VALUES (:id, 'Vintage Watch', "
+                    "1, :until, :min_price, :current_bid, 'A watch', 0, 0, "
+                    ":approved)"
+                ),
+                {
+                    "id": item_id,
+                    "until": now + datetime.timedelta(days=1),
+                    "min_price": min_price,
+                    "current_bid": current_bid,
+                    "approved": approved,
+                },
+            )
+        connection.execute(
+            text(
+                "INSERT INTO images (Image_id, Item_id, Image, Image_description) "
+                "VALUES (1, 1, :image, 'Front')"
+            ),
+            {"image": b"image bytes"},
+        )
+        # Tasks stored before item_id had a column only name the item in task_args
+        for task_id, item_id, completed in [(1, 1, False), (2, 2, True)]:
+            connection.execute(
+                text(
+                    "INSERT INTO scheduled_task (id, task_name, task_args, "
+                    "execute_at, completed) VALUES (:id, 'process_auction_ending', "
+                    ":args, :execute_at, :completed)"
+                ),
+                {
+                    "id": task_id,
+                    "args": f'{{"item_id": {item_id}}}',
+                    "execute_at": now + datetime.timedelta(days=1),
+                    "completed": completed,
+                },
+            )
+
+    upgrade(engine)
+
+    assert schema_differences(engine) == []
+    with engine.connect() as connection:
+        items = connection.execute(
+            text(
+                "SELECT Item_id, Effective_price, Is_live, Version FROM items "
+                "ORDER BY Item_id"
+            )
+        ).all()
+        assert [tuple(item) for item in items] == [
+            (1, 25, 1, 0),
+            (2, 50, 1, 0),
+            (3, 5, 0, 0),
+        ]
+
+        image_hash = connection.execute(
+            text("SELECT Image_hash FROM images")
+        ).scalar_one()
+        assert image_hash == hashlib.sha256(b"image bytes").hexdigest()
+
+        # Completed tasks are deleted, as they are now once processed
+        tasks = connection.execute(
+            text("SELECT id, item_id, status, attempts FROM scheduled_task")
+        ).all()
+        assert [tuple(task) for task in tasks] == [(1, 1, "pending", 0)]
+
+        matches = connection.execute(
+            text("SELECT rowid FROM items_fts WHERE items_fts MATCH 'watch'")
+        ).all()
+        assert len(matches) == 3
+
+
+def test_upgrade_adopts_created_tables(engine):
+    # Databases created by db.create_all() have the tables but no revision
+    db.metadata.create_all(engine)
+
+    upgrade(engine)
+
+    assert schema_differences(engine) == []
+
+
+def test_upgrade_from_create_all_head(engine):
+    db.metadata.create_all(engine)
+    with app.app_context():
+        command.stamp(alembic_config(engine), CREATE_ALL_HEAD)
+
+    upgrade(engine)
+
+    assert schema_differences(engine) == []
+
+
+def test_postgresql_search_indexes_match_queries():
+    path = os.path.join(
+        MIGRATIONS, "versions", "988ec9af7d78_add_postgresql_search_indexes.py"
+    )
+    spec = importlib.util.spec_from_file_location("search_indexes", path)
+    revision = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(revision)
+
+    # The planner only uses the indexes for the expressions the searches use
+    def without_whitespace(statements):
+        return ["".join(statement.split()) for statement in statements]
+
+    assert without_whitespace(revision.SEARCH_INDEX_DDL) == without_whitespace(
+        POSTGRESQL_SEARCH_INDEX_DDL
+    )
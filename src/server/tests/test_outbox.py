@@ -0,0 +1,193 @@
+import sys
+import os
+import pytest
+import time
+import socket
+import threading
+import socketserver
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Email_outbox
+from app.taskqueue import queue_email, wake_outbox
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost")
+        recipients = []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line.decode().strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb in ("MAIL", "RSET"):
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in self.server.refused:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line == b".\r\n":
+                        break
+                    data.append(data_line)
+                self.server.messages.append((recipients, b"".join(data)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    A local debugging SMTP server that records the messages it receives.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, refused=()):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.refused = set(refused)
+
+
+@pytest.fixture
+def smtp_sink(monkeypatch):
+    sink = SMTPSink(refused=["nobody@gmail.com"])
+    with sink:
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+        mail_state = app.extensions["mail"]
+        monkeypatch.setattr(mail_state, "server", "127.0.0.1")
+        monkeypatch.setattr(mail_state, "port", sink.server_address[1])
+        monkeypatch.setattr(mail_state, "use_ssl", False)
+        monkeypatch.setattr(mail_state, "use_tls", False)
+        monkeypatch.setattr(mail_state, "username", None)
+        monkeypatch.setattr(mail_state, "suppress", False)
+
+        yield sink
+        sink.shutdown()
+
+
+@pytest.fixture
+def client(database, smtp_sink, monkeypatch):
+    monkeypatch.setitem(app.config, "OUTBOX_BATCH_SIZE", 10)
+    monkeypatch.setitem(app.config, "OUTBOX_RATE_LIMIT", 10000)
+    monkeypatch.setitem(app.config, "OUTBOX_RETRY_DELAY", 0.05)
+    monkeypatch.setitem(app.config, "OUTBOX_MAX_ATTEMPTS", 3)
+    return database
+
+
+def queue_emails(recipients):
+    for recipient in recipients:
+        queue_email(recipient, "Auction Won!", "You have won the auction.")
+    db.session.commit()
+    wake_outbox()
+
+
+def wait_for_outbox(timeout=10):
+    """
+    Waits until no email is waiting to be sent.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        db.session.expire_all()
+        if Email_outbox.query.filter_by(Status="pending").count() == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError("Outbox was not emptied")
+
+
+def test_batches_share_a_connection(client, smtp_sink):
+    queue_emails([f"user{i}@gmail.com" for i in range(25)])
+    wait_for_outbox()
+
+    assert len(smtp_sink.messages) == 25
+    assert smtp_sink.connections == 3  # batches of 10, 10 and 5
+    assert Email_outbox.query.filter_by(Status="sent").count() == 25
+    assert b"Subject: Auction Won!" in smtp_sink.messages[0][1]
+
+
+def test_refused_email_dead_lettered(client, smtp_sink):
+    queue_emails(["user@gmail.com", "nobody@gmail.com"])
+    wait_for_outbox()
+
+    sent = Email_outbox.query.filter_by(Recipient="user@gmail.com").one()
+    refused = Email_outbox.query.filter_by(Recipient="nobody@gmail.com").one()
+    assert sent.Status == "sent"
+    assert refused.Status == "dead"
+    assert refused.Attempts == 3
+    assert [recipients for recipients, data in smtp_sink.messages] == [
+        ["user@gmail.com"]
+    ]
+
+
+def test_retried_when_server_unavailable(client, smtp_sink, monkeypatch):
+    # Points the sender at a port nothing is listening on
+    unused = socket.socket()
+    unused.bind(("127.0.0.1", 0))
+    mail_state = app.extensions["mail"]
+    monkeypatch.setattr(mail_state, "port", unused.getsockname()[1])
+    unused.close()
+
+    queue_emails(["user@gmail.com"])
+
+    deadline = time.perf_counter() + 10
+    while Email_outbox.query.one().Attempts == 0:
+        assert time.perf_counter() < deadline
+        time.sleep(0.01)
+        db.session.expire_all()
+
+    monkeypatch.setattr(mail_state, "port", smtp_sink.server_address[1])
+    wait_for_outbox()
+
+    assert Email_outbox.query.one().Status == "sent"
+    assert len(smtp_sink.messages) == 1
+
+
+class FakeClock:
+    """
+    Stands in for the time module of the sender, sleeping without waiting.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_rate_limited(client, smtp_sink, monkeypatch):
+    monkeypatch.setitem(app.config, "OUTBOX_RATE_LIMIT", 20)
+    clock = FakeClock()
+    monkeypatch.setattr("app.taskqueue.time", clock)
+
+    queue_emails([f"user{i}@gmail.com" for i in range(10)])
+    wait_for_outbox()
+
+    # Ten emails at 20 a second are spread over at least 9 intervals
+    assert clock.now - 1000 == pytest.approx(9 / 20)
+    assert len(smtp_sink.messages) == 10
@@ -0,0 +1,223 @@
+import sys
+import os
+import pytest
+import json
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Items, Watchlist, Bidding_history
+from app.pagination import encode_cursor
+from conftest import add_user, login, seed_users
+
+# Listings paged through by the benchmark, enough for 1000 pages of 50
+BENCHMARK_LISTINGS = int(os.environ.get("PAGINATION_BENCHMARK_LISTINGS", 50050))
+
+
+@pytest.fixture
+def client(database):
+    add_user("manager", level_of_access=3)
+    add_user("buyer")
+    return database
+
+
+def seed_items(count, ends_in=datetime.timedelta(days=2)):
+    """
+    Adds items ending one minute apart, with some ending at the same time so the
+    Item_id tie-break is exercised. Returns their IDs.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = (db.session.query(db.func.max(Items.Item_id)).scalar() or 0) + 1
+
+    db.session.execute(
+        db.insert(Items),
+        [
+            {
+                "Item_id": i,
+                "Listing_name": f"Item {i}",
+                "Seller_id": 1,
+                "Upload_datetime": now,
+                "Available_until": now + ends_in + datetime.timedelta(minutes=i // 2),
+                "Min_price": 10,
+                "Current_bid": 0,
+                "Description": "A test item",
+                "Verified": False,
+                "Authentication_request": False,
+            }
+            for i in range(start, start + count)
+        ],
+    )
+    db.session.commit()
+    return list(range(start, start + count))
+
+
+def fetch_all(fetch, limit):
+    """
+    Follows X-Next-Cursor until the last page, returning every page's response.
+    """
+    responses = [fetch({"limit": limit})]
+    while "X-Next-Cursor" in responses[-1].headers:
+        cursor = responses[-1].headers["X-Next-Cursor"]
+        responses.append(fetch({"limit": limit, "cursor": cursor}))
+    return responses
+
+
+def test_listings_paged_in_order(client):
+    item_ids = seed_items(23)
+
+    responses = fetch_all(lambda params: client.post("/api/get-items", json=params), 5)
+    pages = [[item["Item_id"] for item in json.loads(r.data)] for r in responses]
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert sum(pages, []) == item_ids
+
+
+def test_items_added_while_paging_are_not_repeated(client):
+    seed_items(10)
+
+    first = client.post("/api/get-items", json={"limit": 5})
+    seen = [item["Item_id"] for item in json.loads(first.data)]
+
+    # New listings ending sooner than the current page do not shift later pages
+    seed_items(3, ends_in=datetime.timedelta(hours=1))
+    second = client.post(
+        "/api/get-items", json={"limit": 5, "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert [item["Item_id"] for item in json.loads(second.data)] == list(range(6, 11))
+    assert not set(seen) & {item["Item_id"] for item in json.loads(second.data)}
+
+
+def test_default_and_maximum_page_size(client):
+    seed_items(150)
+
+    response = client.post("/api/get-items")
+    assert len(json.loads(response.data)) == app.config["PAGE_SIZE"]
+
+    response = client.post("/api/get-items", json={"limit": 1000})
+    assert len(json.loads(response.data)) == app.config["MAX_PAGE_SIZE"]
+
+
+def test_invalid_cursor(client):
+    seed_items(3)
+
+    for cursor in ("not a cursor", encode_cursor([1]), encode_cursor(["x", 1])):
+        response = client.post("/api/get-items", json={"cursor": cursor})
+        assert response.status_code == 400
+        assert json.loads(response.data)["message"] == "Invalid cursor"
+
+    response = client.post("/api/get-items", json={"limit": "many"})
+    assert response.status_code == 400
+
+
+def test_category_filters_paged(client):
+    seed_items(7)
+
+    responses = fetch_all(
+        lambda params: client.post(
+            "/api/get_category_filters", json={"categories": "", **params}
+        ),
+        3,
+    )
+    assert [len(json.loads(r.data)) for r in responses] == [3, 3, 1]
+
+
+def test_all_users_paged(client):
+    seed_users(5)
+
+    responses = fetch_all(
+        lambda params: client.post("/api/get_all_users", json=params), 3
+    )
+    pages = [[user["User_id"] for user in json.loads(r.data)] for r in responses]
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_watchlist_paged(client):
+    buyer = login(client, "buyer")
+    for item_id in seed_items(5):
+        db.session.add(Watchlist(User_id=buyer.User_id, Item_id=item_id))
+    db.session.commit()
+
+    responses = fetch_all(
+        lambda params: client.get("/api/get-watchlist", query_string=params), 2
+    )
+    pages = [
+        [item["Item_id"] for item in json.loads(r.data)["watchlist"]] for r in responses
+    ]
+    assert pages == [[1, 2], [3, 4], [5]]
+
+
+def test_history_and_sold_paged(client):
+    buyer = login(client, "buyer")
+    item_ids = seed_items(5, ends_in=-datetime.timedelta(days=1))
+    for item_id in item_ids:
+        for price, winning in ((20, False), (30, True)):
+            db.session.add(
+                Bidding_history(
+                    Item_id=item_id,
+                    Bidder_id=buyer.User_id,
+                    Bid_price=price,
+                    Bid_datetime=datetime.datetime.now(datetime.timezone.utc),
+                    Successful_bid=winning,
+                    Winning_bid=winning,
+                )
+            )
+    db.session.commit()
+
+    # The most recently ended auctions come first, one entry per item
+    responses = fetch_all(
+        lambda params: client.get("/api/get-history", query_string=params), 2
+    )
+    history = [json.loads(r.data)["history"] for r in responses]
+    assert [[bid["Item_id"] for bid in page] for page in history] == [
+        [5, 4],
+        [3, 2],
+        [1],
+    ]
+    assert all(bid["Bid_price"] == 30 for page in history for bid in page)
+
+    login(client, "manager")
+    responses = fetch_all(
+        lambda params: client.get("/api/get-sold", query_string=params), 2
+    )
+    pages = [
+        [item["Item_id"] for item in json.loads(r.data)["sold_items"]]
+        for r in responses
+    ]
+    assert pages == [[5, 4], [3, 2], [1]]
+
+
+@pytest.mark.benchmark
+def test_page_latency_flat(client):
+    seed_items(BENCHMARK_LISTINGS)
+    limit = 50
+
+    # The cursor of the last item on page 999, as the client would receive it
+    last = (
+        db.session.query(Items.Available_until, Items.Item_id)
+        .order_by(Items.Available_until, Items.Item_id)
+        .offset(999 * limit - 1)
+        .first()
+    )
+    cursors = {1: None, 1000: encode_cursor(list(last))}
+
+    timings = {}
+    for page, cursor in cursors.items():
+        params = {"limit": limit, "cursor": cursor}
+        client.post("/api/get-items", json=params)
+
+        samples = []
+        for _ in range(20):
+            start = time.perf_counter()
+            response = client.post("/api/get-items", json=params)
+            samples.append(time.perf_counter() - start)
+        assert len(json.loads(response.data)) == limit
+
+        timings[page] = sorted(samples)[len(samples) // 2] * 1000
+
+    print(
+        f"\n/api/get-items over {BENCHMARK_LISTINGS} listings: page 1 "
+        f"{timings[1]:.1f}ms, page 1000 {timings[1000]:.1f}ms"
+    )
+
+    assert timings[1000] < timings[1] * 1.5
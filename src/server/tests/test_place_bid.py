@@ -0,0 +1,123 @@
+import sys
+import os
+import pytest
+import json
+import random
+import threading
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import User, Items, Bidding_history
+from app.bidding import record_bid
+from conftest import add_user, login, seed_items
+
+
+@pytest.fixture
+def client(database):
+    add_user("testuser", Setup_intent_ID="seti_test", Payment_method_ID="pm_test")
+    seller = add_user("testseller")
+    seed_items(
+        1,
+        ends_in=datetime.timedelta(days=7),
+        Listing_name="Rolex Watch",
+        Seller_id=seller.User_id,
+        Min_price=100,
+        Description="Luxury Rolex Watch",
+        Verified=True,
+    )
+    return database
+
+
+@pytest.fixture
+def logged_in_user(client):
+    return login(client, "testuser")
+
+
+def place_bid(client, user, amount):
+    item = Items.query.first()
+    return client.post(
+        "/api/place-bid",
+        json={"Item_id": item.Item_id, "Bid_amount": amount, "User_id": user.User_id},
+    )
+
+
+def test_place_bid(client, logged_in_user):
+    response = place_bid(client, logged_in_user, 150)
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    assert Items.query.first().Current_bid == 150
+    bid = Bidding_history.query.one()
+    assert bid.Bid_price == 150 and bid.Successful_bid
+
+
+def test_place_bid_demotes_previous_bid(client, logged_in_user):
+    assert place_bid(client, logged_in_user, 150).status_code == 200
+    assert place_bid(client, logged_in_user, 200).status_code == 200
+
+    successful = Bidding_history.query.filter_by(Successful_bid=True).all()
+    assert [bid.Bid_price for bid in successful] == [200]
+
+
+def test_place_bid_too_low(client, logged_in_user):
+    assert place_bid(client, logged_in_user, 50).status_code == 400
+    assert place_bid(client, logged_in_user, 150).status_code == 200
+
+    response = place_bid(client, logged_in_user, 150)
+    assert response.status_code == 400
+    assert (
+        json.loads(response.data)["message"]
+        == "Bid must be higher than the current bid"
+    )
+    assert Bidding_history.query.count() == 1
+
+
+def test_record_bid_rejects_stale_bid(client):
+    item = Items.query.first()
+    bidder = User.query.filter_by(Username="testuser").first()
+
+    assert record_bid(item.Item_id, bidder.User_id, 300)
+    # A bid validated against the old current bid loses the compare-and-swap
+    assert not record_bid(item.Item_id, bidder.User_id, 250)
+    assert Bidding_history.query.count() == 1
+
+
+def test_concurrent_bids_load(client):
+    item_id = Items.query.first().Item_id
+    bidder_id = User.query.filter_by(Username="testuser").first().User_id
+    threads, bids_per_thread = 8, 250
+    accepted = [[] for _ in range(threads)]
+
+    def bidder(index):
+        rng = random.Random(index)
+        with app.app_context():
+            for _ in range(bids_per_thread):
+                amount = rng.randint(100, 100000) + index / 10
+                if record_bid(item_id, bidder_id, amount):
+                    accepted[index].append(amount)
+            db.session.remove()
+
+    workers = [threading.Thread(target=bidder, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * bids_per_thread
+    print(f"\n{total} concurrent bids in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+
+    db.session.expire_all()
+    accepted_bids = sorted(amount for bids in accepted for amount in bids)
+    history = Bidding_history.query.order_by(Bidding_history.Bid_id).all()
+
+    # Every accepted bid was recorded once, each higher than the last
+    assert [bid.Bid_price for bid in history] == accepted_bids
+    # Only the highest bid is successful and it matches the item's current bid
+    successful = [bid for bid in history if bid.Successful_bid]
+    assert len(successful) == 1
+    assert successful[0].Bid_price == accepted_bids[-1]
+    assert db.session.get(Items, item_id).Current_bid == accepted_bids[-1]
@@ -5,7 +5,7 @@ import json
 import datetime
 from werkzeug.security import generate_password_hash
 from app import app, db
-from app.models import User, Items, Bidding_history
+from app.models import User, Items, Bidding_history, Types, Middle_type
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -79,6 +79,28 @@ def logged_in_user(client):
     return User.query.filter_by(Username="testuser").first()
 
 
+def filter_listings(client, **filters):
+    response = client.post("/api/get_filtered_listings", json=filters)
+    assert response.status_code == 200
+    return [item["Item_id"] for item in json.loads(response.data)]
+
+
+def add_item(name, min_price, current_bid, ends_in=datetime.timedelta(days=30)):
+    item = Items(
+        Listing_name=name,
+        Seller_id=2,
+        Available_until=datetime.datetime.now(datetime.timezone.utc) + ends_in,
+        Verified=False,
+        Authentication_request=False,
+        Description=f"A {name.lower()}",
+        Min_price=min_price,
+        Current_bid=current_bid,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
 # Test Case for /api/get_filtered_listings
 def test_get_filtered_listings(client, logged_in_user):
     test_item = Items.query.first()
@@ -86,26 +108,93 @@ def test_get_filtered_listings(client, logged_in_user):
     data = {
         "min_price": 100,
         "max_price": 300,
-        "listing_Ids": [test_item.Item_id],
     }
 
     response = client.post("/api/get_filtered_listings", json=data)
 
     assert response.status_code == 200
-    filtered_listing_ids = json.loads(response.data)
-    assert len(filtered_listing_ids) > 0
-    assert test_item.Item_id in filtered_listing_ids
+    filtered_listings = json.loads(response.data)
+    assert len(filtered_listings) > 0
+    assert test_item.Item_id in [item["Item_id"] for item in filtered_listings]
 
 
 def test_get_filtered_listings_no_match(client, logged_in_user):
     data = {
         "min_price": 500,
         "max_price": 1000,
-        "listing_Ids": [1],  # Assuming no item with this price
     }
 
     response = client.post("/api/get_filtered_listings", json=data)
 
     assert response.status_code == 200
-    filtered_listing_ids = json.loads(response.data)
-    assert len(filtered_listing_ids) == 0
+    filtered_listings = json.loads(response.data)
+    assert len(filtered_listings) == 0
+
+
+def test_price_is_higher_of_bid_and_minimum(client):
+    # Priced at its minimum until it is bid above it
+    unbid = add_item("Lamp", min_price=50, current_bid=0)
+    bid = add_item("Chair", min_price=50, current_bid=80)
+
+    assert unbid.Effective_price == 50
+    assert bid.Effective_price == 80
+
+    assert filter_listings(client, min_price=40, max_price=60) == [unbid.Item_id]
+    assert filter_listings(client, min_price=70, max_price=90) == [bid.Item_id]
+    assert bid.Item_id in filter_listings(client, min_price=80)
+    assert unbid.Item_id in filter_listings(client, max_price=50)
+
+    # The price follows new bids
+    unbid.Current_bid = 65
+    db.session.commit()
+    assert filter_listings(client, min_price=40, max_price=60) == []
+
+
+def test_filters_are_combined(client):
+    lamp = add_item("Lamp", min_price=50, current_bid=0)
+    add_item("Lamp", min_price=500, current_bid=0)
+    add_item("Chair", min_price=50, current_bid=0)
+    add_item("Lamp", min_price=50, current_bid=0, ends_in=-datetime.timedelta(days=1))
+
+    lighting = Types(Type_name="Lighting")
+    db.session.add(lighting)
+    db.session.commit()
+    for item in Items.query.filter_by(Listing_name="Lamp"):
+        db.session.add(Middle_type(Item_id=item.Item_id, Type_id=lighting.Type_id))
+    db.session.commit()
+
+    assert filter_listings(
+        client, min_price=0, max_price=100, categories="Lighting", searchQuery="lamp"
+    ) == [lamp.Item_id]
+
+
+def test_filter_by_bid_status(client, logged_in_user):
+    ended = add_item("Lamp", 50, 60, ends_in=-datetime.timedelta(days=1))
+    live = add_item("Chair", 50, 90)
+    for item, winning in ((ended, True), (live, False)):
+        db.session.add(
+            Bidding_history(
+                Item_id=item.Item_id,
+                Bidder_id=logged_in_user.User_id,
+                Bid_price=60,
+                Successful_bid=winning,
+                Winning_bid=winning,
+            )
+        )
+    db.session.commit()
+
+    assert filter_listings(client, bid_status="won") == [ended.Item_id]
+    assert filter_listings(client, bid_status="out_bid") == [live.Item_id]
+    assert filter_listings(client, bid_status="out_bid", max_price=80) == []
+
+
+def test_invalid_filters(client):
+    response = client.post("/api/get_filtered_listings", json={"min_price": "cheap"})
+    assert response.status_code == 400
+
+    response = client.post("/api/get_filtered_listings", json={"bid_status": "lost"})
+    assert response.status_code == 400
+
+    # Filtering by bid status needs a logged in user
+    response = client.post("/api/get_filtered_listings", json={"bid_status": "won"})
+    assert response.status_code == 401
@@ -0,0 +1,276 @@
+import sys
+import os
+import re
+import pytest
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import (
+    Items,
+    Images,
+    Image_variants,
+    Types,
+    Middle_type,
+    Watchlist,
+    Bidding_history,
+    Address,
+    Availabilities,
+    Chat,
+    ChatMessages,
+    Middle_expertise,
+)
+from conftest import add_user, capture_statements, login
+
+# A table or subquery read without an index, e.g. "SCAN items". Walking an index
+# in order ("SCAN items USING INDEX ...") and full-text searches are not full scans.
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# Tables that are meant to be read in full - every tag is loaded into the tag cache
+FULL_SCAN_ALLOWED = {"types"}
+
+pytestmark = pytest.mark.skipif(
+    not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"),
+    reason="Checks SQLite's query plans",
+)
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database):
+    buyer, seller, expert = (
+        add_user("buyer"),
+        add_user("seller"),
+        add_user("expert", level_of_access=2),
+    )
+    db.session.add(Types(Type_name="Watches"))
+    db.session.commit()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for ends_in in (2, -2):
+        item = Items(
+            Listing_name="Vintage Watch",
+            Seller_id=seller.User_id,
+            Expert_id=expert.User_id,
+            Available_until=now + datetime.timedelta(days=ends_in),
+            Min_price=10,
+            Current_bid=20,
+            Description="An old watch",
+            Verified=False,
+            Authentication_request=False,
+        )
+        db.session.add(item)
+        db.session.flush()
+
+        image = Images(
+            Item_id=item.Item_id, Image=b"image", Image_description="A watch"
+        )
+        db.session.add(image)
+        db.session.flush()
+        db.session.add_all(
+            [
+                Image_variants(Image_id=image.Image_id, Variant="grid", Image=b"grid"),
+                Middle_type(Item_id=item.Item_id, Type_id=1),
+                Watchlist(User_id=buyer.User_id, Item_id=item.Item_id),
+                Bidding_history(
+                    Item_id=item.Item_id,
+                    Bidder_id=buyer.User_id,
+                    Bid_price=20,
+                    Successful_bid=True,
+                    Winning_bid=ends_in < 0,
+                ),
+            ]
+        )
+
+    db.session.add_all(
+        [
+            Address(
+                User_id=buyer.User_id,
+                Line_1="1 Street",
+                Line_2="",
+                Country="UK",
+                City="Leeds",
+                Region="Yorkshire",
+                Postcode="LS1 1AA",
+                Is_billing=True,
+            ),
+            Availabilities(
+                Expert_id=expert.User_id,
+                Day_of_week=1,
+                Start_time=datetime.time(9),
+                End_time=datetime.time(17),
+                Week_start_date=datetime.date(2025, 3, 3),
+            ),
+            Middle_expertise(Expert_id=expert.User_id, Type_id=1),
+            Chat(
+                Sender_id=buyer.User_id,
+                Recipient_id=seller.User_id,
+                Item_id=1,
+            ),
+        ]
+    )
+    db.session.flush()
+    db.session.add(ChatMessages(Chat_id=1, Sender_id=buyer.User_id, Content="Hello"))
+    db.session.commit()
+
+    return database
+
+
+def capture_requests(requests):
+    """
+    Records the SQL statements, and their parameters, executed while serving
+    the given requests.
+    """
+    _, statements = capture_statements(lambda: [request() for request in requests])
+    return statements
+
+
+def full_scans(statement, parameters=()):
+    """
+    Returns the tables a statement reads in full, according to SQLite's query plan.
+    """
+    plan = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + statement, parameters
+    )
+
+    return {
+        match.group(1)
+        for *_, detail in plan
+        if (match := FULL_SCAN.match(detail))
+        and match.group(1) in db.metadata.tables
+        and match.group(1) not in FULL_SCAN_ALLOWED
+    }
+
+
+def assert_no_full_scans(statements):
+    scans = {}
+    for statement, parameters in statements:
+        # Bulk inserts and updates are run with a list of parameters
+        if isinstance(parameters, list):
+            continue
+        if statement.lstrip().split(None, 1)[0].upper() in (
+            "SELECT",
+            "UPDATE",
+            "DELETE",
+        ):
+            tables = full_scans(statement, parameters)
+            if tables:
+                scans[statement] = tables
+
+    assert scans == {}
+
+
+def test_browsing_queries_use_indexes(client):
+    browse = [
+        lambda: client.post("/api/get-items"),
+        lambda: client.post("/api/get-single-listing", json={"Item_id": 1}),
+        lambda: client.get("/api/images/1?variant=grid"),
+        lambda: client.get("/api/images/1"),
+        lambda: client.post(
+            "/api/get_filtered_listings", json={"min_price": 10, "max_price": 50}
+        ),
+        lambda: client.post(
+            "/api/get_filtered_listings", json={"searchQuery": "watch"}
+        ),
+        lambda: client.post("/api/get_category_filters", json={"categories": "watch"}),
+        lambda: client.post(
+            "/api/get_category_filters",
+            json={"categories": "watch", "category_match": "all"},
+        ),
+        lambda: client.post(
+            "/api/get_search_filter", json={"item": True, "searchQuery": "watch"}
+        ),
+    ]
+
+    assert_no_full_scans(capture_requests(browse))
+
+
+def test_account_queries_use_indexes(client):
+    account = [
+        lambda: client.post(
+            "/api/login",
+            json={"email_or_username": "buyer@gmail.com", "password": "UserPass123@"},
+        ),
+        lambda: client.post(
+            "/api/login",
+            json={"email_or_username": "buyer", "password": "UserPass123@"},
+        ),
+        lambda: client.post(
+            "/api/signup",
+            json={
+                "username": "buyer",
+                "email": "new@gmail.com",
+                "password": "UserPass123@",
+                "password_confirmation": "UserPass123@",
+                "first_name": "John",
+                "surname": "Doe",
+                "dob": "1995-07-10",
+            },
+        ),
+    ]
+
+    assert_no_full_scans(capture_requests(account))
+
+
+def test_buyer_queries_use_indexes(client):
+    login(client, "buyer")
+
+    buyer = [
+        lambda: client.post("/api/get-user-details"),
+        lambda: client.post("/api/get-listing-details/1"),
+        lambda: client.post("/api/get-address-details"),
+        lambda: client.get("/api/get-bids"),
+        lambda: client.get("/api/get-history"),
+        lambda: client.get("/api/get-watchlist"),
+        lambda: client.get("/api/check-watchlist?Item_id=1"),
+        lambda: client.post("/api/remove-watchlist", json={"item_id": 1}),
+        lambda: client.post("/api/add-watchlist", json={"item_id": 1}),
+        lambda: client.post("/api/get_filtered_listings", json={"bid_status": "won"}),
+        lambda: client.post(
+            "/api/get_bid_filtering",
+            json={"bid_status": "winning", "listing_Ids": [1, 2]},
+        ),
+    ]
+
+    assert_no_full_scans(capture_requests(buyer))
+
+
+def test_seller_and_expert_queries_use_indexes(client):
+    login(client, "seller")
+    seller = [
+        lambda: client.post("/api/get-seller-items"),
+        lambda: client.post("/api/get-sellerss-items"),
+    ]
+    statements = capture_requests(seller)
+
+    login(client, "expert")
+    expert = [
+        lambda: client.post("/api/get-experts-authentication-requests"),
+        lambda: client.post(
+            "/api/get-availabilities", json={"week_start_date": "2025-03-03"}
+        ),
+    ]
+    statements += capture_requests(expert)
+
+    assert_no_full_scans(statements)
+
+
+def test_chat_queries_use_indexes(client):
+    # Chats are served over Socket.IO, so their queries are checked directly
+    queries = [
+        Chat.query.filter_by(Sender_id=1, Recipient_id=2, Item_id=1, Active=True),
+        ChatMessages.query.filter_by(Chat_id=1).order_by(ChatMessages.Timestamp),
+        ChatMessages.query.filter_by(Chat_id=1, Sender_id=2, Read=False),
+    ]
+
+    statements = []
+    for query in queries:
+        compiled = query.statement.compile(db.engine)
+        statements.append(
+            (
+                str(compiled),
+                tuple(compiled.params[name] for name in compiled.positiontup),
+            )
+        )
+
+    assert_no_full_scans(statements)
@@ -0,0 +1,169 @@
+import sys
+import os
+import pytest
+import time
+import threading
+import datetime
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.bidding import record_bid
+from conftest import add_user, login, seed_items
+
+# Threads placing bids during the benchmark, enough to hold every connection in
+# the primary's pool
+BENCHMARK_BIDDERS = int(
+    os.environ.get(
+        "REPLICA_BENCHMARK_BIDDERS",
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"]
+        + app.config["SQLALCHEMY_ENGINE_OPTIONS"]["max_overflow"]
+        + 10,
+    )
+)
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database):
+    add_user("buyer")
+    seed_items(2000, ends_in=datetime.timedelta(days=1), Min_price=1)
+
+    yield database
+
+    # Closes the connections the bidders opened
+    for engine in db.engines.values():
+        engine.dispose()
+
+
+def engines_used(request):
+    """
+    Returns the engines that ran the statements of a request.
+    """
+    engines = set()
+    request_thread = threading.get_ident()
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if threading.get_ident() == request_thread:
+            engines.add(conn.engine)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = request()
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200
+    return engines
+
+
+def test_browse_reads_from_replica(client):
+    replica = db.engines["replica"]
+
+    assert engines_used(lambda: client.post("/api/get-items")) == {replica}
+    assert engines_used(
+        lambda: client.post("/api/get-single-listing", json={"Item_id": 1})
+    ) == {replica}
+    assert engines_used(
+        lambda: client.post(
+            "/api/get_search_filter", json={"item": True, "searchQuery": "item"}
+        )
+    ) == {replica}
+
+    # Everything else is read from the primary
+    login(client, "buyer")
+    assert engines_used(lambda: client.post("/api/get-user-details")) == {db.engine}
+
+
+def test_reads_own_writes(client):
+    login(client, "buyer")
+    assert engines_used(
+        lambda: client.post("/api/add-watchlist", json={"item_id": 1})
+    ) == {db.engine}
+
+    # The replica may not have the user's change yet
+    assert engines_used(lambda: client.post("/api/get-items")) == {db.engine}
+
+    with client.session_transaction() as session:
+        session["last_write"] -= app.config["READ_YOUR_WRITES_WINDOW"] + 1
+    assert engines_used(lambda: client.post("/api/get-items")) == {
+        db.engines["replica"]
+    }
+
+
+def browse_latency(client, requests):
+    """
+    Times browsing requests.
+
+    Returns:
+    - tuple: The median and slowest request, in milliseconds, and the number of
+      requests that failed.
+    """
+    timings = []
+    failed = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        if client.post("/api/get-items").status_code != 200:
+            failed += 1
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1], failed
+
+
+def under_bid_load(measure):
+    """
+    Runs measure() while BENCHMARK_BIDDERS threads bid on the items.
+    """
+    stop = threading.Event()
+
+    def bidder(n):
+        bid = 0
+        while not stop.is_set():
+            bid += 1
+            with app.app_context():
+                try:
+                    record_bid(n % 2000 + 1, 1, bid * BENCHMARK_BIDDERS + n)
+                except (exc.OperationalError, exc.TimeoutError):
+                    # Timed out waiting for a connection, or the write lock
+                    pass
+
+    bidders = [
+        threading.Thread(target=bidder, args=(n,)) for n in range(BENCHMARK_BIDDERS)
+    ]
+    for thread in bidders:
+        thread.start()
+    try:
+        # Lets the bidders fill the pool
+        time.sleep(1)
+        return measure()
+    finally:
+        stop.set()
+        for thread in bidders:
+            thread.join()
+
+
+@pytest.mark.benchmark
+def test_browse_latency_under_bid_load(client, monkeypatch):
+    idle, _, _ = browse_latency(client, 20)
+    routed, routed_slowest, routed_failed = under_bid_load(
+        lambda: browse_latency(client, 20)
+    )
+
+    # The same requests, reading from the primary
+    monkeypatch.setattr("app.database.reads_from_replica", lambda: False)
+    primary, primary_slowest, primary_failed = under_bid_load(
+        lambda: browse_latency(client, 1)
+    )
+
+    print(
+        f"\n/api/get-items: idle {idle:.1f}ms, under {BENCHMARK_BIDDERS} bidders "
+        f"{routed:.1f}ms (slowest {routed_slowest:.1f}ms) from the replica, "
+        f"{primary:.1f}ms ({primary_failed} failed) from the primary"
+    )
+
+    assert routed_failed == 0
+    assert routed_slowest < primary_slowest
@@ -0,0 +1,204 @@
+import sys
+import os
+import pytest
+import json
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.bidding import record_bid
+from app.cache import cache, invalidate
+from app.models import Items, Bidding_history, Types
+from app.payments import LocalPaymentIntent
+from app.taskqueue import handle_auction_ending
+import conftest
+from conftest import add_user, login
+
+
+# Test Setup - Fixtures
+@pytest.fixture(params=["FileSystemCache", "app.localredis.LocalRedisCache"])
+def backend(request):
+    """
+    The cache's backend, a directory of files or Redis.
+    """
+    cache.init_app(app, config={"CACHE_TYPE": request.param})
+    cache.clear()
+
+    yield request.param
+
+    cache.clear()
+    cache.init_app(app)
+
+
+@pytest.fixture
+def client(backend, database, monkeypatch):
+    monkeypatch.setitem(
+        app.config, "PAYMENT_INTENTS", "app.payments.LocalPaymentIntent"
+    )
+    monkeypatch.setattr(app.extensions["mail"], "suppress", True)
+    LocalPaymentIntent.intents.clear()
+
+    for username in ("buyer", "seller"):
+        add_user(username, Customer_ID="cus_local", Payment_method_ID="pm_card_visa")
+    db.session.add(Types(Type_name="Watches"))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for ends_in in (1, -1, -2):
+        db.session.add(
+            Items(
+                Listing_name="Vintage Watch",
+                Seller_id=2,
+                Upload_datetime=now - datetime.timedelta(days=3),
+                Available_until=now + datetime.timedelta(days=ends_in),
+                Min_price=10,
+                Current_bid=20,
+                Description="An old watch",
+                Verified=False,
+                Authentication_request=False,
+            )
+        )
+    db.session.flush()
+    db.session.add_all(
+        Bidding_history(
+            Item_id=item_id,
+            Bidder_id=1,
+            Bid_price=20,
+            Successful_bid=True,
+            Winning_bid=False,
+            Bid_datetime=now - datetime.timedelta(days=2),
+        )
+        for item_id in (1, 2, 3)
+    )
+    db.session.commit()
+
+    return database
+
+
+def count_queries(request):
+    """
+    Counts the SQL statements executed while serving a request.
+
+    Returns:
+    - tuple: The response's JSON, and the number of statements.
+    """
+    response, queries = conftest.count_queries(request)
+    assert response.status_code == 200
+    return json.loads(response.data), queries
+
+
+def get_listing(client, item_id):
+    return count_queries(
+        lambda: client.post("/api/get-single-listing", json={"Item_id": item_id})
+    )
+
+
+def test_listing_cached_until_bid(client):
+    listing, queries = get_listing(client, 1)
+    assert queries > 0
+
+    # Served from the cache, only reading the listing's version for its ETag
+    cached, queries = get_listing(client, 1)
+    assert cached == listing
+    assert queries == 1
+
+    # A different listing is not
+    other, queries = get_listing(client, 2)
+    assert other["Item_id"] == 2 and queries > 0
+
+    assert record_bid(1, 1, 30)
+    listing, queries = get_listing(client, 1)
+    assert listing["Current_bid"] == 30
+    assert queries > 0
+
+    # A bid that is rolled back does not expire the listing
+    assert not record_bid(1, 1, 25)
+    _, queries = get_listing(client, 1)
+    assert queries == 1
+
+
+def test_listing_invalidated_by_settlement(client):
+    get_listing(client, 2)
+    login(client, "buyer")
+    history, _ = count_queries(lambda: client.get("/api/get-history"))
+    assert not any(bid["Winning_bid"] for bid in history["history"])
+
+    handle_auction_ending(db.session.get(Items, 2))
+    db.session.commit()
+
+    listing, queries = get_listing(client, 2)
+    assert listing["Sold"] and queries > 0
+
+    # The winner's history shows the auction they won
+    history, queries = count_queries(lambda: client.get("/api/get-history"))
+    assert queries > 0
+    assert [bid["Item_id"] for bid in history["history"] if bid["Winning_bid"]] == [2]
+
+
+def test_history_cached_per_user_and_page(client):
+    login(client, "buyer")
+    first_page, queries = count_queries(lambda: client.get("/api/get-history?limit=1"))
+    assert queries > 0
+
+    response = client.get("/api/get-history?limit=1")
+    assert json.loads(response.data) == first_page
+    # Only cached by the server, browsers and proxies must not share it
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    # The cursor of the next page is cached with the page
+    cursor = response.headers["X-Next-Cursor"]
+
+    second_page, queries = count_queries(
+        lambda: client.get(f"/api/get-history?limit=1&cursor={cursor}")
+    )
+    assert queries > 0
+    assert second_page != first_page
+
+    # Other users are not given the buyer's history
+    login(client, "seller")
+    assert client.get("/api/get-history?limit=1").status_code == 400
+
+
+def test_tags_invalidated_when_changed(client):
+    tags, queries = count_queries(lambda: client.get("/api/get-tags"))
+    assert [tag["Type_name"] for tag in tags] == ["Watches"]
+
+    _, queries = count_queries(lambda: client.get("/api/get-tags"))
+    assert queries == 0
+
+    db.session.add(Types(Type_name="Vintage"))
+    db.session.commit()
+
+    tags, _ = count_queries(lambda: client.get("/api/get-tags"))
+    assert [tag["Type_name"] for tag in tags] == ["Watches", "Vintage"]
+
+
+def test_invalidation_waits_for_commit(client):
+    get_listing(client, 1)
+
+    # Invalidated only when the change is committed, so a request served in
+    # between cannot cache the old listing again
+    version = cache.get("tag:item:1")
+    item = db.session.get(Items, 1)
+    item.Description = "A new description"
+    invalidate("item:1")
+    assert cache.get("tag:item:1") == version
+    db.session.commit()
+    assert cache.get("tag:item:1") != version
+
+    listing, _ = get_listing(client, 1)
+    assert listing["Description"] == "A new description"
+
+
+def test_cache_shared_between_workers(client, backend):
+    get_listing(client, 1)
+
+    # Another worker, with its own connection to the backend, is served the
+    # cached listing and expires it for everyone
+    cache.init_app(app, config={"CACHE_TYPE": backend})
+    _, queries = get_listing(client, 1)
+    assert queries == 1
+    assert record_bid(1, 1, 30)
+
+    cache.init_app(app, config={"CACHE_TYPE": backend})
+    listing, queries = get_listing(client, 1)
+    assert listing["Current_bid"] == 30
+    assert queries > 0
@@ -0,0 +1,272 @@
+import sys
+import os
+import pytest
+import json
+import random
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Items, Types, Middle_type
+from app.search import optimize_search_index
+from conftest import add_user, seed_items
+
+# Listings searched by the benchmark, can be lowered for quick local runs
+BENCHMARK_LISTINGS = int(os.environ.get("SEARCH_BENCHMARK_LISTINGS", 100000))
+
+WORDS = [
+    "vintage",
+    "watch",
+    "rolex",
+    "omega",
+    "gold",
+    "silver",
+    "leather",
+    "strap",
+    "camera",
+    "lens",
+    "canon",
+    "nikon",
+    "guitar",
+    "fender",
+    "piano",
+    "vinyl",
+    "record",
+    "jacket",
+    "denim",
+    "boots",
+    "painting",
+    "oil",
+    "canvas",
+    "lamp",
+    "chair",
+    "oak",
+    "table",
+    "antique",
+    "clock",
+    "brass",
+    "ring",
+    "diamond",
+]
+
+
+@pytest.fixture
+def client(database):
+    add_user("seller")
+    return database
+
+
+def add_item(name, description="An item for sale"):
+    item = Items(
+        Listing_name=name,
+        Seller_id=1,
+        Upload_datetime=datetime.datetime.now(datetime.timezone.utc),
+        Available_until=datetime.datetime.now(datetime.timezone.utc)
+        + datetime.timedelta(days=2),
+        Min_price=10,
+        Current_bid=0,
+        Description=description,
+        Verified=False,
+        Authentication_request=False,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def search(client, query, **kwargs):
+    response = client.post(
+        "/api/get_search_filter", json={"item": True, "searchQuery": query, **kwargs}
+    )
+    assert response.status_code == 200
+    return response, [item["Listing_name"] for item in json.loads(response.data)]
+
+
+def test_prefix_search(client):
+    add_item("Vintage Watch")
+    add_item("Vintage Camera")
+
+    assert search(client, "vint wat")[1] == ["Vintage Watch"]
+    assert sorted(search(client, "VINTAGE")[1]) == ["Vintage Camera", "Vintage Watch"]
+    assert search(client, "watches")[1] == []
+
+
+def test_index_follows_item_changes(client):
+    item = add_item("Vintage Watch")
+
+    item.Listing_name = "Antique Clock"
+    db.session.commit()
+    assert search(client, "watch")[1] == []
+    assert search(client, "clock")[1] == ["Antique Clock"]
+
+    db.session.delete(item)
+    db.session.commit()
+    assert search(client, "clock")[1] == []
+
+
+def test_index_follows_tag_changes(client):
+    item = add_item("Vintage Watch")
+    tag = Types(Type_name="Jewellery")
+    db.session.add(tag)
+    db.session.commit()
+
+    link = Middle_type(Item_id=item.Item_id, Type_id=tag.Type_id)
+    db.session.add(link)
+    db.session.commit()
+    assert search(client, "jewel")[1] == ["Vintage Watch"]
+
+    tag.Type_name = "Accessories"
+    db.session.commit()
+    assert search(client, "jewel")[1] == []
+    assert search(client, "access")[1] == ["Vintage Watch"]
+
+    db.session.delete(link)
+    db.session.commit()
+    assert search(client, "access")[1] == []
+
+
+def test_results_ranked(client):
+    add_item("Leather Jacket", description="Goes well with a gold watch")
+    add_item("Gold Watch")
+
+    # A match in the name ranks above one in the description
+    assert search(client, "watch")[1] == ["Gold Watch", "Leather Jacket"]
+
+
+def test_search_pagination(client):
+    for i in range(5):
+        add_item(f"Watch {i}")
+
+    response, first = search(client, "watch", limit=2)
+    assert len(first) == 2
+
+    cursor = response.headers["X-Next-Cursor"]
+    response, second = search(client, "watch", limit=2, cursor=cursor)
+
+    cursor = response.headers["X-Next-Cursor"]
+    response, last = search(client, "watch", limit=2, cursor=cursor)
+    assert len(last) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+    assert sorted(first + second + last) == [f"Watch {i}" for i in range(5)]
+
+
+def test_every_match_ranked(client):
+    add_item("Watch")
+    # Many newer, weaker matches
+    seed_items(1200, Listing_name="Leather strap for a vintage watch")
+
+    response, first = search(client, "watch", limit=100)
+    assert first[0] == "Watch"
+
+    # Paging reaches every match, each of them once
+    names = first
+    while "X-Next-Cursor" in response.headers:
+        response, page = search(
+            client, "watch", limit=100, cursor=response.headers["X-Next-Cursor"]
+        )
+        names += page
+    assert len(names) == 1201
+
+
+def test_every_match_streamed(client):
+    add_item("Watch")
+    seed_items(1200, Listing_name="Leather strap for a vintage watch")
+
+    response = client.post(
+        "/api/get_search_filter",
+        json={"item": True, "searchQuery": "watch", "stream": True},
+    )
+    assert response.is_streamed
+    # Every match is sent, best first
+    names = [item["Listing_name"] for item in response.json]
+    assert len(names) == 1201
+    assert names[0] == "Watch"
+
+
+def test_ended_matches_do_not_hide_live_ones(client):
+    add_item("Vintage Watch")
+    # Newer matches than the live listing, all of them ended
+    seed_items(
+        1200,
+        ends_in=-datetime.timedelta(days=1),
+        spacing=datetime.timedelta(0),
+        Listing_name="Old Watch",
+    )
+
+    assert search(client, "watch")[1] == ["Vintage Watch"]
+
+    response = client.post(
+        "/api/get_search_filter",
+        json={"item": True, "searchQuery": "watch", "stream": True},
+    )
+    assert [item["Listing_name"] for item in response.json] == ["Vintage Watch"]
+
+
+def seed_listings(count):
+    rng = random.Random(0)
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    db.session.execute(
+        db.insert(Types),
+        [{"Type_id": i + 1, "Type_name": w} for i, w in enumerate(WORDS)],
+    )
+    db.session.execute(
+        db.insert(Items),
+        [
+            {
+                "Item_id": i,
+                "Listing_name": " ".join(rng.sample(WORDS, 3)).title(),
+                "Seller_id": 1,
+                "Upload_datetime": now,
+                "Available_until": now + datetime.timedelta(days=2),
+                "Min_price": 10,
+                "Current_bid": 0,
+                "Description": " ".join(rng.sample(WORDS, 8)),
+                "Verified": False,
+                "Authentication_request": False,
+            }
+            for i in range(1, count + 1)
+        ],
+    )
+    db.session.execute(
+        db.insert(Middle_type),
+        [
+            {"Item_id": i, "Type_id": rng.randint(1, len(WORDS))}
+            for i in range(1, count + 1)
+        ],
+    )
+    db.session.commit()
+
+
+@pytest.mark.benchmark
+def test_search_benchmark(client):
+    seed_listings(BENCHMARK_LISTINGS)
+    optimize_search_index()
+    rng = random.Random(1)
+
+    queries = []
+    for _ in range(200):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        # Partially typed last word
+        words[-1] = words[-1][: rng.randint(2, len(words[-1]))]
+        queries.append(" ".join(words))
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(client, query, limit=50)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    print(
+        f"\nSearch over {BENCHMARK_LISTINGS} listings: p50 {p50:.1f}ms, p99 {p99:.1f}ms"
+    )
+
+    # Every match is ranked, so the slowest searches are the partially typed words
+    # that match most of the catalogue, e.g. "ca"
+    assert p50 < 50
+    assert p99 < 100
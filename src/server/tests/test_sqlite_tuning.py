@@ -0,0 +1,217 @@
+import sys
+import os
+import pytest
+import time
+import threading
+import datetime
+from sqlalchemy import create_engine, event, exc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.database import set_sqlite_pragmas, set_sqlite_write_pragmas
+from app.models import User, Items, Bidding_history
+
+# Reads or writes made by each thread of the benchmark
+BENCHMARK_OPERATIONS = int(os.environ.get("SQLITE_BENCHMARK_OPERATIONS", 200))
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database):
+    return database
+
+
+@pytest.mark.skipif(
+    not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"),
+    reason="The app is not using SQLite",
+)
+def test_connections_are_tuned(client):
+    def engine_pragmas(engine):
+        with engine.connect() as connection:
+            return {
+                name: connection.execute(db.text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+                + tuple(app.config["SQLITE_PRAGMAS"])
+            }
+
+    pragmas = engine_pragmas(db.engine)
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == app.config["SQLITE_PRAGMAS"]["busy_timeout"]
+    assert pragmas["cache_size"] == app.config["SQLITE_PRAGMAS"]["cache_size"]
+    assert db.engine.pool.size() == app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"]
+
+    # The replica's read-only connections are tuned for reading, but do not set
+    # the journal mode, which would write to the database
+    replica = db.engines["replica"]
+    assert not event.contains(replica, "connect", set_sqlite_write_pragmas)
+    pragmas = engine_pragmas(replica)
+    assert pragmas["journal_mode"] == "wal"  # Set by the primary
+    assert pragmas["synchronous"] == 2  # FULL, SQLite's default
+    assert pragmas["busy_timeout"] == app.config["SQLITE_PRAGMAS"]["busy_timeout"]
+    assert pragmas["cache_size"] == app.config["SQLITE_PRAGMAS"]["cache_size"]
+
+
+def create_database(path, tuned):
+    """
+    Creates a database of live listings, using the app's engine profile if tuned.
+    """
+    engine = create_engine(
+        f"sqlite:///{path}", **app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    )
+    if tuned:
+        event.listen(engine, "connect", set_sqlite_write_pragmas)
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+    db.metadata.create_all(engine)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(
+            db.insert(User),
+            {
+                "Username": "seller",
+                "Password": "password",
+                "Email": "seller@gmail.com",
+                "First_name": "Jane",
+                "Surname": "Smith",
+                "DOB": datetime.date(1988, 6, 15),
+                "Level_of_access": 1,
+                "Is_expert": False,
+            },
+        )
+        connection.execute(
+            db.insert(Items),
+            [
+                {
+                    "Listing_name": f"Item {i}",
+                    "Seller_id": 1,
+                    "Upload_datetime": now,
+                    "Available_until": now + datetime.timedelta(minutes=i),
+                    "Min_price": 10,
+                    "Current_bid": 0,
+                    "Description": "A test item",
+                    "Verified": False,
+                    "Authentication_request": False,
+                }
+                for i in range(1, 2001)
+            ],
+        )
+
+    return engine
+
+
+def browse(connection, i):
+    connection.execute(
+        db.select(Items.Item_id, Items.Listing_name, Items.Current_bid)
+        .where(Items.Is_live == True)
+        .order_by(Items.Available_until, Items.Item_id)
+        .limit(app.config["PAGE_SIZE"])
+    ).all()
+
+
+def bid(connection, i):
+    item_id = i % 2000 + 1
+    connection.execute(
+        db.insert(Bidding_history),
+        {
+            "Item_id": item_id,
+            "Bidder_id": 1,
+            "Bid_price": i,
+            "Successful_bid": True,
+            "Bid_datetime": datetime.datetime.now(datetime.timezone.utc),
+        },
+    )
+    connection.execute(
+        db.update(Items).where(Items.Item_id == item_id).values(Current_bid=i)
+    )
+
+
+def run_workload(engine, threads=8):
+    """
+    Runs browsing and bidding threads side by side, half of each.
+
+    Returns:
+    - tuple: Operations completed a second, and the number that failed.
+    """
+    completed = []
+    failed = []
+
+    def worker(operation):
+        done = errors = 0
+        for i in range(BENCHMARK_OPERATIONS):
+            try:
+                with engine.begin() as connection:
+                    operation(connection, i)
+                done += 1
+            except exc.OperationalError:
+                errors += 1
+        completed.append(done)
+        failed.append(errors)
+
+    workers = [
+        threading.Thread(target=worker, args=(browse if n % 2 else bid,))
+        for n in range(threads)
+    ]
+
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return sum(completed) / elapsed, sum(failed)
+
+
+def connection_pragmas(connection):
+    return {
+        name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout")
+    }
+
+
+def test_tuned_engine_survives_mixed_load(tmp_path):
+    engine = create_database(tmp_path / "tuned.db", tuned=True)
+    _, failed = run_workload(engine)
+
+    # Writers wait for the lock instead of failing with "database is locked"
+    assert failed == 0
+
+    # Every pooled connection is tuned, not just the first
+    connections = [engine.connect() for _ in range(engine.pool.size())]
+    try:
+        for connection in connections:
+            assert connection_pragmas(connection) == {
+                "journal_mode": "wal",
+                "synchronous": 1,  # NORMAL
+                "busy_timeout": app.config["SQLITE_PRAGMAS"]["busy_timeout"],
+            }
+    finally:
+        for connection in connections:
+            connection.close()
+        engine.dispose()
+
+    # Without the profile SQLite keeps its rollback journal
+    default_engine = create_database(tmp_path / "default.db", tuned=False)
+    with default_engine.connect() as connection:
+        assert connection_pragmas(connection)["journal_mode"] == "delete"
+    default_engine.dispose()
+
+
+@pytest.mark.benchmark
+def test_tuned_engine_throughput(tmp_path):
+    results = {}
+    for tuned in (False, True):
+        engine = create_database(tmp_path / f"tuned-{tuned}.db", tuned)
+        results[tuned] = run_workload(engine)
+        engine.dispose()
+
+    (default, default_errors), (tuned, tuned_errors) = results[False], results[True]
+    print(
+        f"\nMixed browsing and bidding, 8 threads: default {default:.0f} ops/s "
+        f"({default_errors} failed), tuned {tuned:.0f} ops/s ({tuned_errors} failed)"
+    )
+
+    assert tuned_errors == 0
+    assert tuned > default * 1.5
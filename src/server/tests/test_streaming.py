@@ -0,0 +1,172 @@
+import sys
+import os
+import pytest
+import json
+import time
+import tracemalloc
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Bidding_history
+from conftest import add_user, login, seed_items, seed_users
+
+# Users streamed when profiling memory, compared with a tenth as many
+STREAM_BENCHMARK_ROWS = int(os.environ.get("STREAM_BENCHMARK_ROWS", 100000))
+
+
+# Test Setup - Fixtures
+@pytest.fixture
+def client(database):
+    add_user("manager", level_of_access=3, First_name="Mary", Surname="Jones")
+    login(database, "manager")
+    return database
+
+
+def seed_sold_items(count, ends_in):
+    """
+    Bulk inserts items with a bid from the manager, won if the item has ended.
+    """
+    item_ids = seed_items(count, ends_in=ends_in, Current_bid=20)
+    db.session.execute(
+        db.insert(Bidding_history),
+        [
+            {
+                "Item_id": item_id,
+                "Bidder_id": 1,
+                "Bid_price": 20,
+                "Successful_bid": True,
+                "Winning_bid": ends_in < datetime.timedelta(0),
+            }
+            for item_id in item_ids
+        ],
+    )
+    db.session.commit()
+
+
+def all_pages(request, key=None):
+    """
+    Follows the X-Next-Cursor of a paginated endpoint, collecting every result.
+    """
+    results, cursor = [], None
+    while True:
+        response = request(cursor)
+        assert response.status_code == 200
+        page = response.json if key is None else response.json[key]
+        results.extend(page)
+
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return results
+
+
+def test_streamed_users_match_pages(client):
+    seed_users(250)
+
+    response = client.post("/api/get_all_users", json={"stream": True})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert "X-Next-Cursor" not in response.headers
+
+    users = response.json
+    assert len(users) == 251
+    assert users == all_pages(
+        lambda cursor: client.post(
+            "/api/get_all_users", json={"cursor": cursor, "limit": 100}
+        )
+    )
+
+    # Searching for users streams the matches
+    response = client.post(
+        "/api/get_search_filter",
+        json={"user": True, "searchQuery": "smith", "stream": True},
+    )
+    assert [user["Username"] for user in response.json] == [
+        f"user{i}" for i in range(2, 252)
+    ]
+
+
+def test_streamed_listings_match_pages(client):
+    seed_sold_items(120, ends_in=datetime.timedelta(days=1))
+
+    response = client.post(
+        "/api/get_search_filter",
+        json={"item": True, "searchQuery": "", "stream": True},
+    )
+    assert response.status_code == 200
+    assert response.json == all_pages(
+        lambda cursor: client.post(
+            "/api/get_search_filter",
+            json={"item": True, "searchQuery": "", "cursor": cursor},
+        )
+    )
+
+
+def test_streamed_sold_items_match_pages(client):
+    seed_sold_items(120, ends_in=-datetime.timedelta(days=1))
+
+    response = client.get("/api/get-sold?stream=true")
+    assert response.status_code == 200
+    sold_items = response.json["sold_items"]
+    assert len(sold_items) == 120
+    assert sold_items == all_pages(
+        lambda cursor: client.get(
+            "/api/get-sold", query_string={"cursor": cursor} if cursor else {}
+        ),
+        key="sold_items",
+    )
+
+
+def profile_stream(client, url, **kwargs):
+    """
+    Reads a streamed response a chunk at a time, as a client would.
+
+    Returns:
+    - tuple: The peak memory allocated while serving it in bytes, the time to its
+      first chunk in seconds, and its length in bytes.
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        response = client.post(url, buffered=False, **kwargs)
+        chunks = response.iter_encoded()
+        length = len(next(chunks))
+        first_byte = time.perf_counter() - start
+
+        for chunk in chunks:
+            length += len(chunk)
+        response.close()
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak, first_byte, length
+
+
+@pytest.mark.benchmark
+def test_streaming_memory_profile(client):
+    small = STREAM_BENCHMARK_ROWS // 10
+    seed_users(small)
+    small_peak, small_first_byte, small_length = profile_stream(
+        client, "/api/get_all_users", json={"stream": True}
+    )
+
+    seed_users(STREAM_BENCHMARK_ROWS - small)
+    peak, first_byte, length = profile_stream(
+        client, "/api/get_all_users", json={"stream": True}
+    )
+
+    print(
+        f"\nStreaming {small} users: {small_length / 1e6:.1f}MB sent, "
+        f"{small_peak / 1e6:.1f}MB peak memory, first byte in "
+        f"{small_first_byte * 1000:.1f}ms\n"
+        f"Streaming {STREAM_BENCHMARK_ROWS} users: {length / 1e6:.1f}MB sent, "
+        f"{peak / 1e6:.1f}MB peak memory, first byte in {first_byte * 1000:.1f}ms"
+    )
+
+    # Ten times the rows, but the same memory and time to the first byte
+    assert length > 9 * small_length
+    assert peak < 2 * small_peak
+    assert peak < length / 5
+    assert first_byte < 5 * small_first_byte + 0.05
@@ -0,0 +1,155 @@
+import sys
+import os
+import io
+import pytest
+import json
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import Images, Image_variants
+from app.images import queue_thumbnails, THUMBNAIL_SIZES
+from app.blobstore import read_image
+from conftest import add_user, seed_items
+from PIL import Image
+
+
+def make_photo(width=2000, height=1500, seed=0):
+    """
+    Creates a noisy JPEG roughly the size of a phone photo.
+    """
+    rng = random.Random(seed)
+    image = Image.frombytes(
+        "RGB", (width // 8, height // 8), rng.randbytes(width // 8 * height // 8 * 3)
+    ).resize((width, height))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+@pytest.fixture
+def client(database):
+    add_user("seller")
+    return database
+
+
+def add_items(count, photo):
+    """
+    Adds available items with one photo each, returning the image IDs.
+    """
+    images = [
+        Images(Item_id=item_id, Image=photo, Image_description="photo")
+        for item_id in seed_items(count)
+    ]
+    db.session.add_all(images)
+    db.session.commit()
+    return [image.Image_id for image in images]
+
+
+def page_bytes(client):
+    """
+    Total bytes a browser downloads to render the homepage grid.
+    """
+    response = client.post("/api/get-items")
+    total = len(response.data)
+    for item in json.loads(response.data):
+        total += len(client.get(item["Image"]).data)
+    return total
+
+
+def test_thumbnails_generated(client):
+    image_ids = add_items(1, make_photo())
+
+    for future in queue_thumbnails(image_ids):
+        future.result()
+
+    variants = Image_variants.query.filter_by(Image_id=image_ids[0]).all()
+    assert {variant.Variant for variant in variants} == set(THUMBNAIL_SIZES)
+
+    for variant in variants:
+        with Image.open(io.BytesIO(read_image(variant))) as thumbnail:
+            max_width, max_height = THUMBNAIL_SIZES[variant.Variant]
+            assert thumbnail.width <= max_width
+            assert thumbnail.height <= max_height
+
+
+def test_small_images_not_resized(client):
+    image_ids = add_items(1, make_photo(width=200, height=150))
+
+    for future in queue_thumbnails(image_ids):
+        future.result()
+
+    # The original already fits every bounding box, so it is served as is
+    original = Images.query.first()
+    variants = Image_variants.query.all()
+    assert {variant.Variant for variant in variants} == set(THUMBNAIL_SIZES)
+    assert {variant.Image_hash for variant in variants} == {original.Image_hash}
+
+    response = client.get(f"/api/images/{image_ids[0]}?variant=grid")
+    assert response.status_code == 200
+    assert response.data == read_image(original)
+    assert response.cache_control.immutable
+
+
+def test_grid_serves_thumbnail(client):
+    image_ids = add_items(1, make_photo())
+
+    # Before the thumbnail exists the original is served, but not cached for long
+    response = client.get(f"/api/images/{image_ids[0]}?variant=grid")
+    assert response.data == Images.query.first().Image
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+
+    for future in queue_thumbnails(image_ids):
+        future.result()
+
+    response = client.get(f"/api/images/{image_ids[0]}?variant=grid")
+    grid = Image_variants.query.filter_by(Variant="grid").first()
+    assert response.data == read_image(grid)
+    assert response.cache_control.immutable
+
+
+def test_invalid_variant(client):
+    image_ids = add_items(1, make_photo(width=200, height=150))
+    response = client.get(f"/api/images/{image_ids[0]}?variant=huge")
+    assert response.status_code == 400
+
+
+def test_grid_page_bytes_benchmark(client):
+    image_ids = add_items(24, make_photo())
+
+    before = page_bytes(client)
+
+    for future in queue_thumbnails(image_ids):
+        future.result()
+
+    after = page_bytes(client)
+    print(f"\nGrid page of 24 items: {before} bytes before, {after} bytes after")
+
+    assert after * 10 < before
+
+
+def test_unreadable_image_logged(client, caplog):
+    image_ids = add_items(1, b"\xff\xd8\xff" + b"not really a photo")
+
+    for future in queue_thumbnails(image_ids):
+        future.result()
+
+    assert Image_variants.query.count() == 0
+    assert f"Error generating thumbnails for image {image_ids[0]}" in caplog.text
+
+
+def test_thumbnail_errors_logged(client, caplog, monkeypatch):
+    image_ids = add_items(1, make_photo())
+
+    # Pillow raises ValueError or SyntaxError on some corrupt files
+    def make_thumbnail(data, size):
+        raise SyntaxError("broken PNG file")
+
+    monkeypatch.setattr("app.images.make_thumbnail", make_thumbnail)
+
+    for future in queue_thumbnails(image_ids):
+        assert future.exception() is None
+
+    assert Image_variants.query.count() == 0
+    assert f"Error generating thumbnails for image {image_ids[0]}" in caplog.text
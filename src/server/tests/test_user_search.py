@@ -0,0 +1,164 @@
+import sys
+import os
+import pytest
+import json
+import random
+import time
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db
+from app.models import User
+from app.search import optimize_search_index, search_users
+import conftest
+from werkzeug.security import generate_password_hash
+
+# Users searched by the benchmark, can be lowered for quick local runs
+BENCHMARK_USERS = int(os.environ.get("USER_SEARCH_BENCHMARK_USERS", 1000000))
+
+# Syllables of the generated names, giving thousands of distinct names like a real
+# user base rather than a handful of common ones
+SYLLABLES = ["al", "an", "ber", "da", "el", "fi", "ga", "han", "is", "jo", "ka", "li"]
+SYLLABLES += ["ma", "ne", "o", "pa", "ri", "sa", "ta", "u", "vi", "wen", "ya", "zo"]
+
+
+@pytest.fixture
+def client(database):
+    return database
+
+
+def add_user(first, surname, middle=None):
+    return conftest.add_user(
+        f"{first}{surname}".lower(),
+        First_name=first,
+        Middle_name=middle,
+        Surname=surname,
+    )
+
+
+def search(client, query, **kwargs):
+    response = client.post(
+        "/api/get_search_filter", json={"user": True, "searchQuery": query, **kwargs}
+    )
+    assert response.status_code == 200
+    return response, [
+        f"{user['First_name']} {user['Surname']}" for user in json.loads(response.data)
+    ]
+
+
+def test_prefix_search(client):
+    add_user("John", "Smith")
+    add_user("Jane", "Smythe", middle="Anne")
+    add_user("Mary", "Jones")
+
+    assert search(client, "j")[1] == ["John Smith", "Jane Smythe", "Mary Jones"]
+    assert search(client, "jo sm")[1] == ["John Smith"]
+    assert search(client, "SMY")[1] == ["Jane Smythe"]
+    assert search(client, "jane anne smythe")[1] == ["Jane Smythe"]
+    assert search(client, "john jones")[1] == []
+
+
+# The FTS5 index folds accents, PostgreSQL's "simple" search configuration does not
+@pytest.mark.skipif(
+    not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"),
+    reason="Accents are only folded by SQLite's search index",
+)
+def test_accents_ignored(client):
+    add_user("Sofia", "García")
+
+    assert search(client, "garc")[1] == ["Sofia García"]
+
+
+def test_index_follows_user_changes(client):
+    user = add_user("John", "Smith")
+
+    user.Surname = "Brown"
+    db.session.commit()
+    assert search(client, "smith")[1] == []
+    assert search(client, "brown")[1] == ["John Brown"]
+
+    db.session.delete(user)
+    db.session.commit()
+    assert search(client, "brown")[1] == []
+
+
+def test_user_search_pagination(client):
+    for i in range(5):
+        add_user("John", f"Smith{i}")
+
+    response, first = search(client, "john", limit=2)
+    assert first == ["John Smith0", "John Smith1"]
+
+    response, second = search(
+        client, "john", limit=2, cursor=response.headers["X-Next-Cursor"]
+    )
+    assert second == ["John Smith2", "John Smith3"]
+
+    response, last = search(
+        client, "john", limit=2, cursor=response.headers["X-Next-Cursor"]
+    )
+    assert last == ["John Smith4"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response, everyone = search(client, "", limit=10)
+    assert len(everyone) == 5
+    assert "X-Next-Cursor" not in response.headers
+
+
+def random_name(rng, syllables):
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables)).title()
+
+
+def seed_users(count):
+    rng = random.Random(0)
+    password = generate_password_hash("UserPass123@")
+
+    for start in range(0, count, 100000):
+        db.session.execute(
+            db.insert(User),
+            [
+                {
+                    "User_id": i,
+                    "Username": f"user{i}",
+                    "Password": password,
+                    "Email": f"user{i}@gmail.com",
+                    "First_name": random_name(rng, 2),
+                    "Middle_name": random_name(rng, 2) if rng.random() < 0.3 else None,
+                    "Surname": random_name(rng, 3),
+                    "DOB": datetime.date(1990, 1, 1),
+                    "Level_of_access": 1,
+                    "Is_expert": False,
+                }
+                for i in range(start + 1, min(start + 100000, count) + 1)
+            ],
+        )
+    db.session.commit()
+
+
+@pytest.mark.benchmark
+def test_user_search_benchmark(client):
+    seed_users(BENCHMARK_USERS)
+    optimize_search_index()
+    rng = random.Random(1)
+
+    queries = []
+    for _ in range(200):
+        first, surname = random_name(rng, 2), random_name(rng, 3)
+        # Partially typed names, e.g. "jo", "joka" or "joka ma"
+        queries.append(
+            rng.choice([first[: rng.randint(1, len(first))], f"{first} {surname[:2]}"])
+        )
+
+    # Times the lookup of a page of users, without the JSON response around it
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search_users(query, limit=51).all()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    print(f"\nSearch over {BENCHMARK_USERS} users: p50 {p50:.1f}ms, p99 {p99:.1f}ms")
+
+    assert p99 < 10